@@ -0,0 +1,43 @@
+"""metric_events (append-only) and metric_rollups (per-minute counters)
+
+Revision ID: a3c9e7f2b8d4
+Revises: f1b4c8d2e6a9
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e7f2b8d4'
+down_revision = 'f1b4c8d2e6a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'metric_events',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('ts', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('event_type', sa.String(length=64), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=True),
+        sa.Column('session', sa.String(length=64), nullable=True),
+        sa.Column('props', sa.Text(), nullable=True),
+    )
+    op.create_index('ix_metric_events_ts', 'metric_events', ['ts'])
+    op.create_table(
+        'metric_rollups',
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('event_type', sa.String(length=64), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('bucket', 'event_type', 'object_id'),
+    )
+    op.create_index('ix_metric_rollups_object_id_bucket', 'metric_rollups', ['object_id', 'bucket'])
+
+
+def downgrade():
+    op.drop_index('ix_metric_rollups_object_id_bucket', table_name='metric_rollups')
+    op.drop_table('metric_rollups')
+    op.drop_index('ix_metric_events_ts', table_name='metric_events')
+    op.drop_table('metric_events')
@@ -0,0 +1,27 @@
+"""catalog_versions: per-collection version counters for cross-worker cache invalidation
+
+Revision ID: b7d2f4a6c8e1
+Revises: a3c9e7f2b8d4
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f4a6c8e1'
+down_revision = 'a3c9e7f2b8d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'catalog_versions',
+        sa.Column('collection', sa.String(length=32), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('catalog_versions')
@@ -0,0 +1,21 @@
+"""composite index for the complaints user_id filter
+
+Revision ID: c3f9a1d7e5b2
+Revises: b7d2f4a6c8e1
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c3f9a1d7e5b2'
+down_revision = 'b7d2f4a6c8e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_complaints_user_id_created_at_id', 'complaints', ['user_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_complaints_user_id_created_at_id', table_name='complaints')
@@ -0,0 +1,30 @@
+"""keyset pagination indexes on (created_at, id)
+
+Revision ID: c7d1e2a9b3f4
+Revises: pgvector_rag_embeddings
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c7d1e2a9b3f4'
+down_revision = 'pgvector_rag_embeddings'
+branch_labels = None
+depends_on = None
+
+_TABLES = ('objects', 'bookings', 'complaints', 'events')
+
+
+def upgrade():
+    for table in _TABLES:
+        # Курсор сравнивает (created_at, id) — строки с NULL выпали бы из выдачи
+        op.execute(sa.text(f'UPDATE {table} SET created_at = now() WHERE created_at IS NULL'))
+        op.create_index(f'ix_{table}_created_at_id', table, ['created_at', 'id'])
+    op.create_index('ix_bookings_user_id_created_at_id', 'bookings', ['user_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_bookings_user_id_created_at_id', table_name='bookings')
+    for table in reversed(_TABLES):
+        op.drop_index(f'ix_{table}_created_at_id', table_name=table)
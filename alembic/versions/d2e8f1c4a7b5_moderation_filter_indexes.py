@@ -0,0 +1,30 @@
+"""composite indexes for moderation filters
+
+Revision ID: d2e8f1c4a7b5
+Revises: c7d1e2a9b3f4
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd2e8f1c4a7b5'
+down_revision = 'c7d1e2a9b3f4'
+branch_labels = None
+depends_on = None
+
+_INDEXES = [
+    ('ix_complaints_status_created_at_id', 'complaints', ['status', 'created_at', 'id']),
+    ('ix_complaints_object_id_created_at_id', 'complaints', ['object_id', 'created_at', 'id']),
+    ('ix_bookings_status_created_at_id', 'bookings', ['status', 'created_at', 'id']),
+    ('ix_bookings_object_id_created_at_id', 'bookings', ['object_id', 'created_at', 'id']),
+]
+
+
+def upgrade():
+    for name, table, cols in _INDEXES:
+        op.create_index(name, table, cols)
+
+
+def downgrade():
+    for name, table, _ in reversed(_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,36 @@
+"""incremental review/complaint aggregates on objects
+
+Revision ID: e5a3b7c9d1f2
+Revises: d2e8f1c4a7b5
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5a3b7c9d1f2'
+down_revision = 'd2e8f1c4a7b5'
+branch_labels = None
+depends_on = None
+
+_COLUMNS = ('review_count', 'review_sum', 'complaint_count')
+
+
+def upgrade():
+    for name in _COLUMNS:
+        op.add_column('objects', sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+    # Бэкфилл из текущих данных; дальше счётчики ведёт crud
+    op.execute(sa.text(
+        "UPDATE objects SET "
+        "review_count = (SELECT COUNT(*) FROM reviews r WHERE r.object_id = objects.id), "
+        "review_sum = (SELECT COALESCE(SUM(r.rating), 0) FROM reviews r WHERE r.object_id = objects.id), "
+        "complaint_count = (SELECT COUNT(*) FROM complaints c WHERE c.object_id = objects.id)"
+    ))
+    op.execute(sa.text(
+        "UPDATE objects SET rating = review_sum * 1.0 / review_count WHERE review_count > 0"
+    ))
+
+
+def downgrade():
+    for name in reversed(_COLUMNS):
+        op.drop_column('objects', name)
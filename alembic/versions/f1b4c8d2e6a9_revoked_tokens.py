@@ -0,0 +1,30 @@
+"""revoked_tokens table for the shared JWT revocation store
+
+Revision ID: f1b4c8d2e6a9
+Revises: e5a3b7c9d1f2
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f1b4c8d2e6a9'
+down_revision = 'e5a3b7c9d1f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'revoked_tokens',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('jti', sa.String(length=64), nullable=False, unique=True),
+        sa.Column('exp', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+    )
+    op.create_index('ix_revoked_tokens_exp', 'revoked_tokens', ['exp'])
+
+
+def downgrade():
+    op.drop_index('ix_revoked_tokens_exp', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from typing import Optional
+
+from app.cache import TTLCache
+from app.metrics import AI_CACHE_HITS, AI_CACHE_MISSES
+
+logger = logging.getLogger(__name__)
+
+# Кэш ответов /ai/chat. Ключ — нормализованный prompt + lang + model; память
+# ограничена и по числу записей, и по байтам; опционально второй уровень на диске
+# (sqlite-файл, переживает рестарт и общий для воркеров на хосте).
+
+_WS = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s?!.,;:…]+$")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """'  Что посмотреть в  Бурабае?! ' и 'что посмотреть в бурабае' дают один ключ."""
+    p = unicodedata.normalize("NFKC", prompt or "").casefold().replace("ё", "е")
+    p = _WS.sub(" ", p).strip()
+    return _TRAILING.sub("", p)
+
+
+def cache_key(prompt: str, lang: Optional[str], model: str) -> str:
+    raw = "\x1f".join((normalize_prompt(prompt), (lang or "").upper(), model))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class _DiskTier:
+    def __init__(self, path: str):
+        self.path = path
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache (key TEXT PRIMARY KEY, reply TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _get(self, key: str) -> Optional[tuple[str, float]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT reply, expires FROM ai_cache WHERE key = ?", (key,)).fetchone()
+        if row and row[1] > time.time():
+            return row[0], row[1]
+        return None
+
+    def _set(self, key: str, reply: str, expires: float) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO ai_cache (key, reply, expires) VALUES (?, ?, ?)", (key, reply, expires))
+            conn.execute("DELETE FROM ai_cache WHERE expires < ?", (time.time(),))
+
+    def _clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM ai_cache")
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, reply: str, expires: float) -> None:
+        await asyncio.to_thread(self._set, key, reply, expires)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
+
+
+class AIResponseCache:
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 8 * 1024 * 1024, ttl: float = 3600.0,
+                 disk_path: Optional[str] = None):
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize=max_entries, ttl=ttl, maxbytes=max_bytes,
+                               sizeof=lambda v: len(v.encode("utf-8")))
+        self.disk = _DiskTier(disk_path) if disk_path else None
+        self.disk_hits = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        reply = self.memory.get(key)
+        if reply is None and self.disk is not None:
+            try:
+                found = await self.disk.get(key)
+            except Exception as e:
+                logger.warning(f"AI cache disk tier read failed: {e}")
+                found = None
+            if found:
+                reply, expires = found
+                self.disk_hits += 1
+                self.memory.set(key, reply, ttl=expires - time.time())
+        if reply is None:
+            if AI_CACHE_MISSES:
+                AI_CACHE_MISSES.inc()
+        elif AI_CACHE_HITS:
+            AI_CACHE_HITS.inc()
+        return reply
+
+    async def set(self, key: str, reply: str) -> None:
+        self.memory.set(key, reply)
+        if self.disk is not None:
+            try:
+                await self.disk.set(key, reply, time.time() + self.ttl)
+            except Exception as e:
+                logger.warning(f"AI cache disk tier write failed: {e}")
+
+    async def purge(self) -> int:
+        n = len(self.memory)
+        self.memory.clear()
+        if self.disk is not None:
+            await self.disk.clear()
+        return n
+
+    def __len__(self) -> int:
+        return len(self.memory)
+
+    def stats(self) -> dict:
+        # Промах памяти, найденный на диске, — попадание кэша в целом:
+        # hits/misses/hit_ratio считаются по обоим уровням, memory_* — только по памяти
+        st = self.memory.stats()
+        mem_hits, mem_misses = st["hits"], st["misses"]
+        hits, misses = mem_hits + self.disk_hits, mem_misses - self.disk_hits
+        total = hits + misses
+        st.update(
+            hits=hits,
+            misses=misses,
+            hit_ratio=round(hits / total, 4) if total else 0.0,
+            memory_hits=mem_hits,
+            memory_misses=mem_misses,
+            memory_hit_ratio=st["hit_ratio"],
+            disk_enabled=self.disk is not None,
+            disk_hits=self.disk_hits,
+        )
+        return st
+
+
+def build_ai_cache_from_env() -> Optional[AIResponseCache]:
+    if os.getenv("AI_CACHE_ENABLED", "1") != "1":
+        return None
+    return AIResponseCache(
+        max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "1000")),
+        max_bytes=int(os.getenv("AI_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+        ttl=float(os.getenv("AI_CACHE_TTL_SEC", "3600")),
+        disk_path=os.getenv("AI_CACHE_DISK_PATH") or None,
+    )
@@ -1,67 +1,240 @@
 import os
+import json
+import asyncio
 import logging
-import httpx
-from typing import Optional
+from typing import AsyncIterator, Dict, Optional
+
+from app.ai_cache import build_ai_cache_from_env, cache_key
+from app.bulkhead import Bulkhead, BulkheadRejected
+from app.config import settings
+from app.http_client import outbound
+from app.metrics import AI_COALESCED
+from app.rag import build_context, rag_store
 
 logger = logging.getLogger(__name__)
 
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+RAG_CONTEXT_INTRO = "Справочные материалы по региону (используй их, если они относятся к вопросу, и не выдумывай факты сверх них):\n\n"
+SYSTEM_PROMPT = "Ты - виртуальный туристический гид по Акмолинской области Казахстана. Помогай туристам с информацией о достопримечательностях, маршрутах, жилье и развлечениях. Основные достопримечательности: Национальный парк Бурабай (озера Боровое, Щучье), Кокшетау, гора Жеке-Батыр, скала Окжетпес. Отвечай на русском языке простым текстом БЕЗ markdown форматирования (без символов #, **, *, _, и т.д.). Используй только обычный текст с переносами строк."
+
 class AIService:
     def __init__(self):
         self.openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
         # Amazon Nova 2 Lite - новая быстрая модель с огромным контекстом (1M токенов)
         self.model = "amazon/nova-2-lite-v1:free"
+        self.cache = build_ai_cache_from_env()
+        # single-flight: ключ кэша -> задача с запросом к upstream
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+        # Bulkhead для upstream: медленный OpenRouter не должен съесть сокеты и память всего API
+        self.bulkhead = Bulkhead(
+            "ai",
+            limit=int(os.getenv("AI_MAX_CONCURRENCY", "8")),
+            max_queue=int(os.getenv("AI_MAX_QUEUE", "32")),
+            max_wait=float(os.getenv("AI_QUEUE_TIMEOUT_SEC", "5")),
+        )
+        # stub — отвечаем заглушкой; 503 — отдаём ошибку (chat() пробрасывает BulkheadRejected)
+        self.overload_mode = os.getenv("AI_OVERLOAD_MODE", "stub").lower()
+        # RAG: top-k чанков из стора в пределах бюджета токенов на контекст
+        self.rag_enabled = os.getenv("AI_RAG_ENABLED", "0") == "1"
+        self.rag_top_k = int(os.getenv("AI_RAG_TOP_K", "8"))
+        self.rag_budget = int(os.getenv("AI_RAG_CONTEXT_TOKENS", "1500"))
 
-    async def chat(self, prompt: str, lang: Optional[str] = None) -> str:
+    async def chat(self, prompt: str, lang: Optional[str] = None, rag: Optional[bool] = None) -> str:
         """
-        Отправляет запрос к OpenRouter API с моделью Amazon Nova
+        Отвечает из кэша, иначе отправляет запрос к OpenRouter API с моделью Amazon Nova
         """
         if not self.openrouter_api_key:
             logger.warning("No OpenRouter API key found, using fallback")
             return self._stub_response(prompt)
 
+        rag = self.rag_enabled if rag is None else rag
+        key = cache_key(prompt, lang, self._cache_model(rag))
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        try:
+            reply = await self._complete_once(key, prompt, rag)
+        except BulkheadRejected as e:
+            logger.warning(f"AI overloaded, shedding request: {e.reason}")
+            if self.overload_mode == "503":
+                raise
+            return self._stub_response(prompt)
+        if reply is None:
+            # Заглушки не кэшируем — следующий запрос снова попробует upstream
+            return self._stub_response(prompt)
+        return reply
+
+    def _cache_model(self, rag: bool) -> str:
+        return f"{self.model}+rag" if rag else self.model
+
+    async def _complete_once(self, key: str, prompt: str, rag: bool = False) -> Optional[str]:
+        """Одинаковые одновременные вопросы ждут один запрос к upstream"""
+        task = self._inflight.get(key)
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+            if AI_COALESCED:
+                AI_COALESCED.inc()
+        else:
+            self.upstream_calls += 1
+            task = asyncio.get_running_loop().create_task(self._complete_and_store(key, prompt, rag))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+        # shield: отмена одного ожидающего (клиент ушёл) не отменяет запрос для остальных
+        return await asyncio.shield(task)
+
+    async def _complete_and_store(self, key: str, prompt: str, rag: bool = False) -> Optional[str]:
+        async with self.bulkhead.slot():
+            context = await self._rag_context(prompt) if rag else None
+            reply = await self._complete(prompt, context=context)
+        if reply is not None and self.cache is not None:
+            await self.cache.set(key, reply)
+        return reply
+
+    async def _rag_context(self, prompt: str) -> Optional[str]:
+        """Контекст из RAG-стора; соединение с OpenRouter прогревается параллельно с поиском"""
+        mode = settings.RAG_SEARCH_MODE if settings.RAG_SEARCH_MODE != "embeddings" else "tfidf"
+        try:
+            hits, _ = await asyncio.gather(
+                rag_store.search(prompt, k=self.rag_top_k, mode=mode),
+                outbound.warm(OPENROUTER_URL),
+            )
+        except Exception as e:
+            logger.warning(f"RAG retrieval failed, answering without context: {e}")
+            return None
+        context, _ = build_context(hits, self.rag_budget)
+        return context or None
+
+    def stats(self) -> dict:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "bulkhead": self.bulkhead.stats(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.openrouter_api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://visit-aqmola.kz",
+            "X-Title": "Visit Aqmola"
+        }
+
+    def _payload(self, prompt: str, stream: bool = False, context: Optional[str] = None) -> dict:
+        messages = [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        if context:
+            messages.insert(1, {
+                "role": "system",
+                "content": RAG_CONTEXT_INTRO + context
+            })
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 1000
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    async def _complete(self, prompt: str, context: Optional[str] = None) -> Optional[str]:
+        """Запрос к OpenRouter; None — если ответа от модели нет"""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.openrouter_api_key}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "https://visit-aqmola.kz",
-                        "X-Title": "Visit Aqmola"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "Ты - виртуальный туристический гид по Акмолинской области Казахстана. Помогай туристам с информацией о достопримечательностях, маршрутах, жилье и развлечениях. Основные достопримечательности: Национальный парк Бурабай (озера Боровое, Щучье), Кокшетау, гора Жеке-Батыр, скала Окжетпес. Отвечай на русском языке простым текстом БЕЗ markdown форматирования (без символов #, **, *, _, и т.д.). Используй только обычный текст с переносами строк."
-                            },
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        "temperature": 0.7,
-                        "max_tokens": 1000
-                    }
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"OpenRouter API error: {response.status_code} - {response.text[:200]}")
-                    return self._stub_response(prompt)
-                
-                data = response.json()
-                
-                if data.get("choices") and data["choices"][0].get("message"):
-                    content = data["choices"][0]["message"]["content"]
-                    return content
-                
-                logger.warning("No valid response in OpenRouter data")
-                return self._stub_response(prompt)
-                
+            # Общий пул соединений (keep-alive/HTTP2) вместо нового клиента на каждое сообщение
+            client = outbound.client_for(OPENROUTER_URL)
+            response = await client.post(OPENROUTER_URL, headers=self._headers(), json=self._payload(prompt, context=context))
+            
+            if response.status_code != 200:
+                logger.error(f"OpenRouter API error: {response.status_code} - {response.text[:200]}")
+                return None
+            
+            data = response.json()
+            
+            if data.get("choices") and data["choices"][0].get("message"):
+                content = data["choices"][0]["message"]["content"]
+                return content
+            
+            logger.warning("No valid response in OpenRouter data")
+            return None
+            
         except Exception as e:
             logger.error(f"AI Service exception: {str(e)}")
-            return self._stub_response(prompt)
+            return None
+
+    async def _stream_upstream(self, prompt: str, context: Optional[str] = None) -> AsyncIterator[str]:
+        """Дельты текста из потокового ответа OpenRouter (SSE, stream=true)"""
+        client = outbound.client_for(OPENROUTER_URL)
+        async with client.stream("POST", OPENROUTER_URL, headers=self._headers(), json=self._payload(prompt, stream=True, context=context)) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise RuntimeError(f"OpenRouter API error: {response.status_code} - {body[:200]!r}")
+            # Читаем upstream по мере отправки клиенту: пока клиент не принял
+            # предыдущий кусок, следующий не запрашиваем (backpressure через TCP)
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue  # комментарии-keepalive ": OPENROUTER PROCESSING"
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                chunk = json.loads(data)
+                if chunk.get("error"):
+                    raise RuntimeError(f"OpenRouter stream error: {chunk['error']}")
+                choices = chunk.get("choices") or []
+                delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                if delta:
+                    yield delta
+
+    async def chat_stream(self, prompt: str, lang: Optional[str] = None, rag: Optional[bool] = None) -> AsyncIterator[tuple[str, str]]:
+        """
+        Потоковый ответ: пары (event, text). event="delta" — очередной кусок текста,
+        event="fallback" — upstream недоступен/оборвался, text — полный ответ-заглушка,
+        заменяющий уже показанный текст.
+        """
+        if not self.openrouter_api_key:
+            logger.warning("No OpenRouter API key found, using fallback")
+            yield "fallback", self._stub_response(prompt)
+            return
+
+        rag = self.rag_enabled if rag is None else rag
+        key = cache_key(prompt, lang, self._cache_model(rag))
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                yield "delta", cached
+                return
+
+        parts = []
+        try:
+            # Слот держится весь поток; при перегрузке (BulkheadRejected) — заглушка
+            async with self.bulkhead.slot():
+                context = await self._rag_context(prompt) if rag else None
+                async for delta in self._stream_upstream(prompt, context=context):
+                    parts.append(delta)
+                    yield "delta", delta
+        except Exception as e:
+            # asyncio.CancelledError (клиент отключился) сюда не попадает и закрывает upstream
+            logger.error(f"AI stream failed after {len(parts)} chunks: {e}")
+            yield "fallback", self._stub_response(prompt)
+            return
+        if not parts:
+            yield "fallback", self._stub_response(prompt)
+            return
+        if self.cache is not None:
+            await self.cache.set(key, "".join(parts))
 
     def _stub_response(self, prompt: str) -> str:
         """Fallback ответ если API недоступен"""
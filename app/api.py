@@ -1,23 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Header
+from fastapi import APIRouter, Depends, HTTPException, Request, Header, Query, Response
+from fastapi.responses import StreamingResponse
 import os, hmac, hashlib, json
-import httpx
 import time
 import base64
+from datetime import datetime
 import jwt as JWT
-from jwt import PyJWKClient
 from typing import List
+from pydantic import ValidationError
 from app import schemas, crud
-from app.database import get_session
+from app.database import get_session, pool_stats
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.ai_service import ai_service
-from app.auth import admin_required, roles_required
+from app.bulkhead import BulkheadRejected
+from app.auth import admin_required, invalidate_user_role, roles_required
 from app.auth import revoke_jwt
 from app.config import settings
+from app.http_client import outbound
 from app.metrics import ADMIN_ACTIONS_TOTAL
 from app import models
+from app.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.rag import rag_store
+from app.ingest import metrics_pipeline, parse_event
+from app.profiling import default_profiler, pstats_text
+from app.serialization import RawJSONResponse, render_page
+from app.versions import catalog_versions, publish_changes
+from app.catalog_cache import CATALOG, catalog_cache
 
 
 router = APIRouter()
+
+MAX_PAGE_SIZE = 500
+
+
+async def _paged(response: Response, list_fn, db: AsyncSession, limit: int, cursor: str | None,
+                 schema=None, **filters):
+    # Общая обвязка keyset-пагинации: курсор следующей страницы отдаём в заголовке,
+    # тело ответа остаётся списком — старые клиенты не ломаются.
+    # Со schema — быстрый путь: колонки схемы без ORM-сущностей и сразу JSON (app.serialization);
+    # response_model эндпоинта тогда служит только документацией.
+    try:
+        if schema is not None:
+            body, cur = await render_page(list_fn, schema, db, limit, cursor, **filters)
+            return _page_response(body, cur)
+        items = await list_fn(db, limit=limit, cursor=cursor, **filters)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    cur = next_cursor(items, limit)
+    if cur:
+        response.headers[NEXT_CURSOR_HEADER] = cur
+    return items
+
+
+def _page_response(body: bytes, cur: str | None) -> RawJSONResponse:
+    return RawJSONResponse(body, headers={NEXT_CURSOR_HEADER: cur} if cur else None)
+
+
 # OIDC login: validate id_token, link/create user by sub
 @router.post("/auth/oidc/login", response_model=schemas.UserOut, tags=["integrations", "auth"])
 async def oidc_login(id_token: str, db: AsyncSession = Depends(get_session)):
@@ -27,11 +64,11 @@ async def oidc_login(id_token: str, db: AsyncSession = Depends(get_session)):
         audience = os.getenv('OIDC_AUDIENCE')
         issuer = os.getenv('OIDC_ISSUER')
         if jwks_url:
-            jwk_client = PyJWKClient(jwks_url)
-            signing_key = jwk_client.get_signing_key_from_jwt(id_token).key
+            from app.oidc import get_jwks_cache  # JWKS нужен только OIDC-входу
+            signing_key = await get_jwks_cache(jwks_url).get_signing_key_from_jwt(id_token)
             claims = JWT.decode(id_token, signing_key, algorithms=["RS256"], audience=audience, issuer=issuer)
         else:
-            claims = jwt.decode(id_token, options={"verify_signature": False, "verify_exp": True, "verify_aud": False, "verify_iss": False})
+            claims = JWT.decode(id_token, options={"verify_signature": False, "verify_exp": True, "verify_aud": False, "verify_iss": False})
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid id_token")
 
@@ -45,12 +82,16 @@ async def oidc_login(id_token: str, db: AsyncSession = Depends(get_session)):
         email = claims.get('email')
         user_in = schemas.UserCreate(external_id=sub, name=name, email=email)
         user = await crud.create_user(db, user_in)
+        invalidate_user_role(user.id)
     return user
 
 
 @router.post("/users", response_model=schemas.UserOut, tags=["users"])
 async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_session)):
-    return await crud.create_user(db, user)
+    u = await crud.create_user(db, user)
+    # Роль кэшируется в app.auth; новый id мог остаться там от удалённой записи
+    invalidate_user_role(u.id)
+    return u
 
 
 @router.post("/auth/jwt/issue", tags=["auth"])
@@ -65,13 +106,13 @@ async def auth_jwt_issue(user_id: int | None = None, email: str | None = None, d
         u = res.scalars().first()
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
-    from auth import issue_jwt
+    from app.auth import issue_jwt
     token = issue_jwt(u)
     return {"access_token": token, "token_type": "bearer", "role": u.role}
 
 @router.post("/auth/jwt/revoke", tags=["auth"])
 async def auth_jwt_revoke(token: str):
-    ok = revoke_jwt(token)
+    ok = await revoke_jwt(token)
     if not ok:
         raise HTTPException(status_code=400, detail="Invalid or already revoked token")
     return {"revoked": True}
@@ -85,14 +126,109 @@ async def read_user(user_id: int, db: AsyncSession = Depends(get_session)):
     return u
 
 
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "200000"))
+
+
+async def _bulk_rows(request: Request):
+    # NDJSON (application/x-ndjson) читаем потоково построчно, иначе — JSON-массив целиком
+    ctype = request.headers.get("content-type", "")
+    if "ndjson" in ctype or "jsonl" in ctype:
+        buf = b""
+        async for chunk in request.stream():
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if buf.strip():
+            yield json.loads(buf)
+        return
+    data = json.loads(await request.body() or b"null")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Expected JSON array or NDJSON body")
+    for item in data:
+        yield item
+
+
+async def _bulk_ingest(request: Request, db: AsyncSession, schema, insert_fn):
+    # Валидация существующими *Create-схемами, вставка пачками по BULK_CHUNK_SIZE
+    # многострочными INSERT в одной транзакции; любая ошибка откатывает весь импорт.
+    ids: list[int] = []
+    batch: list[dict] = []
+    n = 0
+    try:
+        async for raw in _bulk_rows(request):
+            if n >= BULK_MAX_ROWS:
+                raise HTTPException(status_code=413, detail=f"Too many rows (max {BULK_MAX_ROWS})")
+            try:
+                batch.append(schema(**raw).dict())
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail={"index": n, "errors": json.loads(e.json())})
+            except TypeError:
+                raise HTTPException(status_code=422, detail={"index": n, "errors": "Expected JSON object"})
+            n += 1
+            if len(batch) >= BULK_CHUNK_SIZE:
+                ids += await insert_fn(db, batch)
+                batch = []
+        ids += await insert_fn(db, batch)
+        await db.commit()
+        await publish_changes()
+    except json.JSONDecodeError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Malformed JSON at row {n}")
+    except BaseException:
+        await db.rollback()
+        raise
+    return {"inserted": len(ids), "ids": ids}
+
+
+@router.post("/objects/bulk", tags=["objects"])
+async def bulk_create_objects(request: Request, db: AsyncSession = Depends(get_session), _perm: bool = Depends(roles_required({"admin", "content-manager"}))):
+    return await _bulk_ingest(request, db, schemas.ObjectCreate, crud.bulk_create_objects)
+
+
+@router.post("/events/bulk", tags=["events"])
+async def bulk_create_events(request: Request, db: AsyncSession = Depends(get_session), _perm: bool = Depends(roles_required({"admin", "content-manager"}))):
+    return await _bulk_ingest(request, db, schemas.EventCreate, crud.bulk_create_events)
+
+
+@router.post("/reviews/bulk", tags=["reviews"])
+async def bulk_create_reviews(request: Request, db: AsyncSession = Depends(get_session), _perm: bool = Depends(roles_required({"admin", "content-manager"}))):
+    return await _bulk_ingest(request, db, schemas.ReviewCreate, crud.bulk_create_reviews)
+
+
 @router.post("/objects", response_model=schemas.ObjectOut, tags=["objects"])
 async def create_object(obj: schemas.ObjectCreate, db: AsyncSession = Depends(get_session)):
     return await crud.create_object(db, obj)
 
 
+async def _catalog_page(request: Request, collection: str, db: AsyncSession, limit: int, cursor: str | None):
+    # Условный GET: версия коллекции читается до запроса к БД; при совпадении ETag — 304.
+    # Иначе страница берётся из кэша каталога (app.catalog_cache) или рендерится и кладётся в него
+    headers, not_modified = await catalog_versions.conditional(collection, request)
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    list_fn, schema = CATALOG[collection]
+    try:
+        body, cur = await catalog_cache.page(
+            collection, limit, cursor, lambda: render_page(list_fn, schema, db, limit, cursor)
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    resp = _page_response(body, cur)
+    resp.headers.update(headers)
+    return resp
+
+
 @router.get("/objects", response_model=List[schemas.ObjectOut], tags=["objects"])
-async def get_objects(db: AsyncSession = Depends(get_session)):
-    return await crud.list_objects(db)
+async def get_objects(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+):
+    return await _catalog_page(request, "objects", db, limit, cursor)
 
 
 @router.post("/bookings", response_model=schemas.BookingOut, tags=["bookings"])
@@ -105,8 +241,14 @@ async def create_booking(booking: schemas.BookingCreate, db: AsyncSession = Depe
 
 
 @router.get("/bookings", response_model=List[schemas.BookingOut], tags=["bookings"])
-async def list_bookings(user_id: int, db: AsyncSession = Depends(get_session)):
-    return await crud.list_bookings_by_user(db, user_id)
+async def list_bookings(
+    user_id: int,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+):
+    return await _paged(response, crud.list_bookings_by_user, db, limit, cursor, schemas.BookingOut, user_id=user_id)
 
 
 @router.post("/reviews", response_model=schemas.ReviewOut, tags=["reviews"])
@@ -124,27 +266,27 @@ async def oidc_verify(code: str):
     client_secret = os.getenv("OIDC_CLIENT_SECRET")
     redirect_uri = os.getenv("OIDC_REDIRECT_URI")
     if token_url and client_id and client_secret and redirect_uri:
-        async with httpx.AsyncClient(timeout=10) as client:
-            try:
-                resp = await client.post(token_url, data={
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "client_id": client_id,
-                    "client_secret": client_secret,
-                    "redirect_uri": redirect_uri,
-                })
-                if resp.status_code != 200:
-                    raise HTTPException(status_code=401, detail="Token exchange failed")
-                data = resp.json()
-                # Возвращаем базовую часть токенов
-                return {
-                    "access_token": data.get("access_token"),
-                    "id_token": data.get("id_token"),
-                    "token_type": data.get("token_type"),
-                    "expires_in": data.get("expires_in"),
-                }
-            except Exception:
-                raise HTTPException(status_code=401, detail="Token exchange error")
+        client = outbound.client_for(token_url)
+        try:
+            resp = await client.post(token_url, data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "client_id": client_id,
+                "client_secret": client_secret,
+                "redirect_uri": redirect_uri,
+            })
+            if resp.status_code != 200:
+                raise HTTPException(status_code=401, detail="Token exchange failed")
+            data = resp.json()
+            # Возвращаем базовую часть токенов
+            return {
+                "access_token": data.get("access_token"),
+                "id_token": data.get("id_token"),
+                "token_type": data.get("token_type"),
+                "expires_in": data.get("expires_in"),
+            }
+        except Exception:
+            raise HTTPException(status_code=401, detail="Token exchange error")
     # Заглушка
     if code in {"test", "mock"}:
         return {"sub": "egov:user:123", "name": "Test User", "acr": "low"}
@@ -159,12 +301,12 @@ async def oidc_validate(id_token: str):
     options = {"verify_signature": bool(jwks_url), "verify_exp": True, "verify_aud": bool(audience), "verify_iss": bool(issuer)}
     try:
         if jwks_url:
-            jwk_client = PyJWKClient(jwks_url)
-            signing_key = jwk_client.get_signing_key_from_jwt(id_token).key
+            from app.oidc import get_jwks_cache  # JWKS нужен только OIDC-входу
+            signing_key = await get_jwks_cache(jwks_url).get_signing_key_from_jwt(id_token)
             claims = JWT.decode(id_token, signing_key, algorithms=["RS256"], audience=audience, issuer=issuer, options=options)
         else:
             # Без подписи: только базовые проверки
-            claims = jwt.decode(id_token, options={"verify_signature": False, "verify_exp": True, "verify_aud": False, "verify_iss": False})
+            claims = JWT.decode(id_token, options={"verify_signature": False, "verify_exp": True, "verify_aud": False, "verify_iss": False})
         return {"valid": True, "claims": claims}
     except JWT.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -230,10 +372,71 @@ async def freedom_mock_tours():
 
 @router.post("/ai/chat", response_model=schemas.AIResponse, tags=["ai"])
 async def ai_chat(req: schemas.AIRequest):
-    reply = await ai_service.chat(req.prompt, req.lang)
+    try:
+        reply = await ai_service.chat(req.prompt, req.lang, rag=req.rag)
+    except BulkheadRejected:
+        # AI_OVERLOAD_MODE=503: быстрый отказ вместо долгого ожидания upstream
+        raise HTTPException(status_code=503, detail="AI assistant is overloaded, try again later",
+                            headers={"Retry-After": "5"})
     return {"reply": reply}
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/ai/chat/stream", tags=["ai"])
+async def ai_chat_stream(req: schemas.AIRequest):
+    """Ответ ассистента по мере генерации (text/event-stream).
+
+    События: delta {"text"} — кусок ответа; fallback {"text"} — полный ответ-заглушка
+    вместо уже показанного текста; done {} — конец. При отключении клиента Starlette
+    отменяет генератор, и соединение с upstream закрывается.
+    """
+    async def events():
+        async for event, text in ai_service.chat_stream(req.prompt, req.lang, rag=req.rag):
+            yield _sse(event, {"text": text})
+        yield _sse("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- RAG store ---
+
+def _check_rag_doc(doc: schemas.RAGDocumentIn) -> None:
+    max_chars = int(os.getenv("MAX_RAG_DOC_CHARS", str(settings.MAX_RAG_DOC_CHARS)))
+    if len(doc.text) > max_chars:
+        raise HTTPException(status_code=400, detail=f"Document text exceeds {max_chars} characters")
+
+
+@router.post("/rag/documents", tags=["rag"])
+async def rag_add_document(doc: schemas.RAGDocumentIn, _perm: bool = Depends(roles_required({"admin", "content-manager"}))):
+    _check_rag_doc(doc)
+    ids = await rag_store.add_documents([doc.dict()])
+    return {"ok": True, "id": ids[0]}
+
+
+@router.post("/rag/documents/batch", tags=["rag"])
+async def rag_add_documents(batch: schemas.RAGDocumentsBatch, _perm: bool = Depends(roles_required({"admin", "content-manager"}))):
+    for doc in batch.items:
+        _check_rag_doc(doc)
+    ids = await rag_store.add_documents([doc.dict() for doc in batch.items])
+    return {"ok": len(ids), "ids": ids}
+
+
+@router.get("/rag/search", tags=["rag"])
+async def rag_search(q: str, k: int = Query(5, ge=1, le=50), mode: str = Query(None)):
+    mode = (mode or settings.RAG_SEARCH_MODE).lower()
+    if mode not in {"simple", "tfidf"}:
+        mode = "tfidf"  # embeddings пока не подключены — лексический поиск
+    results = await rag_store.search(q, k=k, mode=mode)
+    return {"query": q, "mode": mode, "results": results}
+
+
 # --- Complaints & Events ---
 
 @router.post("/complaints", response_model=schemas.ComplaintOut, tags=["complaints"])
@@ -242,8 +445,13 @@ async def create_complaint(comp: schemas.ComplaintCreate, db: AsyncSession = Dep
 
 
 @router.get("/complaints", response_model=List[schemas.ComplaintOut], tags=["complaints"])
-async def get_complaints(db: AsyncSession = Depends(get_session)):
-    return await crud.list_complaints(db)
+async def get_complaints(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+):
+    return await _paged(response, crud.list_complaints, db, limit, cursor, schemas.ComplaintOut)
 
 
 @router.post("/complaints/{complaint_id}/status", response_model=schemas.ComplaintOut, tags=["complaints", "admin"])
@@ -267,21 +475,111 @@ async def create_event(event: schemas.EventCreate, db: AsyncSession = Depends(ge
 
 
 @router.get("/events", response_model=List[schemas.EventOut], tags=["events"])
-async def get_events(db: AsyncSession = Depends(get_session)):
-    return await crud.list_events(db)
+async def get_events(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+):
+    return await _catalog_page(request, "events", db, limit, cursor)
 
 # --- Admin endpoints ---
 
 @router.get("/admin/complaints", response_model=List[schemas.ComplaintOut], tags=["admin"])
-async def admin_list_complaints(status: str | None = None, db: AsyncSession = Depends(get_session), _admin_ok: bool = Depends(admin_required)):
-    items = await crud.list_complaints(db)
-    if status:
-        items = [c for c in items if getattr(c, 'status', None) == status]
-    return items
+async def admin_list_complaints(
+    response: Response,
+    status: str | None = None,
+    object_id: int | None = None,
+    user_id: int | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+    _admin_ok: bool = Depends(admin_required),
+):
+    return await _paged(
+        response, crud.list_complaints, db, limit, cursor, schemas.ComplaintOut,
+        status=status, object_id=object_id, user_id=user_id,
+        created_from=created_from, created_to=created_to,
+    )
 
 @router.get("/admin/events", response_model=List[schemas.EventOut], tags=["admin"])
-async def admin_list_events(db: AsyncSession = Depends(get_session), _admin_ok: bool = Depends(admin_required)):
-    return await crud.list_events(db)
+async def admin_list_events(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+    _admin_ok: bool = Depends(admin_required),
+):
+    return await _paged(response, crud.list_events, db, limit, cursor, schemas.EventOut)
+
+@router.post("/admin/users/{user_id}/role", response_model=schemas.UserOut, tags=["admin"])
+async def admin_set_user_role(user_id: int, body: schemas.UserRoleUpdate, db: AsyncSession = Depends(get_session), _admin_ok: bool = Depends(admin_required)):
+    u = await crud.set_user_role(db, user_id, body.role)
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    invalidate_user_role(u.id)
+    if ADMIN_ACTIONS_TOTAL:
+        ADMIN_ACTIONS_TOTAL.inc()
+    return u
+
+@router.get("/admin/upstreams", tags=["admin"])
+async def admin_upstreams(_admin_ok: bool = Depends(admin_required)):
+    return outbound.stats()
+
+@router.get("/admin/db/pool", tags=["admin"])
+async def admin_db_pool(_admin_ok: bool = Depends(admin_required)):
+    return pool_stats()
+
+@router.get("/admin/ai/stats", tags=["admin"])
+async def admin_ai_stats(_admin_ok: bool = Depends(admin_required)):
+    return ai_service.stats()
+
+@router.get("/admin/ai/cache", tags=["admin"])
+async def admin_ai_cache_stats(_admin_ok: bool = Depends(admin_required)):
+    cache = ai_service.cache
+    return cache.stats() if cache is not None else {"enabled": False}
+
+@router.delete("/admin/ai/cache", tags=["admin"])
+async def admin_ai_cache_purge(_admin_ok: bool = Depends(admin_required)):
+    cache = ai_service.cache
+    purged = await cache.purge() if cache is not None else 0
+    return {"purged": purged}
+
+@router.post("/admin/profiling", tags=["admin"])
+async def admin_profiling_arm(body: schemas.ProfilingRuleIn, _admin_ok: bool = Depends(admin_required)):
+    # id правила — значение заголовка X-Profile для профилирования отдельного запроса
+    rule = default_profiler.arm(**body.dict())
+    return {**rule.as_dict(), "header": {"X-Profile": rule.id}}
+
+@router.get("/admin/profiling", tags=["admin"])
+async def admin_profiling_list(_admin_ok: bool = Depends(admin_required)):
+    return default_profiler.stats()
+
+@router.delete("/admin/profiling", tags=["admin"])
+async def admin_profiling_disarm(rule_id: str | None = None, _admin_ok: bool = Depends(admin_required)):
+    return {"disarmed": default_profiler.disarm(rule_id)}
+
+@router.get("/admin/profiling/profiles/{profile_id}", tags=["admin"])
+async def admin_profiling_download(
+    profile_id: int,
+    format: str = Query("raw", pattern="^(raw|text)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls|ncalls)$"),
+    _admin_ok: bool = Depends(admin_required),
+):
+    p = default_profiler.get(profile_id)
+    if p is None:
+        raise HTTPException(status_code=404, detail="Profile not found (evicted from ring buffer?)")
+    if p["mode"] == "stack":
+        # collapsed stacks: flamegraph.pl / speedscope
+        return Response(p["data"], media_type="text/plain",
+                        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'})
+    if format == "text":
+        return Response(pstats_text(p["data"], sort), media_type="text/plain")
+    # pstats-файл: python -m pstats / snakeviz
+    return Response(p["data"], media_type="application/octet-stream",
+                    headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'})
 
 @router.post("/admin/bookings/{booking_id}/status", tags=["admin"])
 async def admin_update_booking_status(booking_id: int, body: schemas.BookingStatusUpdate, db: AsyncSession = Depends(get_session), _perm: bool = Depends(roles_required({"admin","moderator"}))):
@@ -293,43 +591,129 @@ async def admin_update_booking_status(booking_id: int, body: schemas.BookingStat
     return {"ok": True, "id": b.id, "status": b.status}
 
 @router.get("/admin/bookings", response_model=List[schemas.BookingOut], tags=["admin"])
-async def admin_list_bookings(status: str | None = None, db: AsyncSession = Depends(get_session), _admin_ok: bool = Depends(admin_required)):
-    items = await crud.list_all_bookings(db)
-    if status:
-        items = [b for b in items if getattr(b, 'status', None) == status]
-    return items
+async def admin_list_bookings(
+    response: Response,
+    status: str | None = None,
+    object_id: int | None = None,
+    user_id: int | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(200, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_session),
+    _admin_ok: bool = Depends(admin_required),
+):
+    return await _paged(
+        response, crud.list_all_bookings, db, limit, cursor, schemas.BookingOut,
+        status=status, object_id=object_id, user_id=user_id,
+        created_from=created_from, created_to=created_to,
+    )
 
 
 # --- Object scoring (simplified) ---
 
-@router.get("/objects/{object_id}/score", tags=["objects"])
-async def object_score(object_id: int, db: AsyncSession = Depends(get_session)):
-    # Простая версия: учитываем кол-во жалоб и средний рейтинг
-    from sqlalchemy import func
-    from models import Review, Complaint
+MAX_SCORE_BATCH = 500
 
-    # avg rating
-    res_r = await db.execute(
-        func.coalesce(func.avg(Review.rating), 0.0).where(Review.object_id == object_id)
-    )
-    avg_rating = float(res_r.scalar() or 0.0)
-
-    # complaints count
-    res_c = await db.execute(
-        func.count(Complaint.id).where(Complaint.object_id == object_id)
-    )
-    complaints = int(res_c.scalar() or 0)
 
-    # простая формула [0..100]
+def _score_payload(object_id: int, obj) -> dict:
+    # простая формула [0..100] по инкрементальным агрегатам объекта
+    reviews = (obj.review_count or 0) if obj else 0
+    avg_rating = float(obj.review_sum) / reviews if reviews else 0.0
+    complaints = (obj.complaint_count or 0) if obj else 0
     base = avg_rating / 5 * 100
     penalty = min(complaints * 3, 30)
     score = max(0, int(base - penalty))
     return {"object_id": object_id, "avg_rating": avg_rating, "complaints": complaints, "score": score}
 
 
-# --- Metrics ingest (stub) ---
+@router.get("/objects/scores", tags=["objects"])
+async def object_scores(ids: List[int] = Query(...), db: AsyncSession = Depends(get_session)):
+    # Пакетный скоринг для карточек списка: один SELECT по первичному ключу
+    if len(ids) > MAX_SCORE_BATCH:
+        raise HTTPException(status_code=400, detail=f"Too many ids (max {MAX_SCORE_BATCH})")
+    objs = {o.id: o for o in await crud.get_objects_by_ids(db, set(ids))}
+    return [_score_payload(i, objs.get(i)) for i in dict.fromkeys(ids)]
+
+
+@router.get("/objects/{object_id}/score", tags=["objects"])
+async def object_score(object_id: int, db: AsyncSession = Depends(get_session)):
+    # Учитываем средний рейтинг и число жалоб (счётчики хранятся в objects)
+    objs = await crud.get_objects_by_ids(db, [object_id])
+    return _score_payload(object_id, objs[0] if objs else None)
+
+
+# --- Metrics ingest ---
+
+METRICS_INGEST_MAX_EVENTS = int(os.getenv("METRICS_INGEST_MAX_EVENTS", "10000"))
+
+
+async def _metric_rows(request: Request):
+    # Одно событие, {"events": [...]}, JSON-массив или NDJSON
+    ctype = request.headers.get("content-type", "")
+    if "ndjson" in ctype or "jsonl" in ctype:
+        async for item in _bulk_rows(request):
+            yield item
+        return
+    data = json.loads(await request.body() or b"null")
+    if isinstance(data, dict):
+        data = data["events"] if isinstance(data.get("events"), list) else [data]
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Expected event object, JSON array or NDJSON body")
+    for item in data:
+        yield item
+
+
+@router.post("/metrics/ingest", status_code=202, tags=["integrations"])
+async def metrics_ingest(request: Request, response: Response):
+    # Только разбор и постановка в очередь; запись в БД и агрегаты — фоновым writer'ом
+    now = time.time()
+    events, invalid = [], 0
+    try:
+        async for raw in _metric_rows(request):
+            if len(events) + invalid >= METRICS_INGEST_MAX_EVENTS:
+                raise HTTPException(status_code=413, detail=f"Too many events (max {METRICS_INGEST_MAX_EVENTS})")
+            ev = parse_event(raw, now)
+            if ev is None:
+                invalid += 1
+            else:
+                events.append(ev)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e.msg}")
+    accepted = metrics_pipeline.offer(events, invalid)
+    dropped = len(events) - accepted
+    if dropped and not accepted:
+        raise HTTPException(status_code=503, detail="Metrics queue is full", headers={"Retry-After": "1"})
+    return {"ok": True, "accepted": accepted, "dropped": dropped, "invalid": invalid}
+
+
+@router.get("/admin/metrics/rollups", tags=["admin"])
+async def admin_metric_rollups(
+    ts_from: datetime | None = Query(None, alias="from"),
+    ts_to: datetime | None = Query(None, alias="to"),
+    event_type: str | None = Query(None, alias="type"),
+    object_id: int | None = None,
+    limit: int = Query(10000, ge=1, le=100000),
+    db: AsyncSession = Depends(get_session),
+    _admin_ok: bool = Depends(admin_required),
+):
+    rows = await crud.list_metric_rollups(db, ts_from, ts_to, event_type, object_id, limit)
+    return [
+        {"bucket": r.bucket, "type": r.event_type, "object_id": r.object_id or None, "count": r.count}
+        for r in rows
+    ]
+
+
+@router.get("/admin/metrics/pipeline", tags=["admin"])
+async def admin_metrics_pipeline(_admin_ok: bool = Depends(admin_required)):
+    return metrics_pipeline.stats()
+
+
+@router.get("/admin/catalog/cache", tags=["admin"])
+async def admin_catalog_cache(_admin_ok: bool = Depends(admin_required)):
+    return catalog_cache.stats()
+
 
-@router.post("/metrics/ingest", tags=["integrations"])
-async def metrics_ingest(payload: dict):
-    # Заглушка для сбора метрик. В дальнейшем — запись в хранилище и агрегации.
-    return {"ok": True, "received": True}
+@router.delete("/admin/catalog/cache", tags=["admin"])
+async def admin_catalog_cache_clear(_admin_ok: bool = Depends(admin_required)):
+    catalog_cache.clear()
+    return {"ok": True}
@@ -5,10 +5,22 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_session
 from sqlalchemy.future import select
 from app import models
+from app.cache import TTLCache
+from app.metrics import ROLE_CACHE_HITS, ROLE_CACHE_MISSES
+from app.database import engine
+from app.revocation import build_store_from_env
 
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret")
 JWT_TTL_SECONDS = int(os.getenv("JWT_TTL_SECONDS", "3600"))
-REVOKED_JTIS: set[str] = set()
+# Отозванные jti: in-memory фронт-кэш + общий backend (REVOCATION_BACKEND=db|sqlite|memory)
+revocation_store = build_store_from_env(engine)
+
+# user_id -> role. Локален для процесса: изменение роли на другом воркере
+# становится видно не позже ROLE_CACHE_TTL_SEC.
+_role_cache = TTLCache(
+    maxsize=int(os.getenv("ROLE_CACHE_MAX", "10000")),
+    ttl=float(os.getenv("ROLE_CACHE_TTL_SEC", "30")),
+)
 
 
 def issue_jwt(user: models.User):
@@ -42,25 +54,61 @@ def _extract_token(auth_header: str | None) -> str | None:
         return auth_header.split(" ", 1)[1].strip()
     return None
 
+
+def invalidate_user_role(user_id: int | None = None) -> None:
+    """Сбрасывает закэшированную роль пользователя (или весь кэш)."""
+    if user_id is None:
+        _role_cache.clear()
+    else:
+        _role_cache.pop(int(user_id))
+
+
+def role_cache_stats() -> dict:
+    return _role_cache.stats()
+
+
+async def _user_role(uid: int, db: AsyncSession) -> Optional[str]:
+    role = _role_cache.get(uid)
+    if role is not None:
+        if ROLE_CACHE_HITS:
+            ROLE_CACHE_HITS.inc()
+        return role
+    if ROLE_CACHE_MISSES:
+        ROLE_CACHE_MISSES.inc()
+    res = await db.execute(select(models.User.role).where(models.User.id == uid))
+    role = res.scalars().first()
+    if role is not None:
+        _role_cache.set(uid, role)
+    return role
+
+
+async def _role_from_token(token: str, db: AsyncSession) -> Optional[str]:
+    """Роль владельца JWT; HTTPException(401) для отозванного токена, None — если не удалось."""
+    try:
+        data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    except Exception:
+        return None
+    if await revocation_store.is_revoked(data.get("jti")):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    # Опционально доверяем подписанному claim role из issue_jwt — без обращения к БД
+    if os.getenv("AUTH_TRUST_JWT_ROLE") == "1" and data.get("role"):
+        return data["role"]
+    uid = data.get("sub")
+    try:
+        uid = int(uid)
+    except (TypeError, ValueError):
+        return None
+    return await _user_role(uid, db)
+
+
 async def admin_required(request: Request, x_admin_token: str | None = Header(default=None), db: AsyncSession = Depends(get_session)):
     expected = os.getenv("ADMIN_TOKEN")
     auth_header = request.headers.get("Authorization")
     if expected and x_admin_token == expected:
         return True
     token = _extract_token(auth_header)
-    if token:
-        try:
-            data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-            if data.get("jti") in REVOKED_JTIS:
-                raise HTTPException(status_code=401, detail="Token revoked")
-            uid = data.get("sub")
-            if uid:
-                res = await db.execute(select(models.User).where(models.User.id == int(uid)))
-                user = res.scalars().first()
-                if user and user.role == 'admin':
-                    return True
-        except Exception:
-            pass
+    if token and await _role_from_token(token, db) == 'admin':
+        return True
     raise HTTPException(status_code=403, detail="Forbidden")
 
 def roles_required(allowed: set[str]):
@@ -73,31 +121,21 @@ def roles_required(allowed: set[str]):
         token = _extract_token(auth_header)
         if not token:
             raise HTTPException(status_code=403, detail="Forbidden")
-        try:
-            data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-            if data.get("jti") in REVOKED_JTIS:
-                raise HTTPException(status_code=401, detail="Token revoked")
-            uid = data.get("sub")
-            if not uid:
-                raise HTTPException(status_code=403, detail="Forbidden")
-            res = await db.execute(select(models.User).where(models.User.id == int(uid)))
-            user = res.scalars().first()
-            if user and user.role in allowed:
-                return True
-        except HTTPException:
-            raise
-        except Exception:
-            pass
+        if await _role_from_token(token, db) in allowed:
+            return True
         raise HTTPException(status_code=403, detail="Forbidden")
     return _dep
-def revoke_jwt(token: str) -> bool:
+
+
+async def revoke_jwt(token: str) -> bool:
     try:
         data = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        jti = data.get("jti")
-        if jti:
-            REVOKED_JTIS.add(jti)
-            return True
     except Exception:
         return False
-    return False
-
+    jti = data.get("jti")
+    if not jti:
+        return False
+    # Запись нужна только до истечения токена
+    exp = int(data.get("exp") or time.time() + JWT_TTL_SECONDS)
+    await revocation_store.revoke(jti, exp)
+    return True
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Optional
+
+from app.metrics import BULKHEAD_ACTIVE, BULKHEAD_QUEUE_DEPTH, BULKHEAD_REJECTED, BULKHEAD_WAIT
+
+# Bulkhead: не более limit одновременных вызовов, до max_queue ждущих в очереди (FIFO),
+# ожидание не дольше дедлайна. Если очередь полна или по средней длительности вызова
+# видно, что дедлайн не успеть, — отказываем сразу, а не держим сокет/память впустую.
+
+
+class BulkheadRejected(Exception):
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"{name} bulkhead rejected call: {reason}")
+        self.name = name
+        self.reason = reason  # queue_full | deadline | timeout
+
+
+class Bulkhead:
+    _EWMA = 0.2
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.avg_service_sec = 0.0
+        self.rejected = {"queue_full": 0, "deadline": 0, "timeout": 0}
+        self.total_wait_sec = 0.0
+        self.max_wait_sec = 0.0
+        self.admitted = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _gauges(self) -> None:
+        if BULKHEAD_ACTIVE:
+            BULKHEAD_ACTIVE.labels(self.name).set(self.active)
+            BULKHEAD_QUEUE_DEPTH.labels(self.name).set(len(self._waiters))
+
+    def _reject(self, reason: str) -> BulkheadRejected:
+        self.rejected[reason] += 1
+        if BULKHEAD_REJECTED:
+            BULKHEAD_REJECTED.labels(self.name, reason).inc()
+        return BulkheadRejected(self.name, reason)
+
+    def _admitted(self, waited: float) -> None:
+        self.admitted += 1
+        self.total_wait_sec += waited
+        self.max_wait_sec = max(self.max_wait_sec, waited)
+        if BULKHEAD_WAIT:
+            BULKHEAD_WAIT.labels(self.name).observe(waited)
+        self._gauges()
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        timeout = self.max_wait if timeout is None else timeout
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._admitted(0.0)
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        # Впереди len(waiters) вызовов, за avg_service освобождается limit слотов
+        expected = (len(self._waiters) // self.limit + 1) * self.avg_service_sec
+        if expected > timeout:
+            raise self._reject("deadline")
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self._gauges()
+        t0 = time.monotonic()
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("timeout") from None
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # слот уже передан нам, но вызывающий ушёл
+            raise
+        finally:
+            try:
+                self._waiters.remove(fut)
+            except ValueError:
+                pass
+            self._gauges()
+        self._admitted(time.monotonic() - t0)
+
+    def release(self) -> None:
+        # Слот передаётся первому живому ожидающему, active не меняется
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+        self._gauges()
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        await self.acquire(timeout)
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            dt = time.monotonic() - t0
+            self.avg_service_sec = dt if not self.avg_service_sec else (
+                self._EWMA * dt + (1 - self._EWMA) * self.avg_service_sec
+            )
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "max_wait_sec": self.max_wait,
+            "avg_service_ms": round(self.avg_service_sec * 1000, 2),
+            "avg_wait_ms": round(self.total_wait_sec / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "max_seen_wait_ms": round(self.max_wait_sec * 1000, 2),
+            "rejected": dict(self.rejected),
+        }
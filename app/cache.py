@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """Небольшой LRU-кэш с TTL для горячих путей (один процесс, без блокировок:
+    все операции синхронные и выполняются в event loop)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, maxbytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Необязательный лимит по объёму: sizeof(value) -> байты
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof or (lambda v: 0)
+        self.bytes = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _drop(self, key: Hashable) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.bytes -= self.sizeof(item[1])
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        size = self.sizeof(value)
+        if self.maxbytes is not None and size > self.maxbytes:
+            return  # одно значение больше всего бюджета — не кэшируем
+        self._drop(key)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self.bytes += size
+        while len(self._data) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes):
+            _, (_, v) = self._data.popitem(last=False)
+            self.bytes -= self.sizeof(v)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        self._drop(key)
+
+    def pop_where(self, pred: Callable[[Hashable], bool]) -> int:
+        """Удаляет записи, ключи которых удовлетворяют pred; возвращает их число."""
+        keys = [k for k in self._data if pred(k)]
+        for k in keys:
+            self._drop(k)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
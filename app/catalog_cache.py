@@ -0,0 +1,108 @@
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from app import crud, schemas
+from app.cache import TTLCache
+from app.database import AsyncSessionLocal
+from app.metrics import CATALOG_CACHE_BYTES, CATALOG_CACHE_EVICTIONS, CATALOG_CACHE_REQUESTS
+from app.serialization import render_page
+from app.versions import CollectionVersions, catalog_versions
+
+# Read-through кэш страниц каталога (GET /objects, /events) в памяти воркера.
+# Ключ — (коллекция, версия, limit, cursor), значение — готовое JSON-тело и курсор
+# следующей страницы. Запись в коллекцию поднимает её версию в catalog_versions:
+# свой воркер сбрасывает записи сразу после commit, остальные — при следующем опросе
+# таблицы (не реже CATALOG_VERSION_POLL_SEC). Если версии не обновлялись дольше
+# CATALOG_MAX_STALE_SEC, кэш обходится — чтение никогда не старше этой границы.
+
+Page = Tuple[bytes, Optional[str]]
+
+CATALOG = {
+    "objects": (crud.list_objects, schemas.ObjectOut),
+    "events": (crud.list_events, schemas.EventOut),
+}
+
+
+class CatalogCache:
+    def __init__(self, versions: CollectionVersions, enabled: bool = True, maxsize: int = 512,
+                 maxbytes: int = 32 * 1024 * 1024, ttl: float = 300.0):
+        self.versions = versions
+        self.enabled = enabled
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, maxbytes=maxbytes, sizeof=lambda v: len(v[0]))
+        # Поколение коллекции растёт при каждой инвалидации: страница, загруженная
+        # во время записи, не попадает в кэш
+        self._generation: Dict[str, int] = {}
+        self.bypasses = 0
+        self.invalidations = 0
+        self._evictions_seen = 0
+        versions.on_change(self.invalidate)
+
+    async def page(self, collection: str, limit: int, cursor: Optional[str],
+                   loader: Callable[[], Awaitable[Page]]) -> Page:
+        if not self.enabled or not self.versions.fresh(collection):
+            self.bypasses += 1
+            if CATALOG_CACHE_REQUESTS:
+                CATALOG_CACHE_REQUESTS.labels(collection=collection, result="bypass").inc()
+            return await loader()
+        version, _ = self.versions.get(collection)
+        key = (collection, version, limit, cursor)
+        cached = self._cache.get(key)
+        if cached is not None:
+            if CATALOG_CACHE_REQUESTS:
+                CATALOG_CACHE_REQUESTS.labels(collection=collection, result="hit").inc()
+            return cached
+        if CATALOG_CACHE_REQUESTS:
+            CATALOG_CACHE_REQUESTS.labels(collection=collection, result="miss").inc()
+        generation = self._generation.get(collection, 0)
+        value = await loader()
+        if self._generation.get(collection, 0) == generation:
+            self._cache.set(key, value)
+            self._report()
+        return value
+
+    def invalidate(self, collection: str) -> None:
+        self._generation[collection] = self._generation.get(collection, 0) + 1
+        self.invalidations += self._cache.pop_where(lambda k: k[0] == collection)
+        self._report()
+
+    def clear(self) -> None:
+        for collection in CATALOG:
+            self._generation[collection] = self._generation.get(collection, 0) + 1
+        self._cache.clear()
+        self._report()
+
+    def _report(self) -> None:
+        if CATALOG_CACHE_EVICTIONS and self._cache.evictions > self._evictions_seen:
+            CATALOG_CACHE_EVICTIONS.inc(self._cache.evictions - self._evictions_seen)
+        self._evictions_seen = self._cache.evictions
+        if CATALOG_CACHE_BYTES:
+            CATALOG_CACHE_BYTES.set(self._cache.bytes)
+
+    async def warm(self, limit: int = 100) -> None:
+        """Первые страницы каталога (как у GET без параметров) — в кэш при старте."""
+        if not self.enabled or not await self.versions.ensure_fresh():
+            return
+        for collection, (list_fn, schema) in CATALOG.items():
+            async with AsyncSessionLocal() as db:
+                await self.page(collection, limit, None,
+                                lambda: render_page(list_fn, schema, db, limit, None))
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "enabled": self.enabled,
+            "ttl_sec": self._cache.ttl,
+            "maxbytes": self._cache.maxbytes,
+            "bypasses": self.bypasses,
+            "invalidations": self.invalidations,
+            "versions": self.versions.stats(),
+        }
+
+
+catalog_cache = CatalogCache(
+    catalog_versions,
+    enabled=os.getenv("CATALOG_CACHE_ENABLED", "1") == "1",
+    maxsize=int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "512")),
+    maxbytes=int(os.getenv("CATALOG_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL_SEC", "300")),
+)
@@ -1,14 +1,52 @@
+from datetime import datetime
+from sqlalchemy import insert, update
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app import models
+from app.pagination import paginate
+from app.versions import mark_changed, publish_changes
+
+
+def _apply_filters(stmt, model, status: str | None = None, object_id: int | None = None,
+                   user_id: int | None = None, created_from: datetime | None = None,
+                   created_to: datetime | None = None):
+    # Фильтры модерации выполняются в БД (индексы (status|object_id|user_id, created_at, id)),
+    # а не постфильтром в Python поверх первой страницы.
+    if status is not None:
+        stmt = stmt.where(model.status == status)
+    if object_id is not None:
+        stmt = stmt.where(model.object_id == object_id)
+    if user_id is not None:
+        stmt = stmt.where(model.user_id == user_id)
+    if created_from is not None:
+        stmt = stmt.where(model.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(model.created_at < created_to)
+    return stmt
+
+
+def _select_for(model, fields: tuple[str, ...] | None):
+    # Списки на чтение могут выбирать только нужные колонки (Row-кортежи без ORM-сущностей);
+    # created_at и id нужны курсору следующей страницы
+    if fields is None:
+        return select(model)
+    names = list(fields) + [f for f in ("created_at", "id") if f not in fields]
+    return select(*(getattr(model, f) for f in names))
+
+
+async def _fetch_page(db: AsyncSession, stmt, model, limit: int, cursor: str | None, fields):
+    res = await db.execute(paginate(stmt, model, cursor, limit))
+    return res.scalars().all() if fields is None else res.all()
+
+
+# RBAC: разрешённые роли
+ALLOWED_ROLES = {'user', 'admin', 'moderator', 'content-manager'}
 
 
 async def create_user(db: AsyncSession, user_in):
     data = user_in.dict()
-    # RBAC: разрешённые роли
-    allowed_roles = {'user', 'admin', 'moderator', 'content-manager'}
     role = (data.get('role') or 'user').lower()
-    if role not in allowed_roles:
+    if role not in ALLOWED_ROLES:
         role = 'user'
     data['role'] = role
     user = models.User(**data)
@@ -18,6 +56,17 @@ async def create_user(db: AsyncSession, user_in):
     return user
 
 
+async def set_user_role(db: AsyncSession, user_id: int, role: str):
+    res = await db.execute(select(models.User).where(models.User.id == user_id))
+    user = res.scalars().first()
+    if not user:
+        return None
+    user.role = role
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
 async def get_user(db: AsyncSession, user_id: int):
     res = await db.execute(select(models.User).where(models.User.id == user_id))
     return res.scalars().first()
@@ -31,13 +80,33 @@ async def get_user_by_external_id(db: AsyncSession, external_id: str):
 async def create_object(db: AsyncSession, obj_in):
     obj = models.Object(**obj_in.dict())
     db.add(obj)
+    mark_changed(db, "objects")
     await db.commit()
+    await publish_changes()
     await db.refresh(obj)
     return obj
 
 
-async def list_objects(db: AsyncSession, limit: int = 100):
-    res = await db.execute(select(models.Object).limit(limit))
+async def list_objects(db: AsyncSession, limit: int = 100, cursor: str | None = None, fields=None):
+    return await _fetch_page(db, _select_for(models.Object, fields), models.Object, limit, cursor, fields)
+
+
+async def _bulk_insert(db: AsyncSession, model, rows: list[dict]) -> list[int]:
+    # executemany + RETURNING: SQLAlchemy собирает многострочные INSERT ... VALUES (...), (...)
+    # ("insertmanyvalues"), id возвращаются в порядке входных строк. Коммит — на вызывающем.
+    if not rows:
+        return []
+    res = await db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return list(res.scalars().all())
+
+
+async def bulk_create_objects(db: AsyncSession, rows: list[dict]) -> list[int]:
+    mark_changed(db, "objects")
+    return await _bulk_insert(db, models.Object, rows)
+
+
+async def get_objects_by_ids(db: AsyncSession, ids):
+    res = await db.execute(select(models.Object).where(models.Object.id.in_(list(ids))))
     return res.scalars().all()
 
 
@@ -49,16 +118,15 @@ async def create_booking(db: AsyncSession, booking_in):
     return b
 
 
-async def list_bookings_by_user(db: AsyncSession, user_id: int, limit: int = 100):
-    res = await db.execute(
-        select(models.Booking).where(models.Booking.user_id == user_id).limit(limit)
-    )
-    return res.scalars().all()
+async def list_bookings_by_user(db: AsyncSession, user_id: int, limit: int = 100, cursor: str | None = None,
+                                fields=None):
+    stmt = _select_for(models.Booking, fields).where(models.Booking.user_id == user_id)
+    return await _fetch_page(db, stmt, models.Booking, limit, cursor, fields)
 
 
-async def list_all_bookings(db: AsyncSession, limit: int = 200):
-    res = await db.execute(select(models.Booking).limit(limit))
-    return res.scalars().all()
+async def list_all_bookings(db: AsyncSession, limit: int = 200, cursor: str | None = None, fields=None, **filters):
+    stmt = _apply_filters(_select_for(models.Booking, fields), models.Booking, **filters)
+    return await _fetch_page(db, stmt, models.Booking, limit, cursor, fields)
 
 
 async def update_booking_status(db: AsyncSession, booking_id: int, status: str):
@@ -72,25 +140,64 @@ async def update_booking_status(db: AsyncSession, booking_id: int, status: str):
     return b
 
 
+async def _bump_object_counters(db: AsyncSession, object_id: int | None, reviews: int = 0,
+                                rating_sum: int = 0, complaints: int = 0):
+    # Агрегаты объекта обновляются одним UPDATE с арифметикой на стороне БД —
+    # конкурентные отзывы не теряют инкременты. Правая часть видит старые значения.
+    if object_id is None:
+        return
+    o = models.Object
+    values = {}
+    if reviews:
+        values.update(
+            review_count=o.review_count + reviews,
+            review_sum=o.review_sum + rating_sum,
+            rating=(o.review_sum + rating_sum) * 1.0 / (o.review_count + reviews),
+        )
+    if complaints:
+        values["complaint_count"] = o.complaint_count + complaints
+    if reviews:
+        mark_changed(db, "objects")  # rating входит в ObjectOut
+    if values:
+        await db.execute(
+            update(o).where(o.id == object_id).values(**values).execution_options(synchronize_session=False)
+        )
+
+
 async def create_review(db: AsyncSession, review_in):
     r = models.Review(**review_in.dict())
     db.add(r)
+    await _bump_object_counters(db, r.object_id, reviews=1, rating_sum=r.rating)
     await db.commit()
+    await publish_changes()
     await db.refresh(r)
     return r
 
 
+async def bulk_create_reviews(db: AsyncSession, rows: list[dict]) -> list[int]:
+    ids = await _bulk_insert(db, models.Review, rows)
+    per_object: dict[int, list[int]] = {}
+    for row in rows:
+        acc = per_object.setdefault(row["object_id"], [0, 0])
+        acc[0] += 1
+        acc[1] += row["rating"]
+    for object_id, (n, total) in per_object.items():
+        await _bump_object_counters(db, object_id, reviews=n, rating_sum=total)
+    return ids
+
+
 async def create_complaint(db: AsyncSession, comp_in):
     c = models.Complaint(**comp_in.dict())
     db.add(c)
+    await _bump_object_counters(db, c.object_id, complaints=1)
     await db.commit()
     await db.refresh(c)
     return c
 
 
-async def list_complaints(db: AsyncSession, limit: int = 100):
-    res = await db.execute(select(models.Complaint).limit(limit))
-    return res.scalars().all()
+async def list_complaints(db: AsyncSession, limit: int = 100, cursor: str | None = None, fields=None, **filters):
+    stmt = _apply_filters(_select_for(models.Complaint, fields), models.Complaint, **filters)
+    return await _fetch_page(db, stmt, models.Complaint, limit, cursor, fields)
 
 
 async def set_complaint_status(db: AsyncSession, complaint_id: int, status: str):
@@ -107,11 +214,35 @@ async def set_complaint_status(db: AsyncSession, complaint_id: int, status: str)
 async def create_event(db: AsyncSession, event_in):
     e = models.Event(**event_in.dict())
     db.add(e)
+    mark_changed(db, "events")
     await db.commit()
+    await publish_changes()
     await db.refresh(e)
     return e
 
 
-async def list_events(db: AsyncSession, limit: int = 100):
-    res = await db.execute(select(models.Event).limit(limit))
+async def list_events(db: AsyncSession, limit: int = 100, cursor: str | None = None, fields=None):
+    return await _fetch_page(db, _select_for(models.Event, fields), models.Event, limit, cursor, fields)
+
+
+async def bulk_create_events(db: AsyncSession, rows: list[dict]) -> list[int]:
+    mark_changed(db, "events")
+    return await _bulk_insert(db, models.Event, rows)
+
+
+async def list_metric_rollups(db: AsyncSession, ts_from: datetime | None = None, ts_to: datetime | None = None,
+                              event_type: str | None = None, object_id: int | None = None, limit: int = 10000):
+    # Поминутные агрегаты событий; object_id=0 — события без объекта
+    stmt = select(models.MetricRollup)
+    if ts_from is not None:
+        stmt = stmt.where(models.MetricRollup.bucket >= ts_from)
+    if ts_to is not None:
+        stmt = stmt.where(models.MetricRollup.bucket < ts_to)
+    if event_type is not None:
+        stmt = stmt.where(models.MetricRollup.event_type == event_type)
+    if object_id is not None:
+        stmt = stmt.where(models.MetricRollup.object_id == object_id)
+    stmt = stmt.order_by(models.MetricRollup.bucket, models.MetricRollup.event_type,
+                         models.MetricRollup.object_id).limit(limit)
+    res = await db.execute(stmt)
     return res.scalars().all()
@@ -1,30 +1,144 @@
 import os
+import time
+import asyncio
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from alembic.config import Config
-from alembic import command
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL", "postgresql+asyncpg://visit:visit@db:5432/visit"
 )
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+# Настройки пула (ENV): размер, overflow, ожидание, переподключение
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# asyncpg: кэш подготовленных выражений на соединение (0 — выключить, нужно за pgbouncer)
+DB_PG_STMT_CACHE_SIZE = int(os.getenv("DB_PG_STMT_CACHE_SIZE", "500"))
+# sqlite: сколько ждать блокировку записи вместо немедленного "database is locked"
+DB_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+_pool_wait = {"count": 0, "total_sec": 0.0, "max_sec": 0.0}
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """QueuePool, который учитывает время ожидания свободного соединения."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            dt = time.perf_counter() - t0
+            _pool_wait["count"] += 1
+            _pool_wait["total_sec"] += dt
+            if dt > _pool_wait["max_sec"]:
+                _pool_wait["max_sec"] = dt
+
+
+def _engine_kwargs(url: str) -> dict:
+    kw = {"echo": False, "future": True, "pool_pre_ping": DB_POOL_PRE_PING}
+    is_sqlite = url.startswith("sqlite")
+    if is_sqlite and ":memory:" in url:
+        # in-memory база живёт в единственном соединении (StaticPool по умолчанию)
+        return kw
+    kw.update(
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if url.startswith("postgresql+asyncpg"):
+        kw["connect_args"] = {"prepared_statement_cache_size": DB_PG_STMT_CACHE_SIZE}
+    return kw
+
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    # WAL: читатели не блокируют писателя; NORMAL достаточно для WAL и заметно быстрее FULL
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA busy_timeout={DB_SQLITE_BUSY_TIMEOUT_MS}")
+    cur.close()
+
+
+engine = create_async_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+if DATABASE_URL.startswith("sqlite"):
+    event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+
+
+def pool_stats() -> dict:
+    """Снимок состояния пула соединений для подбора размеров под нагрузкой."""
+    pool = engine.sync_engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=DB_MAX_OVERFLOW,
+        )
+    n = _pool_wait["count"]
+    stats.update(
+        checkouts=n,
+        wait_avg_ms=round(_pool_wait["total_sec"] / n * 1000, 3) if n else 0.0,
+        wait_max_ms=round(_pool_wait["max_sec"] * 1000, 3),
+    )
+    return stats
+
 AsyncSessionLocal = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 Base = declarative_base()
 
 
+def dialect_insert(dialect: str):
+    """insert() с on_conflict_do_update для текущей БД (PostgreSQL или sqlite)."""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
 async def init_db():
-    # Run Alembic upgrade to head
+    # Run Alembic upgrade to head. alembic (+ диалекты DDL) импортируется только здесь —
+    # это ~0.2 с к холодному старту каждого процесса, которому миграции не нужны
+    from alembic import command
+    from alembic.config import Config
+
     alembic_cfg = Config("alembic.ini")
     command.upgrade(alembic_cfg, "head")
 
 
-async def get_session() -> AsyncSession:
-    # Для тестов на sqlite без миграций — создаём таблицы лениво
-    if DATABASE_URL.startswith("sqlite") and os.getenv("DISABLE_DB_INIT") == "1":
+_schema_ready = False
+_schema_lock = asyncio.Lock()
+
+
+async def ensure_schema() -> None:
+    """Создаёт таблицы на sqlite без миграций — один раз на процесс."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    if not (DATABASE_URL.startswith("sqlite") and os.getenv("DISABLE_DB_INIT") == "1"):
+        return
+    async with _schema_lock:
+        if _schema_ready:
+            return
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+        _schema_ready = True
+
+
+async def get_session() -> AsyncSession:
+    # Для тестов/киосков на sqlite без миграций — таблицы создаются лениво при первом запросе,
+    # дальше это одна проверка флага вместо транзакции с create_all на каждый запрос
+    if not _schema_ready:
+        await ensure_schema()
     async with AsyncSessionLocal() as session:
         yield session
@@ -0,0 +1,183 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Dict, Tuple
+from urllib.parse import urlsplit
+
+from app.metrics import UPSTREAM_LATENCY
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Общий исходящий HTTP-клиент: один httpx.AsyncClient на upstream-хост с keep-alive,
+# лимитами соединений и (если установлен h2) HTTP/2. Закрывается в lifespan приложения.
+# Лимиты/таймауты по хостам: OUTBOUND_LIMITS_JSON='{"openrouter.ai": {"timeout": 30, "max_connections": 50}}'
+# httpx (+ httpcore, anyio) импортируется при создании первого клиента, а не при импорте app.
+
+_HTTP2 = os.getenv("OUTBOUND_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+_DEFAULTS = {"timeout": 10.0, "connect_timeout": 5.0, "max_connections": 20, "max_keepalive": 10, "keepalive_expiry": 30.0}
+_BUILTIN = {
+    "openrouter.ai": {"timeout": 30.0, "max_connections": 50, "max_keepalive": 20},
+}
+
+
+def _load_limits() -> Dict[str, dict]:
+    raw = os.getenv("OUTBOUND_LIMITS_JSON")
+    try:
+        custom = json.loads(raw) if raw else {}
+    except Exception:
+        logger.warning("OUTBOUND_LIMITS_JSON is not valid JSON, using defaults")
+        custom = {}
+    merged = {h: dict(cfg) for h, cfg in _BUILTIN.items()}
+    for host, cfg in custom.items():
+        if isinstance(cfg, dict):
+            merged.setdefault(host, {}).update(cfg)
+    return merged
+
+
+class _TimedTransport:
+    """Замеряет время до заголовков ответа для каждого upstream.
+    Интерфейс httpx.AsyncBaseTransport без наследования — чтобы не импортировать httpx заранее."""
+
+    def __init__(self, inner: "httpx.AsyncBaseTransport", upstream: str, stats: dict):
+        self._inner = inner
+        self._upstream = upstream
+        self._stats = stats
+
+    async def __aenter__(self):
+        await self._inner.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._inner.__aexit__(*exc)
+
+    async def handle_async_request(self, request: "httpx.Request") -> "httpx.Response":
+        if request.extensions.get("warmup"):
+            # Прогрев — не запрос к upstream: в латентность и счётчики запросов не входит
+            self._stats["warmups"] += 1
+            try:
+                return await self._inner.handle_async_request(request)
+            finally:
+                self._stats["last_at"] = time.monotonic()
+        t0 = time.perf_counter()
+        failed = False
+        try:
+            return await self._inner.handle_async_request(request)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            dt = time.perf_counter() - t0
+            st = self._stats
+            st["count"] += 1
+            st["errors"] += failed
+            st["total_sec"] += dt
+            st["max_sec"] = max(st["max_sec"], dt)
+            st["last_at"] = time.monotonic()
+            if UPSTREAM_LATENCY:
+                UPSTREAM_LATENCY.labels(self._upstream).observe(dt)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class OutboundHTTP:
+    def __init__(self):
+        self._limits = _load_limits()
+        # host -> (event loop, client): соединения httpx привязаны к циклу событий
+        self._clients: Dict[str, Tuple[asyncio.AbstractEventLoop, "httpx.AsyncClient"]] = {}
+        self._stats: Dict[str, dict] = {}
+
+    def _config(self, host: str) -> dict:
+        cfg = dict(_DEFAULTS)
+        cfg.update(self._limits.get(host, {}))
+        return cfg
+
+    def _build(self, host: str) -> "httpx.AsyncClient":
+        import httpx
+
+        cfg = self._config(host)
+        stats = self._stats.setdefault(host, {"count": 0, "errors": 0, "total_sec": 0.0, "max_sec": 0.0, "last_at": 0.0,
+                                                "warmups": 0})
+        limits = httpx.Limits(
+            max_connections=int(cfg["max_connections"]),
+            max_keepalive_connections=int(cfg["max_keepalive"]),
+            keepalive_expiry=float(cfg["keepalive_expiry"]),
+        )
+        inner = httpx.AsyncHTTPTransport(limits=limits, http2=_HTTP2, retries=1)
+        return httpx.AsyncClient(
+            transport=_TimedTransport(inner, host, stats),
+            timeout=httpx.Timeout(float(cfg["timeout"]), connect=float(cfg["connect_timeout"])),
+        )
+
+    def client_for(self, url: str) -> "httpx.AsyncClient":
+        """Клиент для хоста из url (создаётся лениво, переиспользуется между запросами)."""
+        host = urlsplit(url).hostname or url
+        loop = asyncio.get_running_loop()
+        entry = self._clients.get(host)
+        if entry is None or entry[0] is not loop or entry[1].is_closed:
+            if entry is not None:
+                self._discard(host, *entry)
+            entry = self._clients[host] = (loop, self._build(host))
+        return entry[1]
+
+    def _discard(self, host: str, owner: asyncio.AbstractEventLoop, client: "httpx.AsyncClient") -> None:
+        # Клиент чужого цикла нельзя закрыть отсюда await-ом: закрываем в его цикле,
+        # если тот ещё работает; соединения закрытого цикла уже не обслужить — только лог
+        if client.is_closed:
+            return
+        if owner.is_running() and owner is not asyncio.get_running_loop():
+            asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+        else:
+            logger.info(f"Outbound client for {host} belongs to a stopped event loop, dropping it unclosed")
+
+    async def warm(self, url: str) -> None:
+        """Заранее открывает соединение (TCP+TLS) к хосту, если к нему давно не ходили.
+
+        Вызывается параллельно с локальной подготовкой запроса, чтобы рукопожатие
+        не добавлялось к латентности. Ошибки не важны — основной запрос повторит попытку.
+        """
+        parts = urlsplit(url)
+        host = parts.hostname or url
+        client = self.client_for(url)
+        # Был запрос в пределах keepalive_expiry — keep-alive соединение ещё в пуле
+        st = self._stats.get(host)
+        if st and time.monotonic() - st["last_at"] < float(self._config(host)["keepalive_expiry"]) * 0.9:
+            return
+        try:
+            await client.head(f"{parts.scheme}://{parts.netloc}/", timeout=float(self._config(host)["connect_timeout"]),
+                              extensions={"warmup": True})
+        except Exception as e:
+            logger.debug(f"Warm-up of {host} failed: {e}")
+
+    def stats(self) -> dict:
+        out = {}
+        for host, st in self._stats.items():
+            n = st["count"]
+            out[host] = {
+                "requests": n,
+                "errors": st["errors"],
+                "avg_ms": round(st["total_sec"] / n * 1000, 2) if n else 0.0,
+                "max_ms": round(st["max_sec"] * 1000, 2),
+                "warmups": st["warmups"],
+                "http2": _HTTP2,
+            }
+        return out
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for host, (owner, client) in clients.items():
+            if owner is loop:
+                await client.aclose()
+            else:
+                self._discard(host, owner, client)
+
+
+outbound = OutboundHTTP()
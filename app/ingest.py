@@ -0,0 +1,243 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional
+
+from sqlalchemy import exc, insert
+
+from app.database import dialect_insert, engine, ensure_schema
+from app.metrics import INGEST_EVENTS, INGEST_FLUSH_SECONDS, INGEST_QUEUE_DEPTH
+from app.models import MetricEvent, MetricRollup
+
+logger = logging.getLogger(__name__)
+
+# Приём событий фронтенда/киосков: POST /metrics/ingest только кладёт события в
+# ограниченную очередь в памяти и сразу отвечает. Фоновый writer раз в
+# METRICS_FLUSH_SEC (или когда набралась пачка) пишет одной транзакцией сырые события
+# в append-only metric_events и прибавляет поминутные счётчики в metric_rollups —
+# дашборды читают только rollups.
+
+_MAX_TYPE_LEN = 64
+_MAX_PROPS_BYTES = 2048
+_FUTURE_SKEW_SEC = 300
+_INT32 = 2 ** 31  # object_id — INTEGER в metric_events/metric_rollups
+
+
+def _parse_ts(value, now: float) -> Optional[float]:
+    if value is None:
+        return now
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        ts = value / 1000.0 if value > 1e11 else float(value)  # миллисекунды из JS Date.now()
+    elif isinstance(value, str):
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        ts = (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+    else:
+        return None
+    return min(ts, now + _FUTURE_SKEW_SEC)
+
+
+def parse_event(raw, now: float) -> Optional[dict]:
+    """Нормализует событие клиента; None — если оно некорректно."""
+    if not isinstance(raw, dict):
+        return None
+    etype = raw.get("type") or raw.get("event")
+    if not isinstance(etype, str) or not etype or len(etype) > _MAX_TYPE_LEN:
+        return None
+    object_id = raw.get("object_id")
+    if object_id is not None and (isinstance(object_id, bool) or not isinstance(object_id, int)
+                                  or not -_INT32 <= object_id < _INT32):
+        return None
+    ts = _parse_ts(raw.get("ts"), now)
+    if ts is None:
+        return None
+    session = raw.get("session")
+    props = raw.get("props")
+    props_json = None
+    if isinstance(props, dict) and props:
+        props_json = json.dumps(props, ensure_ascii=False, separators=(",", ":"))
+        if len(props_json) > _MAX_PROPS_BYTES:
+            props_json = None
+    return {
+        "ts": datetime.fromtimestamp(int(ts), tz=timezone.utc),
+        "event_type": etype,
+        "object_id": object_id,
+        "session": session[:64] if isinstance(session, str) else None,
+        "props": props_json,
+    }
+
+
+def _db_unavailable(e: Exception) -> bool:
+    # Соединение, блокировка, таймаут пула — пачку стоит повторить позже. Остальное —
+    # БД отвергла сами данные: повтор той же пачки не поможет
+    if isinstance(e, exc.DBAPIError) and e.connection_invalidated:
+        return True
+    return isinstance(e, (exc.OperationalError, exc.InterfaceError, exc.TimeoutError,
+                          OSError, asyncio.TimeoutError))
+
+
+def _rollup_insert(dialect: str):
+    stmt = dialect_insert(dialect)(MetricRollup)
+    return stmt.on_conflict_do_update(
+        index_elements=[MetricRollup.bucket, MetricRollup.event_type, MetricRollup.object_id],
+        set_={"count": MetricRollup.count + stmt.excluded["count"]},
+    )
+
+
+class MetricsPipeline:
+    def __init__(self, engine, max_queue: int = 100_000, batch_max: int = 5000, flush_interval: float = 1.0):
+        self.engine = engine
+        self.max_queue = max_queue
+        self.batch_max = batch_max
+        self.flush_interval = flush_interval
+        self._queue: Deque[dict] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.stats_counts = {"accepted": 0, "dropped": 0, "invalid": 0, "written": 0, "failed": 0, "flushes": 0}
+
+    def _count(self, outcome: str, n: int) -> None:
+        if n:
+            self.stats_counts[outcome] += n
+            if INGEST_EVENTS:
+                INGEST_EVENTS.labels(outcome).inc(n)
+
+    def offer(self, events: List[dict], invalid: int = 0) -> int:
+        """Кладёт события в очередь без ожидания; возвращает, сколько принято."""
+        room = max(0, self.max_queue - len(self._queue))
+        accepted = events[:room]
+        self._queue.extend(accepted)
+        self._count("accepted", len(accepted))
+        self._count("dropped", len(events) - len(accepted))
+        self._count("invalid", invalid)
+        if INGEST_QUEUE_DEPTH:
+            INGEST_QUEUE_DEPTH.set(len(self._queue))
+        if self._wakeup is not None and len(self._queue) >= self.batch_max:
+            self._wakeup.set()
+        return len(accepted)
+
+    async def _write(self, batch: List[dict]) -> None:
+        rollups = Counter()
+        for ev in batch:
+            bucket = ev["ts"].replace(second=0)
+            rollups[(bucket, ev["event_type"], ev["object_id"] or 0)] += 1
+        # Ключи по порядку — конкурентные воркеры берут блокировки строк в одной последовательности
+        rollup_rows = [
+            {"bucket": b, "event_type": t, "object_id": o, "count": n}
+            for (b, t, o), n in sorted(rollups.items())
+        ]
+        await ensure_schema()
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(MetricEvent), batch)
+            await conn.execute(_rollup_insert(conn.dialect.name), rollup_rows)
+
+    async def _write_batch(self, batch: List[dict]) -> bool:
+        """Пишет пачку; False — БД недоступна, недописанное вернулось в очередь.
+        Пачку, которую БД отвергла, делит пополам, пока не найдёт плохие события —
+        они отбрасываются (failed), остальные пишутся."""
+        parts = [batch]
+        rejected = 0
+        last_error = None
+        while parts:
+            part = parts.pop()
+            t0 = time.perf_counter()
+            try:
+                await self._write(part)
+            except Exception as e:
+                if _db_unavailable(e):
+                    # Возвращаем недописанное в голову очереди, если есть место
+                    rest = part + [ev for p in reversed(parts) for ev in p]
+                    room = max(0, self.max_queue - len(self._queue))
+                    self._queue.extendleft(reversed(rest[:room]))
+                    self._count("failed", len(rest) - min(room, len(rest)))
+                    logger.warning(f"Metrics flush failed ({len(rest)} events): {e}")
+                    return False
+                if len(part) == 1:
+                    rejected += 1
+                    last_error = e
+                else:
+                    mid = len(part) // 2
+                    parts += [part[mid:], part[:mid]]
+                continue
+            self._count("written", len(part))
+            self.stats_counts["flushes"] += 1
+            if INGEST_FLUSH_SECONDS:
+                INGEST_FLUSH_SECONDS.observe(time.perf_counter() - t0)
+        if rejected:
+            self._count("failed", rejected)
+            logger.warning(f"Metrics flush dropped {rejected} events rejected by the database: {last_error}")
+        return True
+
+    async def flush(self) -> int:
+        """Пишет всё, что накопилось в очереди, пачками по batch_max."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            before = self.stats_counts["written"]
+            while self._queue:
+                n = min(len(self._queue), self.batch_max)
+                if not await self._write_batch([self._queue.popleft() for _ in range(n)]):
+                    break
+            if INGEST_QUEUE_DEPTH:
+                INGEST_QUEUE_DEPTH.set(len(self._queue))
+            return self.stats_counts["written"] - before
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Metrics writer error: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._stopping = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        # Без cancel: пачка, которую writer пишет в момент остановки, дописывается
+        if self._task is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        self._wakeup = None
+        await self.flush()  # остаток очереди при остановке
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "running": self._task is not None and not self._task.done(),
+            **self.stats_counts,
+        }
+
+
+def build_pipeline_from_env(engine) -> MetricsPipeline:
+    return MetricsPipeline(
+        engine,
+        max_queue=int(os.getenv("METRICS_QUEUE_MAX", "100000")),
+        batch_max=int(os.getenv("METRICS_BATCH_MAX", "5000")),
+        flush_interval=float(os.getenv("METRICS_FLUSH_SEC", "1")),
+    )
+
+
+metrics_pipeline = build_pipeline_from_env(engine)
@@ -1,11 +1,31 @@
-from typing import List, Dict, Any, Optional
+import os
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+
+from app.http_client import outbound
+
+if TYPE_CHECKING:
+    import httpx
 
 # Заглушечные адаптеры интеграций. Замените на реальные вызовы API.
 
-class BookingAdapter:
+
+class BaseAdapter:
+    # Реальные вызовы API делать через self.client — общий пул соединений
+    # (app.http_client): keep-alive, лимиты и таймауты по хосту, замеры латентности upstream.
+    BASE_URL = ""
+
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key
 
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """Клиент общего пула для BASE_URL партнёра — для будущих вызовов API."""
+        return outbound.client_for(self.BASE_URL)
+
+
+class BookingAdapter(BaseAdapter):
+    BASE_URL = os.getenv("BOOKING_API_URL", "https://distribution-xml.booking.com")
+
     async def search(self, query: str) -> List[Dict[str, Any]]:
         # TODO: Реализовать вызов Booking API (при наличии разрешения и ключей)
         return [
@@ -17,9 +37,8 @@ class BookingAdapter:
         return {"id": item_id, "name": "Booking Item", "details": "Mock details"}
 
 
-class TripAdvisorAdapter:
-    def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key
+class TripAdvisorAdapter(BaseAdapter):
+    BASE_URL = os.getenv("TRIPADVISOR_API_URL", "https://api.content.tripadvisor.com/api/v1")
 
     async def search(self, query: str) -> List[Dict[str, Any]]:
         # TODO: Реализовать вызов TripAdvisor API
@@ -32,9 +51,8 @@ class TripAdvisorAdapter:
         return {"id": item_id, "name": "TripAdvisor Item", "details": "Mock details"}
 
 
-class FreedomTravelAdapter:
-    def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key
+class FreedomTravelAdapter(BaseAdapter):
+    BASE_URL = os.getenv("FREEDOM_TRAVEL_API_URL", "")
 
     async def search(self, query: str) -> List[Dict[str, Any]]:
         # TODO: Реализовать вызов Freedom Travel API
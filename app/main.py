@@ -1,6 +1,8 @@
 """Main FastAPI Application"""
+import asyncio
 import os
 import logging
+import time
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -16,16 +18,61 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+from app.ai_service import OPENROUTER_URL, ai_service
 from app.api import router
-from app.database import init_db
+from app.catalog_cache import catalog_cache
+from app.database import engine, init_db, ensure_schema
+from app.http_client import outbound
+from app.ingest import metrics_pipeline
+from app.observability import MetricsMiddleware, instrument_engine, loop_lag
+from app.observability import router as observability_router
+from app.profiling import ProfilingMiddleware
+from app.rate_limit import RateLimitMiddleware
+from app.versions import catalog_versions
 
 logger = logging.getLogger(__name__)
 
+_warm_state = {"status": "pending"}
+
+
+async def _warm_optional() -> None:
+    """Прогрев необязательных подсистем уже после старта: /health отвечает сразу,
+    а соединение с OpenRouter, ключи JWKS и первые страницы каталога готовятся в фоне."""
+    t0 = time.perf_counter()
+    jobs = [catalog_cache.warm()]
+    if ai_service.openrouter_api_key:
+        jobs.append(outbound.warm(OPENROUTER_URL))
+    jwks_url = os.getenv("OIDC_JWKS_URL")
+    if jwks_url:
+        from app.oidc import get_jwks_cache
+        jobs.append(get_jwks_cache(jwks_url).refresh())
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    failed = [str(r) for r in results if isinstance(r, Exception)]
+    if failed:
+        logger.warning(f"Optional warm-up failed: {failed}")
+    _warm_state.update(status="done", ms=round((time.perf_counter() - t0) * 1000, 1), failed=len(failed))
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize database on startup"""
     logger.info("Application starting...")
+    await ensure_schema()
+    loop_lag.start()
+    metrics_pipeline.start()
+    catalog_versions.start()
+    warm_task = None
+    if os.getenv("STARTUP_WARM", "1") == "1":
+        warm_task = asyncio.get_running_loop().create_task(_warm_optional())
     yield
+    if warm_task is not None and not warm_task.done():
+        # Даём прогреву закончить начатые запросы к БД, остальное отменяем
+        await asyncio.wait({warm_task}, timeout=2)
+        warm_task.cancel()
+    await metrics_pipeline.stop()
+    await catalog_versions.stop()
+    await loop_lag.stop()
+    await outbound.aclose()
     logger.info("Application shutting down")
 
 
@@ -33,11 +80,29 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="Visit Aqmola API",
     description="Tourism platform for Akmola Region",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
+# Профилирование по правилам админа (/admin/profiling); без правил — сквозной проход
+app.add_middleware(ProfilingMiddleware)
+# Rate limiting (GCRA) для /api/v1: лимиты по шаблонам маршрутов из RATE_LIMITS_JSON
+app.add_middleware(RateLimitMiddleware)
+# Метрики — внешний слой: учитываются и ответы 429
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine.sync_engine)
+
+@app.get("/health", tags=["health"])
+async def health():
+    """Liveness для оркестратора (scale-to-zero): без БД и внешних сервисов, доступен
+    сразу после старта, не дожидаясь фонового прогрева."""
+    return {"status": "ok", "warm": _warm_state}
+
+
 # Include API routes
 app.include_router(router, prefix="/api/v1")
+# /api/health, /api/health/live, /metrics
+app.include_router(observability_router)
 
 
 # Serve static files
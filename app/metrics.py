@@ -1,12 +1,84 @@
 import os
 try:
-    from prometheus_client import Counter
+    from prometheus_client import Counter, Gauge, Histogram
 except ImportError:
     Counter = None
+    Gauge = None
+    Histogram = None
 
 ENABLED = os.getenv("METRICS_ENABLED", "1") == "1" and Counter is not None
 
 if ENABLED:
     ADMIN_ACTIONS_TOTAL = Counter("admin_actions_total", "Admin/moderator protected actions performed")
+    ROLE_CACHE_HITS = Counter("auth_role_cache_hits_total", "Role lookups served from the in-process cache")
+    ROLE_CACHE_MISSES = Counter("auth_role_cache_misses_total", "Role lookups that went to the database")
+    AI_CACHE_HITS = Counter("ai_cache_hits_total", "AI chat replies served from the response cache")
+    AI_CACHE_MISSES = Counter("ai_cache_misses_total", "AI chat prompts not found in the response cache")
+    AI_COALESCED = Counter("ai_coalesced_total", "AI chat calls that joined an identical in-flight upstream request")
+    UPSTREAM_LATENCY = Histogram(
+        "upstream_request_seconds", "Outbound HTTP time to response headers", ["upstream"],
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    )
+    BULKHEAD_ACTIVE = Gauge("bulkhead_active", "Calls currently holding a bulkhead slot", ["bulkhead"])
+    BULKHEAD_QUEUE_DEPTH = Gauge("bulkhead_queue_depth", "Calls waiting for a bulkhead slot", ["bulkhead"])
+    BULKHEAD_WAIT = Histogram(
+        "bulkhead_wait_seconds", "Time spent waiting for a bulkhead slot", ["bulkhead"],
+        buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    BULKHEAD_REJECTED = Counter("bulkhead_rejected_total", "Calls shed by a bulkhead", ["bulkhead", "reason"])
+    HTTP_REQUEST_DURATION = Histogram(
+        "http_request_duration_seconds", "HTTP request latency by route template", ["method", "route", "status"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )
+    HTTP_INFLIGHT = Gauge("http_requests_in_flight", "HTTP requests being processed", ["route"])
+    HTTP_RESPONSE_SIZE = Histogram(
+        "http_response_size_bytes", "HTTP response body size", ["route"],
+        buckets=(100, 1000, 10_000, 100_000, 1_000_000, 10_000_000),
+    )
+    DB_QUERY_DURATION = Histogram(
+        "db_query_duration_seconds", "SQL statement execution time", ["operation"],
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+    )
+    DB_QUERIES_PER_REQUEST = Histogram(
+        "db_queries_per_request", "SQL statements executed per HTTP request", ["route"],
+        buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+    )
+    EVENT_LOOP_LAG = Histogram(
+        "event_loop_lag_seconds", "Delay of a periodic event loop tick",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+    )
+    INGEST_QUEUE_DEPTH = Gauge("metrics_ingest_queue_depth", "Client events waiting for the ingest writer")
+    INGEST_EVENTS = Counter("metrics_ingest_events_total", "Client events by ingest outcome", ["outcome"])
+    INGEST_FLUSH_SECONDS = Histogram(
+        "metrics_ingest_flush_seconds", "Time to write one ingest batch with its rollups",
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    )
+    CATALOG_CACHE_REQUESTS = Counter(
+        "catalog_cache_requests_total", "Catalog page lookups by result (hit, miss, bypass)", ["collection", "result"]
+    )
+    CATALOG_CACHE_EVICTIONS = Counter("catalog_cache_evictions_total", "Catalog pages evicted by size limits")
+    CATALOG_CACHE_BYTES = Gauge("catalog_cache_bytes", "Bytes of rendered catalog pages held in the cache")
 else:
     ADMIN_ACTIONS_TOTAL = None
+    ROLE_CACHE_HITS = None
+    ROLE_CACHE_MISSES = None
+    AI_CACHE_HITS = None
+    AI_CACHE_MISSES = None
+    AI_COALESCED = None
+    UPSTREAM_LATENCY = None
+    BULKHEAD_ACTIVE = None
+    BULKHEAD_QUEUE_DEPTH = None
+    BULKHEAD_WAIT = None
+    BULKHEAD_REJECTED = None
+    HTTP_REQUEST_DURATION = None
+    HTTP_INFLIGHT = None
+    HTTP_RESPONSE_SIZE = None
+    DB_QUERY_DURATION = None
+    DB_QUERIES_PER_REQUEST = None
+    EVENT_LOOP_LAG = None
+    INGEST_QUEUE_DEPTH = None
+    INGEST_EVENTS = None
+    INGEST_FLUSH_SECONDS = None
+    CATALOG_CACHE_REQUESTS = None
+    CATALOG_CACHE_EVICTIONS = None
+    CATALOG_CACHE_BYTES = None
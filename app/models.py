@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, DateTime, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -9,6 +10,13 @@ try:
 except Exception:
     Vector = None  # type: ignore
 
+# В SQLite server_default=now() пишет 'YYYY-MM-DD HH:MM:SS' без микросекунд. Параметры
+# сериализуем в том же формате, иначе строковое сравнение в keyset-курсоре ломается.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -22,17 +30,28 @@ class User(Base):
 
 class Object(Base):
     __tablename__ = "objects"
+    __table_args__ = (Index("ix_objects_created_at_id", "created_at", "id"),)
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(300), nullable=False)
     description = Column(Text)
     lat = Column(Float)
     lon = Column(Float)
     rating = Column(Float, default=0.0)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Инкрементальные агрегаты для скоринга (поддерживаются в crud при записи)
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    review_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    complaint_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(Timestamp, server_default=func.now())
 
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        Index("ix_bookings_created_at_id", "created_at", "id"),
+        Index("ix_bookings_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_bookings_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_bookings_object_id_created_at_id", "object_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     object_id = Column(Integer, ForeignKey("objects.id"), nullable=False)
@@ -40,7 +59,7 @@ class Booking(Base):
     end_date = Column(String(50))
     status = Column(String(50), default="pending")
     payment_order_id = Column(String(100), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
 
     user = relationship("User")
     object = relationship("Object")
@@ -61,6 +80,12 @@ class Review(Base):
 
 class Complaint(Base):
     __tablename__ = "complaints"
+    __table_args__ = (
+        Index("ix_complaints_created_at_id", "created_at", "id"),
+        Index("ix_complaints_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_complaints_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_complaints_object_id_created_at_id", "object_id", "created_at", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     object_id = Column(Integer, ForeignKey("objects.id"), nullable=True)
@@ -70,7 +95,7 @@ class Complaint(Base):
     lat = Column(Float, nullable=True)
     lon = Column(Float, nullable=True)
     status = Column(String(50), default="new")  # new, in_review, resolved, rejected
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
 
     user = relationship("User")
     object = relationship("Object")
@@ -78,6 +103,7 @@ class Complaint(Base):
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (Index("ix_events_created_at_id", "created_at", "id"),)
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(300), nullable=False)
     description = Column(Text)
@@ -85,7 +111,47 @@ class Event(Base):
     end_at = Column(String(50))
     lat = Column(Float, nullable=True)
     lon = Column(Float, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    jti = Column(String(64), unique=True, nullable=False)
+    exp = Column(Integer, nullable=False, index=True)  # unix time; после него запись не нужна
+    created_at = Column(Timestamp, server_default=func.now())
+
+
+class MetricEvent(Base):
+    """Сырые события фронтенда/киосков (append-only, пишет фоновый writer пачками)."""
+    __tablename__ = "metric_events"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ts = Column(Timestamp, nullable=False, index=True)
+    event_type = Column(String(64), nullable=False)
+    object_id = Column(Integer, nullable=True)
+    session = Column(String(64), nullable=True)
+    props = Column(Text, nullable=True)  # JSON
+
+
+class CatalogVersion(Base):
+    """Версия коллекции каталога: растёт после commit записи в коллекцию, отдельной
+    короткой транзакцией (versions.publish_changes). Между commit и публикацией другие
+    воркеры ещё видят старую версию. Воркеры опрашивают таблицу и по смене версии
+    сбрасывают свои кэши."""
+    __tablename__ = "catalog_versions"
+    collection = Column(String(32), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Timestamp, nullable=False)
+
+
+class MetricRollup(Base):
+    """Поминутные счётчики по типу события и объекту (object_id=0 — без объекта)."""
+    __tablename__ = "metric_rollups"
+    __table_args__ = (Index("ix_metric_rollups_object_id_bucket", "object_id", "bucket"),)
+    bucket = Column(Timestamp, primary_key=True)
+    event_type = Column(String(64), primary_key=True)
+    object_id = Column(Integer, primary_key=True, default=0)
+    count = Column(Integer, nullable=False, default=0)
 
 
 class RAGEmbedding(Base):
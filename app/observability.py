@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import APIRouter, Response
+from sqlalchemy import event, text
+
+from app.database import engine, pool_stats
+from app.metrics import (
+    DB_QUERIES_PER_REQUEST, DB_QUERY_DURATION, ENABLED, EVENT_LOOP_LAG,
+    HTTP_INFLIGHT, HTTP_REQUEST_DURATION, HTTP_RESPONSE_SIZE,
+)
+from app.rate_limit import route_template
+
+logger = logging.getLogger(__name__)
+
+# Метрики HTTP (по шаблонам маршрутов), время SQL через события SQLAlchemy,
+# лаг event loop и /api/health. Всё дешёвое: на запрос — один regex (общий с лимитером)
+# и несколько observe(); на SQL-запрос — два perf_counter().
+
+# Статистика SQL текущего HTTP-запроса: {"queries": n, "db_sec": t}
+_request_db: ContextVar[Optional[dict]] = ContextVar("request_db", default=None)
+
+
+def current_db_stats() -> Optional[dict]:
+    return _request_db.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    dt = time.perf_counter() - starts.pop()
+    stats = _request_db.get()
+    if stats is not None:
+        stats["queries"] += 1
+        stats["db_sec"] += dt
+    if DB_QUERY_DURATION:
+        op = statement.lstrip()[:6].upper()
+        if op not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+            op = "OTHER"
+        DB_QUERY_DURATION.labels(op).observe(dt)
+
+
+def instrument_engine(sync_engine) -> None:
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """Латентность, запросы в работе и размер ответа по шаблону маршрута + число SQL на запрос.
+    Чистый ASGI — стриминг (SSE) не буферизуется; заголовок Server-Timing с временем БД."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = route_template(scope)
+        db = {"queries": 0, "db_sec": 0.0}
+        token = _request_db.set(db)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", f"db;dur={db['db_sec'] * 1000:.1f};desc=\"{db['queries']} queries\"".encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        if HTTP_INFLIGHT:
+            HTTP_INFLIGHT.labels(route).inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            dt = time.perf_counter() - t0
+            _request_db.reset(token)
+            if ENABLED:
+                HTTP_INFLIGHT.labels(route).dec()
+                HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status)).observe(dt)
+                HTTP_RESPONSE_SIZE.labels(route).observe(size)
+                DB_QUERIES_PER_REQUEST.labels(route).observe(db["queries"])
+
+
+class LoopLagMonitor:
+    """Периодический тик: насколько позже запланированного он просыпается —
+    столько же ждут готовые к работе корутины (блокирующий код в event loop)."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_sec = 0.0
+        self.max_sec = 0.0
+        self.ticks = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            t0 = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - t0 - self.interval)
+            self.last_sec = lag
+            self.max_sec = max(self.max_sec, lag)
+            self.ticks += 1
+            if EVENT_LOOP_LAG:
+                EVENT_LOOP_LAG.observe(lag)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "lag_ms": round(self.last_sec * 1000, 2),
+            "max_lag_ms": round(self.max_sec * 1000, 2),
+            "ticks": self.ticks,
+        }
+
+
+loop_lag = LoopLagMonitor(float(os.getenv("LOOP_LAG_INTERVAL_SEC", "0.5")))
+_started_at = time.monotonic()
+
+router = APIRouter()
+
+
+@router.get("/api/health/live", tags=["health"])
+async def health_live():
+    """Liveness: процесс отвечает, без обращений к зависимостям."""
+    return {"status": "ok"}
+
+
+@router.get("/api/health", tags=["health"])
+async def health(response: Response):
+    """Readiness: проверка БД, состояние пула соединений и лаг event loop."""
+    checks = {}
+    t0 = time.perf_counter()
+    try:
+        async with engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), float(os.getenv("HEALTH_DB_TIMEOUT_SEC", "2")))
+        checks["db"] = {"ok": True, "ms": round((time.perf_counter() - t0) * 1000, 2)}
+    except Exception as e:
+        checks["db"] = {"ok": False, "error": str(e)[:200]}
+    ok = all(c["ok"] for c in checks.values())
+    if not ok:
+        response.status_code = 503
+    return {
+        "status": "ok" if ok else "unavailable",
+        "checks": checks,
+        "db_pool": pool_stats(),
+        "event_loop": loop_lag.stats(),
+        "uptime_sec": round(time.monotonic() - _started_at, 1),
+    }
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not ENABLED:
+        return Response("metrics disabled (METRICS_ENABLED=0 or prometheus_client not installed)\n",
+                        status_code=503, media_type="text/plain")
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY, generate_latest
+
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # uvicorn --workers N: собираем метрики всех воркеров
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
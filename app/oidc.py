@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import jwt as JWT
+
+from app.http_client import outbound
+
+logger = logging.getLogger(__name__)
+
+# Кэш JWKS провайдера OIDC (eGov): один на процесс и URL. Ключи отдаются из памяти,
+# по истечении TTL обновляются в фоне (пока отдаём прежние), при неизвестном kid
+# (ротация ключей) — внеочередной запрос, но не чаще OIDC_JWKS_MIN_REFETCH_SEC.
+# Вся сеть — через общий асинхронный клиент (app.http_client), event loop не блокируется.
+
+
+class JWKSCache:
+    def __init__(self, url: str, ttl: float = 3600.0, min_refetch_interval: float = 30.0, timeout: float = 5.0):
+        self.url = url
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self._keys: Dict[Optional[str], Any] = {}
+        self._fetched_at = 0.0
+        self._last_attempt = float("-inf")
+        self._inflight: Optional[asyncio.Task] = None
+        self.fetches = 0
+
+    async def _fetch(self) -> None:
+        self.fetches += 1
+        resp = await outbound.client_for(self.url).get(self.url, timeout=self.timeout)
+        resp.raise_for_status()
+        data = resp.json()
+        keys: Dict[Optional[str], Any] = {}
+        for jwk in data.get("keys", []):
+            try:
+                k = JWT.PyJWK(jwk)
+            except Exception:
+                continue  # неподдерживаемый тип/алгоритм ключа
+            keys[k.key_id] = k
+        if not keys:
+            raise JWT.PyJWKClientError("JWKS contains no usable keys")
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def _fetching(self) -> bool:
+        t = self._inflight
+        return t is not None and not t.done() and t.get_loop() is asyncio.get_running_loop()
+
+    def _may_refetch(self) -> bool:
+        return time.monotonic() - self._last_attempt >= self.min_refetch_interval
+
+    def _start_fetch(self) -> asyncio.Task:
+        # single-flight: конкурентные запросы ждут один и тот же fetch
+        t = self._inflight
+        if not self._fetching():
+            self._last_attempt = time.monotonic()
+            t = self._inflight = asyncio.get_running_loop().create_task(self._fetch())
+            t.add_done_callback(self._log_failure)
+        return t
+
+    @staticmethod
+    def _log_failure(t: asyncio.Task) -> None:
+        if not t.cancelled() and t.exception() is not None:
+            logger.warning(f"JWKS fetch failed: {t.exception()}")
+
+    async def refresh(self) -> None:
+        await self._start_fetch()
+
+    async def get_signing_key(self, kid: Optional[str]) -> Any:
+        if not self._keys:
+            # Ключей нет (JWKS недоступен): новый запрос к провайдеру не чаще
+            # min_refetch_interval, до этого — сразу ошибка, а не fetch на каждый вход
+            if not self._fetching() and not self._may_refetch():
+                raise JWT.PyJWKClientError("JWKS is unavailable, retry later")
+            await self.refresh()
+        elif time.monotonic() - self._fetched_at > self.ttl and self._may_refetch():
+            self._start_fetch()  # фоновое обновление, отвечаем текущими ключами
+        key = self._lookup(kid)
+        if key is None and self._may_refetch():
+            await self.refresh()
+            key = self._lookup(kid)
+        if key is None:
+            raise JWT.PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+        return key
+
+    def _lookup(self, kid: Optional[str]) -> Any:
+        key = self._keys.get(kid)
+        if key is None and kid is None and len(self._keys) == 1:
+            key = next(iter(self._keys.values()))
+        return key
+
+    async def get_signing_key_from_jwt(self, token: str) -> Any:
+        header = JWT.get_unverified_header(token)
+        return (await self.get_signing_key(header.get("kid"))).key
+
+
+_caches: Dict[str, JWKSCache] = {}
+
+
+def get_jwks_cache(url: str) -> JWKSCache:
+    cache = _caches.get(url)
+    if cache is None:
+        cache = _caches[url] = JWKSCache(
+            url,
+            ttl=float(os.getenv("OIDC_JWKS_TTL_SEC", "3600")),
+            min_refetch_interval=float(os.getenv("OIDC_JWKS_MIN_REFETCH_SEC", "30")),
+            timeout=float(os.getenv("OIDC_JWKS_TIMEOUT_SEC", "5")),
+        )
+    return cache
@@ -0,0 +1,45 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import literal, tuple_
+
+# Keyset-пагинация по (created_at, id): курсор — непрозрачная base64-строка
+# с последней парой ключей страницы. Глубокие страницы стоят столько же,
+# сколько первая, в отличие от OFFSET.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id_: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id_], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбирает курсор; ValueError, если он повреждён."""
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        ts, id_ = json.loads(base64.urlsafe_b64decode(cursor + pad).decode())
+        return datetime.fromisoformat(ts), int(id_)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def paginate(stmt, model, cursor: Optional[str], limit: int):
+    """Добавляет к select стабильный порядок (created_at DESC, id DESC) и условие курсора."""
+    if cursor:
+        ts, id_ = decode_cursor(cursor)
+        # literal с типом колонки — чтобы параметр сериализовался так же, как хранится
+        key = tuple_(literal(ts, model.created_at.type), literal(id_, model.id.type))
+        stmt = stmt.where(tuple_(model.created_at, model.id) < key)
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit)
+
+
+def next_cursor(items: Sequence[Any], limit: int) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница неполная."""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
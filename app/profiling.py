@@ -0,0 +1,224 @@
+import cProfile
+import io
+import itertools
+import marshal
+import os
+import pstats
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Optional
+
+from app.rate_limit import route_template
+
+# Профилирование по запросу админа без передеплоя. Админ включает правило: шаблон
+# маршрута (+ доля запросов) и/или токен для заголовка X-Profile — тогда профилируется
+# один конкретный запрос. Пока правил нет, middleware — одна проверка пустого dict.
+#
+# Режимы: cprofile — детерминированный профиль (pstats, открывается в snakeviz);
+# stack — сэмплы стека потока event loop раз в PROFILING_SAMPLE_MS (collapsed stacks
+# для flamegraph). Оба видят весь поток, т.е. и корутины соседних запросов, поэтому
+# в процессе одновременно профилируется не больше одного запроса.
+
+PROFILE_HEADER = b"x-profile"
+MODES = ("cprofile", "stack")
+
+
+class ProfileRule:
+    def __init__(self, route: Optional[str], method: Optional[str], sample_rate: float,
+                 max_profiles: int, ttl_sec: float, mode: str):
+        self.id = secrets.token_urlsafe(12)  # он же значение заголовка X-Profile
+        self.route = route
+        self.method = method.upper() if method else None
+        self.sample_rate = sample_rate
+        self.remaining = max_profiles
+        self.expires = time.monotonic() + ttl_sec
+        self.mode = mode
+
+    def matches(self, method: str, route: str) -> bool:
+        return self.route is not None and self.route == route and self.method in (None, method)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "route": self.route,
+            "method": self.method,
+            "sample_rate": self.sample_rate,
+            "remaining": self.remaining,
+            "expires_in_sec": round(max(0.0, self.expires - time.monotonic()), 1),
+            "mode": self.mode,
+        }
+
+
+class _StackSampler:
+    """Фоновый поток, снимающий стек потока event loop."""
+
+    def __init__(self, thread_id: int, interval: float, max_depth: int = 64):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> bytes:
+        self._stop.set()
+        self._thread.join()
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common()).encode()
+
+
+class Profiler:
+    def __init__(self, ring_size: int = 20, sample_interval: float = 0.005):
+        self.rules: Dict[str, ProfileRule] = {}
+        self.profiles: Deque[dict] = deque(maxlen=ring_size)
+        self.sample_interval = sample_interval
+        self._ids = itertools.count(1)
+        self._busy = False
+        self.skipped_busy = 0
+
+    def arm(self, route: Optional[str] = None, method: Optional[str] = None, sample_rate: float = 1.0,
+            max_profiles: int = 10, ttl_sec: float = 300, mode: str = "cprofile") -> ProfileRule:
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        rule = ProfileRule(route, method, sample_rate, max_profiles, ttl_sec, mode)
+        self.rules[rule.id] = rule
+        return rule
+
+    def disarm(self, rule_id: Optional[str] = None) -> int:
+        if rule_id is None:
+            n = len(self.rules)
+            self.rules.clear()
+            return n
+        return 1 if self.rules.pop(rule_id, None) else 0
+
+    def _select(self, scope) -> Optional[ProfileRule]:
+        now = time.monotonic()
+        for rid in [rid for rid, r in self.rules.items() if r.expires <= now or r.remaining <= 0]:
+            del self.rules[rid]
+        if not self.rules or self._busy:
+            if self.rules:
+                self.skipped_busy += 1
+            return None
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                rule = self.rules.get(value.decode("latin-1"))
+                if rule is not None:
+                    return rule
+        method = scope.get("method", "")
+        route = route_template(scope)
+        for rule in self.rules.values():
+            if rule.matches(method, route) and (rule.sample_rate >= 1 or secrets.randbelow(10_000) < rule.sample_rate * 10_000):
+                return rule
+        return None
+
+    def _store(self, rule: ProfileRule, scope, status: int, started: float, elapsed: float, data: bytes) -> None:
+        self.profiles.append({
+            "id": next(self._ids),
+            "rule_id": rule.id,
+            "mode": rule.mode,
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "route": route_template(scope),
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "started_at": started,
+            "size": len(data),
+            "data": data,
+        })
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        for p in self.profiles:
+            if p["id"] == profile_id:
+                return p
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "rules": [r.as_dict() for r in self.rules.values()],
+            "profiles": [{k: v for k, v in p.items() if k != "data"} for p in self.profiles],
+            "ring_size": self.profiles.maxlen,
+            "skipped_busy": self.skipped_busy,
+        }
+
+
+class _LoadedStats:
+    # pstats.Stats принимает объект с create_stats() и .stats — как у cProfile.Profile
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def pstats_text(data: bytes, sort: str = "cumulative", limit: int = 60) -> str:
+    """Текстовый отчёт pstats из сохранённого профиля cProfile."""
+    out = io.StringIO()
+    pstats.Stats(_LoadedStats(marshal.loads(data)), stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, profiler: Optional[Profiler] = None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler if self.profiler is not None else default_profiler
+        if scope["type"] != "http" or not profiler.rules:
+            await self.app(scope, receive, send)
+            return
+        rule = profiler._select(scope)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        rule.remaining -= 1
+        profiler._busy = True
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.time()
+        t0 = time.perf_counter()
+        if rule.mode == "stack":
+            sampler = _StackSampler(threading.get_ident(), profiler.sample_interval)
+            sampler.start()
+        else:
+            prof = cProfile.Profile()
+            prof.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if rule.mode == "stack":
+                data = sampler.stop()
+            else:
+                prof.disable()
+                prof.create_stats()
+                data = marshal.dumps(prof.stats)
+            profiler._busy = False
+            profiler._store(rule, scope, status, started, time.perf_counter() - t0, data)
+
+
+default_profiler = Profiler(
+    ring_size=int(os.getenv("PROFILING_RING_SIZE", "20")),
+    sample_interval=float(os.getenv("PROFILING_SAMPLE_MS", "5")) / 1000,
+)
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import math
+import os
+import re
+import threading
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+_ENCODING = None
+_ENCODING_LOADED = False
+
+
+def _encoding():
+    # tiktoken грузит (а при первом запуске скачивает) словарь BPE — только при первом подсчёте
+    global _ENCODING, _ENCODING_LOADED
+    if not _ENCODING_LOADED:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _ENCODING = None
+        _ENCODING_LOADED = True
+    return _ENCODING
+
+# Файловый RAG-стор (RAG_BACKEND=files): документы режутся на чанки при ингесте,
+# у каждого чанка заранее посчитаны токены и частоты термов. Поиск идёт по
+# инвертированному индексу в памяти процесса; индекс перечитывается, если файл
+# изменил другой воркер. pgvector пока не подключён — используется тот же стор.
+
+_WORD = re.compile(r"\w+")
+# Оценка без tiktoken: слово режется на куски до 4 символов, пунктуация — отдельный токен
+_TOKEN_PIECE = re.compile(r"\w{1,4}|[^\w\s]")
+_PARAGRAPH = re.compile(r"\n\s*\n")
+_SENTENCE = re.compile(r"(?<=[.!?…])\s+")
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text))
+    return len(_TOKEN_PIECE.findall(text))
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in _WORD.findall(text.casefold().replace("ё", "е")) if len(t) > 1]
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Режет текст по абзацам и предложениям на куски не длиннее max_tokens."""
+    pieces: List[str] = []
+    for para in _PARAGRAPH.split(text.strip()):
+        para = para.strip()
+        if not para:
+            continue
+        if count_tokens(para) <= max_tokens:
+            pieces.append(para)
+        else:
+            pieces.extend(s.strip() for s in _SENTENCE.split(para) if s.strip())
+    chunks: List[str] = []
+    cur: List[str] = []
+    cur_tokens = 0
+    for piece in pieces:
+        n = count_tokens(piece)
+        if cur and cur_tokens + n > max_tokens:
+            chunks.append("\n".join(cur))
+            cur, cur_tokens = [], 0
+        cur.append(piece)
+        cur_tokens += n
+    if cur:
+        chunks.append("\n".join(cur))
+    return chunks
+
+
+class _Index:
+    def __init__(self, chunks: List[dict]):
+        self.chunks = chunks
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)  # term -> [(chunk, tf)]
+        self.lengths: List[int] = []
+        for i, ch in enumerate(chunks):
+            tf = ch["tf"]
+            self.lengths.append(sum(tf.values()) or 1)
+            for term, n in tf.items():
+                self.postings[term].append((i, n))
+
+    def search(self, query: str, k: int, mode: str) -> List[Tuple[float, dict]]:
+        q = set(_terms(query))
+        scores: Dict[int, float] = defaultdict(float)
+        n_chunks = len(self.chunks)
+        for term in q:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log((n_chunks + 1) / (len(posting) + 1)) + 1.0
+            for i, tf in posting:
+                if mode == "simple":
+                    scores[i] += 1  # число совпавших термов запроса
+                else:
+                    scores[i] += (tf / self.lengths[i]) * idf * idf
+        top = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        if mode == "simple":
+            return [(int(s), self.chunks[i]) for i, s in top]
+        return [(round(s, 6), self.chunks[i]) for i, s in top]
+
+
+class FileRAGStore:
+    """Чанки в <RAG_DATA_DIR>/chunks.jsonl (одна строка — один чанк)."""
+
+    def __init__(self, data_dir: Optional[str] = None):
+        self._data_dir = data_dir
+        self._lock = threading.Lock()
+        self._index: Optional[_Index] = None
+        self._loaded: Optional[tuple] = None  # (path, mtime_ns, size)
+
+    @property
+    def path(self) -> str:
+        # Каталог читается при каждом обращении: тесты и dev подменяют RAG_DATA_DIR на лету
+        data_dir = self._data_dir or os.getenv("RAG_DATA_DIR", settings.RAG_DATA_DIR)
+        return os.path.join(data_dir, "chunks.jsonl")
+
+    def _add(self, docs: List[dict]) -> List[str]:
+        max_tokens = int(os.getenv("RAG_CHUNK_TOKENS", "200"))
+        ids, lines = [], []
+        for doc in docs:
+            doc_id = uuid.uuid4().hex
+            ids.append(doc_id)
+            for n, text in enumerate(chunk_text(doc["text"], max_tokens)):
+                lines.append(json.dumps({
+                    "doc_id": doc_id,
+                    "chunk": n,
+                    "title": doc.get("title"),
+                    "lang": doc.get("lang"),
+                    "tags": doc.get("tags") or [],
+                    "text": text,
+                    "tokens": count_tokens(text),
+                    "tf": dict(Counter(_terms(f"{doc.get('title') or ''}\n{text}"))),
+                }, ensure_ascii=False))
+        path = self.path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock, open(path, "a", encoding="utf-8") as f:
+            f.write("".join(line + "\n" for line in lines))
+        return ids
+
+    def _current_index(self) -> _Index:
+        path = self.path
+        try:
+            st = os.stat(path)
+            sig = (path, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            sig = (path, 0, 0)
+        with self._lock:
+            if self._index is None or self._loaded != sig:
+                chunks = []
+                if sig[2]:
+                    with open(path, encoding="utf-8") as f:
+                        chunks = [json.loads(line) for line in f if line.strip()]
+                self._index = _Index(chunks)
+                self._loaded = sig
+            return self._index
+
+    def _search(self, query: str, k: int, mode: str) -> List[dict]:
+        results = []
+        for score, ch in self._current_index().search(query, k, mode):
+            item = {key: ch[key] for key in ("doc_id", "chunk", "title", "lang", "tags", "text", "tokens")}
+            item["score"] = score
+            results.append(item)
+        return results
+
+    async def add_documents(self, docs: List[dict]) -> List[str]:
+        return await asyncio.to_thread(self._add, docs)
+
+    async def search(self, query: str, k: int = 5, mode: str = "tfidf") -> List[dict]:
+        return await asyncio.to_thread(self._search, query, k, mode)
+
+
+def build_context(chunks: List[dict], budget: int) -> Tuple[str, int]:
+    """Упаковывает найденные чанки (по убыванию релевантности) в бюджет токенов.
+
+    Не влезающий чанк пропускается, но следующие, более короткие, ещё пробуются.
+    Возвращает текст контекста и число израсходованных токенов.
+    """
+    parts: List[str] = []
+    used = 0
+    for ch in chunks:
+        header = f"[{len(parts) + 1}] {ch.get('title') or ''}".rstrip()
+        cost = ch["tokens"] + count_tokens(header) + 1
+        if used + cost > budget:
+            continue
+        parts.append(f"{header}\n{ch['text']}")
+        used += cost
+    return "\n\n".join(parts), used
+
+
+rag_store = FileRAGStore()
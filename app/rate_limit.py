@@ -1,49 +1,427 @@
+import asyncio
+import json
+import logging
 import os
+import re
+import sqlite3
+import tempfile
+import threading
 import time
-from collections import deque, defaultdict
-from typing import Deque, Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import Request, HTTPException
+logger = logging.getLogger(__name__)
 
+# Rate limiting (ASGI middleware) по алгоритму GCRA: на ключ (ip, шаблон маршрута)
+# хранится одно число — теоретическое время прибытия (TAT), память не зависит от лимита.
+# Ключ с TAT <= now неотличим от отсутствующего, поэтому свипер удаляет такие ключи без
+# потери точности. Лимиты по маршрутам задаются шаблонами FastAPI:
+# RATE_LIMITS_JSON='{"/api/v1/ai/chat": [30, 10], "/api/v1/objects/{object_id}": [60, 120]}'
+# ([окно в секундах, запросов за окно]). Пути вне RATE_LIMIT_PREFIX не ограничиваются.
 
-_WINDOW_SEC = int(os.getenv("RATE_LIMIT_WINDOW_SEC", "60"))
-_MAX_REQ = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "120"))
+_UNMATCHED = "<unmatched>"  # все неизвестные пути (сканеры) делят один ключ на IP
+_PARAM = re.compile(r"\{([^}:]+)(:[^}]*)?\}")
 
-# Optional per-path limits via JSON env: {"/api/v1/ai/chat": [30, 10], "/api/v1/rag/search": [60, 30]}
-import json
-_PER_PATH_RAW = os.getenv("RATE_LIMITS_JSON")
-try:
-    _PER_PATH = json.loads(_PER_PATH_RAW) if _PER_PATH_RAW else {}
-except Exception:
-    _PER_PATH = {}
-
-# key -> deque of timestamps (seconds)
-_buckets: Dict[str, Deque[float]] = defaultdict(deque)
-
-
-def _client_key(request: Request) -> str:
-    fwd = request.headers.get("x-forwarded-for")
-    ip = (fwd.split(",")[0].strip() if fwd else request.client.host) if request.client else "unknown"
-    return f"{ip}:{request.url.path}"
-
-
-async def rate_limiter(request: Request):
-    key = _client_key(request)
-    now = time.monotonic()
-    q = _buckets[key]
-    # Select window/max per path if configured
-    path = request.url.path
-    win, mx = _WINDOW_SEC, _MAX_REQ
-    cfg = _PER_PATH.get(path)
-    if isinstance(cfg, list) and len(cfg) == 2:
+
+def _template_regex(path: str) -> str:
+    out, pos = [], 0
+    for m in _PARAM.finditer(path):
+        out.append(re.escape(path[pos:m.start()]))
+        out.append(".*" if (m.group(2) or "") == ":path" else "[^/]+")
+        pos = m.end()
+    out.append(re.escape(path[pos:]))
+    return "".join(out)
+
+
+class RouteTemplates:
+    """Все маршруты приложения в одном скомпилированном regex: один match на запрос,
+    порядок альтернатив совпадает с порядком маршрутов (как в Starlette)."""
+
+    def __init__(self, paths: List[str]):
+        self.paths = list(dict.fromkeys(paths))
+        alts = [f"(?P<r{i}>{_template_regex(p)})" for i, p in enumerate(self.paths)]
+        self._regex = re.compile("^(?:" + "|".join(alts) + ")$") if alts else None
+
+    @classmethod
+    def from_app(cls, app) -> "RouteTemplates":
+        return cls([r.path for r in getattr(app, "routes", []) if hasattr(r, "path")])
+
+    def match(self, path: str) -> str:
+        m = self._regex.match(path) if self._regex is not None else None
+        return self.paths[int(m.lastgroup[1:])] if m else _UNMATCHED
+
+
+_app_templates: Dict[int, Tuple[int, RouteTemplates]] = {}
+
+
+def route_template(scope) -> str:
+    """Шаблон маршрута для запроса; считается один раз и кладётся в scope
+    (им пользуются и лимитер, и метрики)."""
+    template = scope.get("route_template")
+    if template is None:
+        app = scope.get("app")
+        routes = getattr(app, "routes", [])
+        entry = _app_templates.get(id(app))
+        if entry is None or entry[0] != len(routes):
+            entry = _app_templates[id(app)] = (len(routes), RouteTemplates.from_app(app))
+        template = scope["route_template"] = entry[1].match(scope["path"])
+    return template
+
+
+class _Sweeper:
+    """Инкрементальная чистка dict: раз в interval снимок ключей, дальше — по batch ключей
+    за вызов step(), без пауз на полный проход по миллиону ключей."""
+
+    def __init__(self, interval: float, batch: int = 1000):
+        self.interval = interval
+        self.batch = batch
+        self._next = time.monotonic() + interval
+        self._keys: Optional[list] = None
+        self._pos = 0
+
+    def step(self, data: dict, now: float, is_idle) -> int:
+        if self._keys is None:
+            if now < self._next:
+                return 0
+            self._keys = list(data)
+            self._pos = 0
+        end = self._pos + self.batch
+        evicted = 0
+        for key in self._keys[self._pos:end]:
+            value = data.get(key)
+            if value is not None and is_idle(value, now):
+                del data[key]
+                evicted += 1
+        self._pos = end
+        if end >= len(self._keys):
+            self.reset(now)
+        return evicted
+
+    def reset(self, now: float) -> None:
+        self._keys = None
+        self._next = now + self.interval
+
+
+def _tat_idle(tat: float, now: float) -> bool:
+    return tat <= now
+
+
+class MemoryGCRAStore:
+    """TAT по ключам в памяти процесса; idle-ключи вычищаются порциями на горячем пути."""
+
+    def __init__(self, sweep_interval: float = 60.0, sweep_batch: int = 1000):
+        self._tat: Dict[Tuple[str, str], float] = {}
+        self._sweeper = _Sweeper(sweep_interval, sweep_batch)
+        self.evicted = 0
+
+    def hit(self, key: Tuple[str, str], now: float, interval: float, tolerance: float) -> float:
+        """Учитывает запрос; возвращает 0, если он разрешён, иначе секунды до следующей попытки."""
+        tat = self._tat.get(key, now)
+        if tat < now:
+            tat = now
+        if tat - now > tolerance:
+            retry = tat - now - tolerance
+        else:
+            self._tat[key] = tat + interval
+            retry = 0.0
+        self.evicted += self._sweeper.step(self._tat, now, _tat_idle)
+        return retry
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Полный проход (для обслуживания и тестов); возвращает число удалённых ключей."""
+        now = time.monotonic() if now is None else now
+        before = len(self._tat)
+        self._tat = {k: v for k, v in self._tat.items() if v > now}
+        self._sweeper.reset(now)
+        removed = before - len(self._tat)
+        self.evicted += removed
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+def _default_sqlite_path() -> str:
+    # /dev/shm — tmpfs: файл в разделяемой памяти, без дискового I/O
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "visit-aqmola-ratelimit.db")
+
+
+def _lease_idle(lease: list, now: float) -> bool:
+    return lease[1] <= now
+
+
+class SQLiteGCRAStore:
+    """Общее состояние для воркеров одного хоста (uvicorn --workers N).
+
+    TAT хранится в sqlite-файле (по умолчанию в /dev/shm). Чтобы не ходить в файл на
+    каждый запрос, воркер атомарно резервирует у общего GCRA пачку разрешений (lease)
+    и тратит её локально. Пачка живёт lease_ttl секунд, растёт вдвое, если её выбрали
+    целиком, и не больше burst/8: неиспользованные разрешения только ужесточают лимит,
+    превысить его суммарно воркеры не могут.
+
+    В приложении используется ahit(): обращение к файлу (BEGIN IMMEDIATE может ждать
+    чужую запись до busy_timeout) идёт в потоке, а не в event loop; на ключ — одно
+    обращение за раз, остальные запросы ключа ждут его результата.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_lease: int = 16, lease_ttl: float = 1.0,
+                 sweep_interval: float = 60.0, sweep_batch: int = 1000):
+        self.path = path or _default_sqlite_path()
+        self.max_lease = max_lease
+        self.lease_ttl = lease_ttl
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = sweep_batch
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        # Одно соединение на процесс, обращения из потоков — по очереди
+        self._lock = threading.Lock()
+        self._refilling: Dict[Tuple[str, str], asyncio.Future] = {}
+        # key -> [осталось, истекает, размер]; размер 0 — ключ заблокирован до «истекает»
+        self._leases: Dict[Tuple[str, str], list] = {}
+        self._sweeper = _Sweeper(sweep_interval, sweep_batch)
+        self._next_db_sweep = time.monotonic() + sweep_interval
+        self._db_sweeping = False
+        self.evicted = 0
+        self.reservations = 0
+        self.errors = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Соединение на процесс: после fork (gunicorn/uvicorn workers) открываем своё
+        if self._conn is None or self._pid != os.getpid():
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            # Воркеры стартуют одновременно: на создание схемы ждём дольше, чем на запросы
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # данные лимитера не переживают рестарт хоста — и не должны
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limit (k TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID")
+            conn.execute("PRAGMA busy_timeout=200")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _reserve(self, key: str, want: int, interval: float, tolerance: float) -> Tuple[int, float]:
+        """Атомарно берёт до want разрешений; (выдано, секунд до следующей попытки)."""
+        conn = self._db()
+        wall = time.time()  # общее время для всех процессов
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limit WHERE k = ?", (key,)).fetchone()
+            tat = max(row[0], wall) if row else wall
+            # запрос n разрешён, пока tat + (n-1)*interval - wall <= tolerance
+            avail = int((tolerance + interval - (tat - wall)) / interval + 1e-9)
+            granted = min(want, avail)
+            if granted > 0:
+                conn.execute("INSERT OR REPLACE INTO rate_limit (k, tat) VALUES (?, ?)", (key, tat + granted * interval))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.reservations += 1
+        return granted, (0.0 if granted > 0 else tat - wall - tolerance)
+
+    def _local(self, key: Tuple[str, str], now: float, interval: float, tolerance: float) -> Tuple[Optional[float], int]:
+        """Ответ из локальной пачки (retry, 0) или (None, размер пачки для резервирования)."""
+        lease = self._leases.get(key)
+        if lease is not None and now < lease[1]:
+            if lease[0] > 0:
+                lease[0] -= 1
+                return 0.0, 0
+            if lease[2] == 0:
+                # Отказ помним локально: освободить разрешения может только время
+                return lease[1] - now, 0
+        # Пачку выбрали целиком до истечения — берём вдвое больше, иначе начинаем с 1
+        size = min(lease[2] * 2, self.max_lease) if lease is not None and lease[0] == 0 and now < lease[1] else 1
+        return None, max(1, min(size, int(tolerance / interval + 1) // 8))
+
+    def _refill(self, key: Tuple[str, str], size: int, interval: float, tolerance: float) -> Optional[Tuple[int, float]]:
+        """Резервирование в общем файле (и порция его чистки); None — файл недоступен."""
+        with self._lock:
+            try:
+                reserved = self._reserve(f"{key[0]}\x1f{key[1]}", size, interval, tolerance)
+            except sqlite3.Error as e:
+                # Файл занят/недоступен — лимитер не должен ронять API: пропускаем запрос
+                self.errors += 1
+                if self.errors % 1000 == 1:
+                    logger.warning(f"Shared rate limit store unavailable, failing open: {e}")
+                return None
+            self._sweep_db(time.monotonic())
+            return reserved
+
+    def _apply(self, key: Tuple[str, str], now: float, reserved: Optional[Tuple[int, float]]) -> float:
+        if reserved is None:
+            # Файл недоступен: пропускаем запросы ключа без обращений к нему до конца пачки
+            self._leases[key] = [self.max_lease - 1, now + self.lease_ttl, self.max_lease]
+            return 0.0
+        granted, retry = reserved
+        if granted:
+            self._leases[key] = [granted - 1, now + self.lease_ttl, granted]
+        else:
+            self._leases[key] = [0, now + retry, 0]
+        self.evicted += self._sweeper.step(self._leases, now, _lease_idle)
+        return retry
+
+    def hit(self, key: Tuple[str, str], now: float, interval: float, tolerance: float) -> float:
+        """Синхронный вариант (скрипты, тесты): резервирование выполняется в вызывающем потоке."""
+        retry, size = self._local(key, now, interval, tolerance)
+        if retry is not None:
+            return retry
+        return self._apply(key, now, self._refill(key, size, interval, tolerance))
+
+    async def ahit(self, key: Tuple[str, str], now: float, interval: float, tolerance: float) -> float:
+        while True:
+            retry, size = self._local(key, now, interval, tolerance)
+            if retry is not None:
+                return retry
+            pending = self._refilling.get(key)
+            if pending is None:
+                break
+            # Пачку ключа уже резервирует другой запрос — ждём его и смотрим снова
+            await asyncio.shield(pending)
+        fut = self._refilling[key] = asyncio.get_running_loop().create_future()
+        try:
+            reserved = await asyncio.to_thread(self._refill, key, size, interval, tolerance)
+            return self._apply(key, now, reserved)
+        finally:
+            del self._refilling[key]
+            fut.set_result(None)
+
+    def _sweep_db(self, now: float) -> None:
+        if not self._db_sweeping and now < self._next_db_sweep:
+            return
+        # Общую таблицу чистим порциями: один короткий DELETE за запрос, пока есть что удалять
+        self._db_sweeping = True
+        try:
+            cur = self._db().execute(
+                "DELETE FROM rate_limit WHERE k IN (SELECT k FROM rate_limit WHERE tat < ? LIMIT ?)",
+                (time.time(), self.sweep_batch),
+            )
+            done = cur.rowcount < self.sweep_batch
+        except sqlite3.Error:
+            done = True
+        if done:
+            self._db_sweeping = False
+            self._next_db_sweep = now + self.sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._leases)
+
+
+def build_store_from_env():
+    """RATE_LIMIT_BACKEND: memory (один процесс) | sqlite (общий для воркеров хоста)."""
+    sweep = float(os.getenv("RATE_LIMIT_SWEEP_SEC", "60"))
+    if os.getenv("RATE_LIMIT_BACKEND", "memory").lower() == "sqlite":
+        return SQLiteGCRAStore(
+            os.getenv("RATE_LIMIT_SQLITE_PATH") or None,
+            max_lease=int(os.getenv("RATE_LIMIT_MAX_LEASE", "16")),
+            lease_ttl=float(os.getenv("RATE_LIMIT_LEASE_TTL_SEC", "1")),
+            sweep_interval=sweep,
+        )
+    return MemoryGCRAStore(sweep_interval=sweep)
+
+
+class RateLimiter:
+    def __init__(self, store=None):
+        self.store = store if store is not None else build_store_from_env()
+        self._config_src: Optional[tuple] = None
+        self._default = (1.0, 0.0)
+        self._per_path: Dict[str, Tuple[float, float]] = {}
+        self.prefix = "/api/v1"
+        self.enabled = True
+        self.rejected = 0
+
+    @staticmethod
+    def _params(window: float, max_requests: int) -> Tuple[float, float]:
+        # emission interval T = window/max; допуск window - T даёт всплеск ровно из max запросов
+        max_requests = max(1, int(max_requests))
+        interval = float(window) / max_requests
+        return interval, max(0.0, float(window) - interval)
+
+    def _load_config(self) -> None:
+        # Лимиты читаются из окружения лениво и перечитываются только при его изменении
+        src = (
+            os.getenv("RATE_LIMIT_WINDOW_SEC", "60"),
+            os.getenv("RATE_LIMIT_MAX_REQUESTS", "120"),
+            os.getenv("RATE_LIMITS_JSON"),
+            os.getenv("RATE_LIMIT_PREFIX", "/api/v1"),
+            os.getenv("RATE_LIMIT_ENABLED", "1"),
+        )
+        if src == self._config_src:
+            return
+        self._config_src = src
+        window, max_req, raw, self.prefix, enabled = src
+        self.enabled = enabled == "1"
+        self._default = self._params(float(window), int(max_req))
+        per_path: Dict[str, Tuple[float, float]] = {}
         try:
-            win = int(cfg[0]); mx = int(cfg[1])
+            for path, cfg in (json.loads(raw) if raw else {}).items():
+                if isinstance(cfg, list) and len(cfg) == 2:
+                    per_path[path] = self._params(float(cfg[0]), int(cfg[1]))
         except Exception:
-            pass
-
-    # prune old
-    while q and now - q[0] > win:
-        q.popleft()
-    if len(q) >= mx:
-        raise HTTPException(status_code=429, detail="Too Many Requests")
-    q.append(now)
+            logger.warning("RATE_LIMITS_JSON is not valid JSON, using default limits")
+        self._per_path = per_path
+
+    def applies_to(self, path: str) -> bool:
+        self._load_config()
+        return self.enabled and path.startswith(self.prefix)
+
+    def hit(self, client: str, template: str, now: Optional[float] = None) -> float:
+        interval, tolerance = self._per_path.get(template, self._default)
+        retry = self.store.hit((client, template), time.monotonic() if now is None else now, interval, tolerance)
+        if retry:
+            self.rejected += 1
+        return retry
+
+    async def ahit(self, client: str, template: str, now: Optional[float] = None) -> float:
+        """hit() для event loop: хранилища с блокирующим I/O (sqlite) не останавливают цикл."""
+        store_ahit = getattr(self.store, "ahit", None)
+        if store_ahit is None:
+            return self.hit(client, template, now)
+        interval, tolerance = self._per_path.get(template, self._default)
+        retry = await store_ahit((client, template), time.monotonic() if now is None else now, interval, tolerance)
+        if retry:
+            self.rejected += 1
+        return retry
+
+    def stats(self) -> dict:
+        return {"keys": len(self.store), "evicted": self.store.evicted, "rejected": self.rejected}
+
+
+rate_limiter = RateLimiter()
+
+
+def _client_ip(scope) -> str:
+    for name, value in scope.get("headers") or ():
+        if name == b"x-forwarded-for":
+            return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """Чистый ASGI-middleware: без BaseHTTPMiddleware, не мешает стримингу ответов (SSE)."""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter if limiter is not None else rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.limiter.applies_to(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        template = route_template(scope)
+        retry = await self.limiter.ahit(_client_ip(scope), template)
+        if not retry:
+            await self.app(scope, receive, send)
+            return
+        body = b'{"detail":"Too Many Requests"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, int(retry + 0.999))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
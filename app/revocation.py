@@ -0,0 +1,191 @@
+import asyncio
+import heapq
+import logging
+import os
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.database import ensure_schema
+from app.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Хранилище отозванных JWT (jti). Горячий путь — проверка по dict в памяти процесса;
+# общий backend (таблица в БД или локальный sqlite-файл) раз в REVOCATION_REFRESH_SEC
+# догружает новые отзывы с других воркеров. Записи живут до exp токена.
+
+Rows = List[Tuple[str, int]]
+_REFETCH_OVERLAP = 100
+
+
+class MemoryRevocationBackend:
+    """Без персистентности — только для одного процесса (dev/тесты)."""
+
+    def __init__(self):
+        self._rows: list[tuple[int, str, int]] = []
+
+    async def add(self, jti: str, exp: int) -> None:
+        self._rows.append((len(self._rows) + 1, jti, exp))
+
+    async def fetch_since(self, watermark: int) -> Tuple[Rows, int]:
+        new = self._rows[watermark:]
+        return [(jti, exp) for _, jti, exp in new], len(self._rows)
+
+    async def purge(self, now: int) -> None:
+        # водяной знак — позиция в списке; просроченные записи чистит RevocationStore
+        return None
+
+
+class SQLiteRevocationBackend:
+    """Локальный sqlite-файл: общий для воркеров на одном хосте, переживает рестарт."""
+
+    def __init__(self, path: str):
+        self.path = path
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS revoked_tokens ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, jti TEXT NOT NULL UNIQUE, exp INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_revoked_tokens_exp ON revoked_tokens (exp)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _add(self, jti: str, exp: int) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO revoked_tokens (jti, exp) VALUES (?, ?)", (jti, exp))
+
+    def _fetch_since(self, watermark: int) -> Tuple[Rows, int]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, jti, exp FROM revoked_tokens WHERE id > ? ORDER BY id", (watermark,)
+            ).fetchall()
+        if not rows:
+            return [], watermark
+        return [(jti, exp) for _, jti, exp in rows], rows[-1][0]
+
+    def _purge(self, now: int) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM revoked_tokens WHERE exp < ?", (now,))
+
+    async def add(self, jti: str, exp: int) -> None:
+        await asyncio.to_thread(self._add, jti, exp)
+
+    async def fetch_since(self, watermark: int) -> Tuple[Rows, int]:
+        return await asyncio.to_thread(self._fetch_since, watermark)
+
+    async def purge(self, now: int) -> None:
+        await asyncio.to_thread(self._purge, now)
+
+
+class DatabaseRevocationBackend:
+    """Таблица revoked_tokens в основной БД приложения — общая для всех воркеров и хостов."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def add(self, jti: str, exp: int) -> None:
+        await ensure_schema()
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(insert(RevokedToken).values(jti=jti, exp=exp))
+        except IntegrityError:
+            pass  # уже отозван
+
+    async def fetch_since(self, watermark: int) -> Tuple[Rows, int]:
+        await ensure_schema()
+        async with self.engine.connect() as conn:
+            res = await conn.execute(
+                select(RevokedToken.id, RevokedToken.jti, RevokedToken.exp)
+                .where(RevokedToken.id > watermark)
+                .order_by(RevokedToken.id)
+            )
+            rows = res.all()
+        if not rows:
+            return [], watermark
+        return [(r.jti, r.exp) for r in rows], rows[-1].id
+
+    async def purge(self, now: int) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(RevokedToken).where(RevokedToken.exp < now))
+
+
+class RevocationStore:
+    def __init__(self, backend, refresh_sec: float = 2.0, purge_sec: float = 300.0):
+        self.backend = backend
+        self.refresh_sec = refresh_sec
+        self.purge_sec = purge_sec
+        self._jtis: dict[str, int] = {}
+        self._expiry: list[tuple[int, str]] = []  # min-heap (exp, jti)
+        self._watermark = 0
+        self._next_refresh = 0.0
+        self._next_purge = time.monotonic() + purge_sec
+
+    def _remember(self, jti: str, exp: int) -> None:
+        if jti not in self._jtis:
+            heapq.heappush(self._expiry, (exp, jti))
+        self._jtis[jti] = exp
+
+    def _evict_expired(self, now: int) -> None:
+        while self._expiry and self._expiry[0][0] < now:
+            _, jti = heapq.heappop(self._expiry)
+            self._jtis.pop(jti, None)
+
+    async def revoke(self, jti: str, exp: int) -> None:
+        await self.backend.add(jti, exp)
+        self._remember(jti, exp)
+
+    async def refresh(self) -> None:
+        # Срок выставляем до await — конкурентные запросы не запускают повторный refresh
+        mono = time.monotonic()
+        self._next_refresh = mono + self.refresh_sec
+        now = int(time.time())
+        try:
+            # Перечитываем хвост с перекрытием: id из более ранней транзакции может
+            # закоммититься позже уже прочитанного бОльшего id
+            rows, wm = await self.backend.fetch_since(max(0, self._watermark - _REFETCH_OVERLAP))
+            self._watermark = max(self._watermark, wm)
+            for jti, exp in rows:
+                if exp >= now:
+                    self._remember(jti, exp)
+            if mono >= self._next_purge:
+                self._next_purge = mono + self.purge_sec
+                await self.backend.purge(now)
+        except Exception as e:
+            # Backend недоступен — продолжаем работать по локальному кэшу
+            logger.warning(f"Revocation store refresh failed: {e}")
+        self._evict_expired(now)
+
+    async def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            return False
+        if time.monotonic() >= self._next_refresh:
+            await self.refresh()
+        exp = self._jtis.get(jti)
+        return exp is not None and exp >= time.time()
+
+    def __len__(self) -> int:
+        return len(self._jtis)
+
+
+def build_store_from_env(engine=None) -> RevocationStore:
+    kind = os.getenv("REVOCATION_BACKEND", "db").lower()
+    if kind == "sqlite":
+        backend = SQLiteRevocationBackend(os.getenv("REVOCATION_SQLITE_PATH", "data/revoked_tokens.db"))
+    elif kind == "db" and engine is not None:
+        backend = DatabaseRevocationBackend(engine)
+    else:
+        backend = MemoryRevocationBackend()
+    return RevocationStore(
+        backend,
+        refresh_sec=float(os.getenv("REVOCATION_REFRESH_SEC", "2")),
+        purge_sec=float(os.getenv("REVOCATION_PURGE_SEC", "300")),
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, conint, constr
+from pydantic import BaseModel, confloat, conint, constr
 from typing import Optional, Literal
 
 
@@ -20,6 +20,10 @@ class UserOut(BaseModel):
         orm_mode = True
 
 
+class UserRoleUpdate(BaseModel):
+    role: Literal['user', 'admin', 'moderator', 'content-manager']
+
+
 class ObjectCreate(BaseModel):
     name: constr(min_length=1, max_length=200)
     description: Optional[str]
@@ -83,6 +87,7 @@ class ReviewOut(BaseModel):
 class AIRequest(BaseModel):
     prompt: str
     lang: Optional[str] = "RU"  # RU/KZ/EN
+    rag: Optional[bool] = None  # None — по AI_RAG_ENABLED
 
 
 class AIResponse(BaseModel):
@@ -160,3 +165,14 @@ class RAGDocumentIn(BaseModel):
 
 class RAGDocumentsBatch(BaseModel):
     items: list[RAGDocumentIn]
+
+
+# --- Profiling ---
+
+class ProfilingRuleIn(BaseModel):
+    route: Optional[str] = None  # шаблон маршрута, напр. /api/v1/objects/{object_id}; None — только по заголовку
+    method: Optional[str] = None
+    sample_rate: confloat(gt=0, le=1) = 1.0
+    max_profiles: conint(ge=1, le=1000) = 10
+    ttl_sec: conint(ge=1, le=86400) = 300
+    mode: Literal['cprofile', 'stack'] = 'cprofile'
@@ -0,0 +1,60 @@
+import json
+import os
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+from app.pagination import next_cursor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Быстрый путь для списков: из БД выбираются только колонки схемы (Row-кортежи),
+# строки становятся dict и сразу сериализуются orjson — без ORM-сущностей,
+# pydantic-моделей и jsonable_encoder. Строки из собственной БД считаются доверенными;
+# LIST_VALIDATE_ROWS=1 включает проверку через закэшированный TypeAdapter схемы.
+
+
+@lru_cache(maxsize=None)
+def row_fields(schema) -> Tuple[str, ...]:
+    return tuple(schema.model_fields)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def render_rows(rows: Sequence, schema, validate: Optional[bool] = None) -> bytes:
+    """JSON-массив из Row-кортежей, первые колонки которых — поля схемы по порядку."""
+    if validate is None:
+        validate = os.getenv("LIST_VALIDATE_ROWS", "0") == "1"
+    fields = row_fields(schema)
+    items = [dict(zip(fields, row)) for row in rows]
+    if validate:
+        adapter = list_adapter(schema)
+        return adapter.dump_json(adapter.validate_python(items))
+    return dumps(items)
+
+
+async def render_page(list_fn, schema, db, limit: int, cursor: Optional[str],
+                      **filters) -> Tuple[bytes, Optional[str]]:
+    """Страница списка в JSON и курсор следующей; ValueError — битый курсор."""
+    items = await list_fn(db, limit=limit, cursor=cursor, fields=row_fields(schema), **filters)
+    return render_rows(items, schema), next_cursor(items, limit)
+
+
+class RawJSONResponse(Response):
+    """Ответ с уже сериализованным JSON-телом."""
+
+    media_type = "application/json"
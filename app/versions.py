@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert, engine
+from app.models import CatalogVersion
+
+logger = logging.getLogger(__name__)
+
+# Версии коллекций каталога (objects, events) — общие для всех воркеров, в таблице
+# catalog_versions. Запись в коллекцию отмечается в транзакции (mark_changed), а версия
+# поднимается уже после commit отдельной короткой транзакцией (publish_changes): строка
+# версии не блокируется на время чужих транзакций, писатели не выстраиваются за ней.
+# Каждый воркер держит копию версий в памяти; её обновляет фоновый опрос таблицы
+# (один SELECT раз в CATALOG_VERSION_POLL_SEC), запросы только читают копию.
+# Коллекция, изменённая этим воркером, до следующего опроса считается неизвестной
+# (read-your-writes). Если копию не удавалось обновить дольше CATALOG_MAX_STALE_SEC,
+# кэш каталога обходится, а ETag и 304 не отдаются.
+
+_PENDING = "changed_collections"
+_LOG_EVERY_SEC = 60.0
+
+
+class CollectionVersions:
+    def __init__(self, poll_interval: float = 1.0, max_stale: float = 5.0):
+        self.poll_interval = poll_interval
+        self.max_stale = max_stale
+        self._versions: Dict[str, int] = {}
+        self._modified: Dict[str, float] = {}
+        self.synced_at = float("-inf")  # monotonic начала последнего успешного опроса
+        self.syncs = 0
+        self.sync_errors = 0
+        self.publish_errors = 0
+        self._listeners: List[Callable[[str], None]] = []
+        # Закоммиченные здесь изменения: ещё не записаны в таблицу / записаны в момент t
+        self._unpublished: Set[str] = set()
+        self._held: Dict[str, Optional[float]] = {}
+        self._inflight: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_warning = float("-inf")
+        self._suppressed = 0
+
+    def on_change(self, fn: Callable[[str], None]) -> None:
+        """fn(collection) вызывается, когда версия коллекции изменилась."""
+        self._listeners.append(fn)
+
+    def _notify(self, collection: str) -> None:
+        for fn in self._listeners:
+            fn(collection)
+
+    def _log_failure(self, what: str, e: Exception) -> None:
+        # Пока БД недоступна, ошибка повторяется на каждом опросе — пишем раз в минуту
+        now = time.monotonic()
+        if now - self._last_warning < _LOG_EVERY_SEC:
+            self._suppressed += 1
+            return
+        logger.warning(f"Catalog versions {what} failed ({self._suppressed} similar suppressed): {e}")
+        self._last_warning = now
+        self._suppressed = 0
+
+    # --- запись ---
+
+    def hold(self, *collections: str) -> None:
+        """Изменения закоммичены: локальные кэши сбрасываются сразу, версия — при публикации."""
+        for c in collections:
+            self._unpublished.add(c)
+            self._held[c] = None
+            self._notify(c)
+
+    async def publish(self) -> None:
+        """Поднимает версии закоммиченных изменений в отдельной короткой транзакции."""
+        collections = sorted(self._unpublished)
+        if not collections:
+            return
+        self._unpublished.difference_update(collections)
+        now = datetime.now(timezone.utc)
+        try:
+            insert = dialect_insert(engine.dialect.name)
+            async with engine.begin() as conn:
+                for c in collections:
+                    stmt = insert(CatalogVersion).values(collection=c, version=1, updated_at=now)
+                    await conn.execute(stmt.on_conflict_do_update(
+                        index_elements=[CatalogVersion.collection],
+                        set_={"version": CatalogVersion.version + 1, "updated_at": now},
+                    ))
+        except Exception as e:
+            # Повторит следующий опрос
+            self._unpublished.update(collections)
+            self.publish_errors += 1
+            self._log_failure("publish", e)
+            return
+        published_at = time.monotonic()
+        for c in collections:
+            if c in self._held and c not in self._unpublished:
+                self._held[c] = published_at
+        if self.polling:
+            self._wakeup.set()
+        else:
+            self.synced_at = float("-inf")  # без опроса — перечитает следующий запрос
+
+    # --- чтение ---
+
+    async def sync(self) -> None:
+        if self._unpublished:
+            await self.publish()
+        started = time.monotonic()
+        async with engine.connect() as conn:
+            rows = (await conn.execute(
+                select(CatalogVersion.collection, CatalogVersion.version, CatalogVersion.updated_at)
+            )).all()
+        for collection, version, updated_at in rows:
+            if self._versions.get(collection) != version:
+                self._versions[collection] = version
+                if updated_at.tzinfo is None:
+                    updated_at = updated_at.replace(tzinfo=timezone.utc)
+                self._modified[collection] = updated_at.timestamp()
+                self._notify(collection)
+        # Свои изменения, опубликованные до начала этого опроса, уже видны в копии
+        for c, published_at in list(self._held.items()):
+            if published_at is not None and published_at <= started:
+                del self._held[c]
+        self.synced_at = started
+        self.syncs += 1
+
+    async def _sync_logged(self) -> None:
+        try:
+            await self.sync()
+        except Exception as e:
+            self.sync_errors += 1
+            self._log_failure("sync", e)
+
+    async def refresh(self) -> None:
+        """Один опрос на процесс: параллельные вызовы ждут уже идущий."""
+        loop = asyncio.get_running_loop()
+        task = self._inflight
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = self._inflight = loop.create_task(self._sync_logged())
+        await asyncio.shield(task)
+
+    async def ensure_fresh(self) -> bool:
+        """True — версиям можно верить. Копию обновляет фоновый опрос; без него
+        (скрипты, тесты) — запрос, заставший копию старше poll_interval."""
+        if not self.polling and time.monotonic() - self.synced_at > self.poll_interval:
+            await self.refresh()
+        return self.fresh()
+
+    def fresh(self, collection: Optional[str] = None) -> bool:
+        if collection is not None and collection in self._held:
+            return False
+        return time.monotonic() - self.synced_at <= self.max_stale
+
+    def get(self, collection: str) -> Tuple[int, Optional[float]]:
+        return self._versions.get(collection, 0), self._modified.get(collection)
+
+    def etag(self, collection: str, query: bytes = b"") -> str:
+        # Тело зависит и от параметров (limit, cursor) — они входят в тег хэшем
+        version, _ = self.get(collection)
+        variant = hashlib.blake2s(query, digest_size=6).hexdigest()
+        return f'"{collection}-{version}-{variant}"'
+
+    async def conditional(self, collection: str, request) -> Tuple[dict, bool]:
+        """Заголовки кэширования для ответа и признак, что клиенту можно ответить 304."""
+        headers = {"Cache-Control": _cache_control()}
+        await self.ensure_fresh()
+        if not self.fresh(collection):
+            return headers, False
+        headers["ETag"] = etag = self.etag(collection, request.scope.get("query_string", b""))
+        _, modified = self.get(collection)
+        if modified is not None:
+            headers["Last-Modified"] = formatdate(modified, usegmt=True)
+        inm = request.headers.get("if-none-match")
+        if inm is not None:
+            return headers, _etag_matches(inm, etag)
+        # If-Modified-Since точен до секунды: две записи в одну секунду дают одинаковый
+        # Last-Modified. Поэтому 304 только если изменение строго старше этой секунды;
+        # точную ревалидацию даёт ETag
+        ims = request.headers.get("if-modified-since")
+        if ims is not None and modified is not None:
+            since = _parse_http_date(ims)
+            return headers, since is not None and int(modified) < since
+        return headers, False
+
+    # --- фоновый опрос ---
+
+    @property
+    def polling(self) -> bool:
+        task = self._task
+        if task is None or task.done():
+            return False
+        try:
+            return task.get_loop() is asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+            await self.refresh()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = asyncio.Event()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        # Без cancel: опрос, идущий в момент остановки, дочитывает свой SELECT
+        if self._task is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.publish()
+
+    def stats(self) -> dict:
+        age = time.monotonic() - self.synced_at
+        return {
+            "versions": dict(self._versions),
+            "sync_age_sec": round(age, 3) if age != float("inf") else None,
+            "fresh": self.fresh(),
+            "held": sorted(self._held),
+            "unpublished": sorted(self._unpublished),
+            "poll_interval_sec": self.poll_interval,
+            "max_stale_sec": self.max_stale,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "publish_errors": self.publish_errors,
+            "polling": self._task is not None and not self._task.done(),
+        }
+
+
+def _cache_control() -> str:
+    max_age = int(os.getenv("CATALOG_CACHE_MAX_AGE", "60"))
+    swr = int(os.getenv("CATALOG_CACHE_SWR", "300"))
+    return f"public, max-age={max_age}, stale-while-revalidate={swr}"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Слабое сравнение (RFC 9110 для If-None-Match): W/ не учитывается
+    if header.strip() == "*":
+        return True
+    return any(t.strip().removeprefix("W/") == etag for t in header.split(","))
+
+
+def _parse_http_date(value: str) -> Optional[int]:
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def mark_changed(db, *collections: str) -> None:
+    """Отмечает изменённые коллекции в текущей транзакции; версии поднимаются после commit."""
+    db.info.setdefault(_PENDING, set()).update(collections)
+
+
+async def publish_changes() -> None:
+    """Вызывается после commit: версии изменённых коллекций видны другим воркерам
+    сразу, а не к следующему опросу."""
+    await catalog_versions.publish()
+
+
+catalog_versions = CollectionVersions(
+    poll_interval=float(os.getenv("CATALOG_VERSION_POLL_SEC", "1")),
+    max_stale=float(os.getenv("CATALOG_MAX_STALE_SEC", "5")),
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session) -> None:
+    changed = session.info.pop(_PENDING, None)
+    if changed:
+        catalog_versions.hold(*changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_on_rollback(session) -> None:
+    session.info.pop(_PENDING, None)
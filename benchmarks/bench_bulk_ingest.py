@@ -0,0 +1,72 @@
+"""Скорость импорта каталога: построчный путь (crud.create_object) против пакетного.
+
+    python benchmarks/bench_bulk_ingest.py [--rows 5000] [--chunk 1000] [--db URL]
+
+По умолчанию — временный sqlite-файл (WAL, как на киосках). Для PostgreSQL передайте
+--db postgresql+asyncpg://... (таблицы должны быть созданы миграциями).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _setup_env(db_url: str | None):
+    if db_url:
+        os.environ["DATABASE_URL"] = db_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+        os.environ["DISABLE_DB_INIT"] = "1"
+
+
+def _rows(n: int, tag: str):
+    return [
+        {"name": f"{tag} POI {i}", "description": "Imported from tourism board", "lat": 53.0 + i * 1e-5, "lon": 69.4}
+        for i in range(n)
+    ]
+
+
+async def main(rows: int, chunk: int):
+    from app import crud, database, schemas
+
+    await database.ensure_schema()
+
+    t0 = time.perf_counter()
+    async with database.AsyncSessionLocal() as db:
+        for row in _rows(rows, "single"):
+            await crud.create_object(db, schemas.ObjectCreate(**row))
+    per_row = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    async with database.AsyncSessionLocal() as db:
+        batch = [schemas.ObjectCreate(**r).dict() for r in _rows(rows, "bulk")]
+        for i in range(0, len(batch), chunk):
+            await crud.bulk_create_objects(db, batch[i:i + chunk])
+        await db.commit()
+    bulk = time.perf_counter() - t0
+
+    print(json.dumps({
+        "rows": rows,
+        "chunk": chunk,
+        "per_row_rows_per_sec": round(rows / per_row),
+        "bulk_rows_per_sec": round(rows / bulk),
+        "speedup": round(per_row / bulk, 1),
+    }, indent=2))
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=5000)
+    p.add_argument("--chunk", type=int, default=1000)
+    p.add_argument("--db", default=None)
+    args = p.parse_args()
+    _setup_env(args.db)
+    asyncio.run(main(args.rows, args.chunk))
@@ -0,0 +1,187 @@
+"""Пропускная способность и хвостовая латентность основных эндпоинтов API.
+
+    python benchmarks/bench_http.py [--concurrency 16] [--requests 2000] [--objects 5000] ...
+    python benchmarks/bench_http.py --save-baseline benchmarks/baseline_http.json
+    python benchmarks/bench_http.py --baseline benchmarks/baseline_http.json [--tolerance 0.2]
+
+Приложение работает в том же процессе (httpx.ASGITransport, без сети) поверх временной
+sqlite-базы, наполненной manage.seed_scaled. /ai/chat ходит через общий исходящий
+клиент в локальный заглушечный upstream с задержкой --upstream-ms. На каждый эндпоинт —
+--requests запросов при --concurrency одновременных; результат — JSON с p50/p95/p99 и RPS.
+С --baseline сравнивает с сохранённым прогоном и завершается с кодом 1 при регрессии
+p95 или RPS больше чем на --tolerance (сравнивать имеет смысл прогоны на одной машине).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+_REPLY = json.dumps({"choices": [{"message": {"content": "Бурабай — национальный парк."}}]}).encode()
+
+
+def _setup_env():
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ["DISABLE_DB_INIT"] = "1"
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    os.environ["AI_CACHE_ENABLED"] = "0"  # каждый запрос — до upstream
+    os.environ["AI_MAX_QUEUE"] = "100000"
+    os.environ["OPENROUTER_API_KEY"] = "bench"
+
+
+async def _stub_upstream(delay: float):
+    """Минимальный HTTP/1.1 сервер с keep-alive, отвечающий как OpenRouter."""
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                await reader.readexactly(length)
+                await asyncio.sleep(delay)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n%s" % (len(_REPLY), _REPLY))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def _percentile(sorted_samples, q):
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * q))]
+
+
+async def _drive(client, make_request, total: int, concurrency: int, warmup: int) -> dict:
+    for i in range(warmup):
+        await make_request(client, i)
+    samples, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            t0 = time.perf_counter()
+            r = await make_request(client, i)
+            samples.append(time.perf_counter() - t0)
+            errors += r.status_code >= 400
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    samples.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 2),
+    }
+
+
+def _scenarios(args):
+    n_obj, n_users = args.objects, args.users
+    return {
+        "GET /objects": lambda c, i: c.get("/api/v1/objects", params={"limit": args.page}),
+        "GET /events": lambda c, i: c.get("/api/v1/events", params={"limit": args.page}),
+        "GET /bookings": lambda c, i: c.get("/api/v1/bookings", params={"user_id": i % n_users + 1, "limit": args.page}),
+        "GET /complaints": lambda c, i: c.get("/api/v1/complaints", params={"limit": args.page}),
+        "GET /objects/{id}/score": lambda c, i: c.get(f"/api/v1/objects/{i % n_obj + 1}/score"),
+        "POST /ai/chat": lambda c, i: c.post("/api/v1/ai/chat", json={"prompt": f"Что посмотреть в Бурабае? #{i}"}),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Регрессии: p95 выросла или RPS упал больше чем на tolerance."""
+    regressions = []
+    for name, cur in current["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base:
+            continue
+        if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append({"endpoint": name, "metric": "p95_ms", "baseline": base["p95_ms"], "current": cur["p95_ms"]})
+        if cur["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append({"endpoint": name, "metric": "rps", "baseline": base["rps"], "current": cur["rps"]})
+    return regressions
+
+
+async def main(args) -> dict:
+    import httpx
+
+    from app import ai_service as ai_module
+    from app.database import engine, ensure_schema
+    from app.main import app
+    from app.http_client import outbound
+    from manage import seed_scaled
+
+    await ensure_schema()
+    await seed_scaled(users=args.users, objects=args.objects, bookings=args.bookings,
+                      reviews=args.reviews, complaints=args.complaints, events=args.events)
+
+    server, port = await _stub_upstream(args.upstream_ms / 1000)
+    ai_module.OPENROUTER_URL = f"http://127.0.0.1:{port}/api/v1/chat/completions"
+
+    endpoints = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, make_request in _scenarios(args).items():
+            if args.only and not any(s in name for s in args.only):
+                continue
+            endpoints[name] = await _drive(client, make_request, args.requests, args.concurrency, args.warmup)
+            print(f"{name}: {endpoints[name]}", file=sys.stderr)
+
+    server.close()
+    await server.wait_closed()
+    await outbound.aclose()
+    await engine.dispose()
+    return {
+        "params": {k: getattr(args, k) for k in ("concurrency", "requests", "page", "users", "objects", "bookings",
+                                                  "reviews", "complaints", "events", "upstream_ms")},
+        "python": sys.version.split()[0],
+        "endpoints": endpoints,
+    }
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--requests", type=int, default=2000, help="requests per endpoint")
+    p.add_argument("--warmup", type=int, default=50)
+    p.add_argument("--page", type=int, default=50, help="limit for list endpoints")
+    p.add_argument("--users", type=int, default=1000)
+    p.add_argument("--objects", type=int, default=5000)
+    p.add_argument("--bookings", type=int, default=20000)
+    p.add_argument("--reviews", type=int, default=20000)
+    p.add_argument("--complaints", type=int, default=5000)
+    p.add_argument("--events", type=int, default=2000)
+    p.add_argument("--upstream-ms", type=float, default=20, help="stub AI upstream latency")
+    p.add_argument("--only", nargs="*", help="substrings of endpoint names to run")
+    p.add_argument("--baseline", help="compare against a saved JSON result")
+    p.add_argument("--tolerance", type=float, default=0.2)
+    p.add_argument("--save-baseline", help="write the result to this file")
+    args = p.parse_args()
+    _setup_env()
+    result = asyncio.run(main(args))
+    code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            result["regressions"] = compare(result, json.load(f), args.tolerance)
+        code = 1 if result["regressions"] else 0
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    sys.exit(code)
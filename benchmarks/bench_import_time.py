@@ -0,0 +1,87 @@
+"""Холодный старт: время импорта app.main и бюджет на него.
+
+    python benchmarks/bench_import_time.py [--runs 7] [--budget-ms 1300] [--top 15]
+
+Каждый прогон — свежий процесс с `python -X importtime -c "import app.main"`;
+в отчёт идёт медиана по прогонам (общее время и самые дорогие модули верхнего уровня).
+Завершается с кодом 1, если медиана превышает --budget-ms или при старте импортирован
+модуль из холодных путей (alembic, httpx, tiktoken, OIDC, интеграции) — они должны
+подгружаться лениво. Бюджет зависит от машины: в CI задавайте его под свой раннер.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Модули, которые не должны грузиться при импорте приложения
+COLD_MODULES = ("alembic", "httpx", "httpcore", "tiktoken", "app.oidc", "app.integrations")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(target: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+    env.setdefault("DISABLE_DB_INIT", "1")
+    env["PYTHONWARNINGS"] = "ignore"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    top_level = {}
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cumulative_us, depth, name = int(m.group(2)), len(m.group(3)) // 2, m.group(4)
+        modules[name] = cumulative_us
+        if depth <= 1:
+            top_level[name] = cumulative_us
+    return {"total_us": modules.get(target, 0), "modules": modules, "top_level": top_level}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--target", default="app.main")
+    p.add_argument("--runs", type=int, default=7)
+    p.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1300")))
+    p.add_argument("--top", type=int, default=15)
+    args = p.parse_args()
+
+    measure(args.target)  # прогрев: компиляция .pyc не должна попасть в замер
+    runs = [measure(args.target) for _ in range(args.runs)]
+    per_module = defaultdict(list)
+    for r in runs:
+        for name, us in r["modules"].items():
+            per_module[name].append(us)
+    total_ms = statistics.median(r["total_us"] for r in runs) / 1000
+    # Самые дорогие прямые зависимости приложения и его собственные модули
+    interesting = {name for r in runs for name in r["top_level"]} | {n for n in per_module if n.startswith("app.")}
+    heaviest = sorted(
+        ((name, statistics.median(per_module[name]) / 1000) for name in interesting if name != args.target),
+        key=lambda kv: -kv[1],
+    )[:args.top]
+    cold = sorted(name for name in per_module if name.split(".")[0] in COLD_MODULES or name in COLD_MODULES)
+    result = {
+        "target": args.target,
+        "runs": args.runs,
+        "median_ms": round(total_ms, 1),
+        "budget_ms": args.budget_ms,
+        "within_budget": total_ms <= args.budget_ms,
+        "cold_modules_imported": cold,
+        "heaviest_ms": {name: round(ms, 1) for name, ms in heaviest},
+    }
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["within_budget"] and not cold else 1)
+
+
+if __name__ == "__main__":
+    main()
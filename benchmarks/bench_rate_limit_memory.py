@@ -0,0 +1,99 @@
+"""Память и скорость rate limiter под миллионом разных клиентов.
+
+    python benchmarks/bench_rate_limit_memory.py [--clients 1000000]
+
+Сравнивает прежнюю схему (deque временных меток на ip:path) с GCRA (одно число на
+ключ), затем проверяет, что свипер освобождает память после ухода клиентов.
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _ips(n: int):
+    return (f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(n))
+
+
+def bench_legacy(clients: int) -> dict:
+    # Прежний rate_limit.py: по deque на ключ, в каждой — метки запросов за окно
+    gc.collect()
+    tracemalloc.start()
+    buckets = defaultdict(deque)
+    t0 = time.perf_counter()
+    now = time.monotonic()
+    for ip in _ips(clients):
+        buckets[f"{ip}:/api/v1/objects"].append(now)
+    dt = time.perf_counter() - t0
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del buckets
+    return {"bytes": mem, "bytes_per_client": round(mem / clients, 1), "hit_us": round(dt / clients * 1e6, 3)}
+
+
+def bench_gcra(clients: int) -> dict:
+    from app.rate_limit import MemoryGCRAStore, RateLimiter
+
+    gc.collect()
+    tracemalloc.start()
+    store = MemoryGCRAStore(sweep_interval=3600)
+    limiter = RateLimiter(store)
+    limiter._load_config()
+    t0 = time.perf_counter()
+    now = time.monotonic()
+    for ip in _ips(clients):
+        limiter.hit(ip, "/api/v1/objects", now)
+    dt = time.perf_counter() - t0
+    mem = tracemalloc.get_traced_memory()[0]
+    # Все клиенты ушли: после окна их TAT в прошлом
+    t1 = time.perf_counter()
+    removed = store.sweep(now + 3600)
+    sweep_sec = time.perf_counter() - t1
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Инкрементальный свипер: время одной порции на горячем пути
+    store = MemoryGCRAStore(sweep_interval=0)
+    for ip in _ips(min(clients, 200_000)):
+        store.hit((ip, "/x"), now, 1.0, 60.0)
+    t2 = time.perf_counter()
+    store.hit(("probe", "/x"), now + 120, 1.0, 60.0)  # снимок ключей + первая порция
+    first_step_ms = (time.perf_counter() - t2) * 1000
+    t3 = time.perf_counter()
+    store.hit(("probe", "/x"), now + 120, 1.0, 60.0)
+    step_ms = (time.perf_counter() - t3) * 1000
+    return {
+        "bytes": mem,
+        "bytes_per_client": round(mem / clients, 1),
+        "hit_us": round(dt / clients * 1e6, 3),
+        "full_sweep_sec": round(sweep_sec, 3),
+        "evicted": removed,
+        "bytes_after_sweep": after,
+        "incremental_first_step_ms": round(first_step_ms, 3),
+        "incremental_step_ms": round(step_ms, 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=1_000_000)
+    args = ap.parse_args()
+    legacy = bench_legacy(args.clients)
+    gcra = bench_gcra(args.clients)
+    print(json.dumps({
+        "clients": args.clients,
+        "legacy_deque": legacy,
+        "gcra": gcra,
+        "memory_ratio": round(legacy["bytes"] / gcra["bytes"], 2) if gcra["bytes"] else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
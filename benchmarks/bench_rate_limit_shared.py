@@ -0,0 +1,76 @@
+"""Накладные расходы общего (межпроцессного) rate limiter на запрос.
+
+    python benchmarks/bench_rate_limit_shared.py [--workers 4] [--hits 50000] [--clients 1000]
+
+Каждый процесс-воркер делает --hits проверок по --clients ключам; сравниваются
+in-memory GCRA и SQLiteGCRAStore (файл в /dev/shm) — среднее и p99 на проверку.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _worker(backend, path, hits, clients, barrier, results):
+    from app.rate_limit import MemoryGCRAStore, RateLimiter, SQLiteGCRAStore
+
+    store = SQLiteGCRAStore(path) if backend == "sqlite" else MemoryGCRAStore()
+    interval, tolerance = RateLimiter._params(60, 120)
+    samples = []
+    barrier.wait()
+    for i in range(hits):
+        key = (f"10.0.{i % clients >> 8}.{i % clients & 255}", "/api/v1/objects")
+        t0 = time.perf_counter()
+        store.hit(key, time.monotonic(), interval, tolerance)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    results.put({
+        "avg_us": sum(samples) / len(samples) * 1e6,
+        "p99_us": samples[int(len(samples) * 0.99)] * 1e6,
+        "reservations": getattr(store, "reservations", 0),
+        "errors": getattr(store, "errors", 0),
+    })
+
+
+def run(backend, workers, hits, clients):
+    ctx = mp.get_context("spawn")
+    path = os.path.join(tempfile.mkdtemp(dir="/dev/shm" if os.path.isdir("/dev/shm") else None), "rl.db")
+    barrier, results = ctx.Barrier(workers), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(backend, path, hits, clients, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    out = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return {
+        "avg_us": round(sum(o["avg_us"] for o in out) / workers, 2),
+        "p99_us": round(max(o["p99_us"] for o in out), 2),
+        "reservations_per_hit": round(sum(o["reservations"] for o in out) / (workers * hits), 3),
+        "fail_open": sum(o["errors"] for o in out),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--hits", type=int, default=50000)
+    ap.add_argument("--clients", type=int, default=1000)
+    args = ap.parse_args()
+    print(json.dumps({
+        "workers": args.workers,
+        "hits_per_worker": args.hits,
+        "clients": args.clients,
+        "memory": run("memory", args.workers, args.hits, args.clients),
+        "sqlite_shared": run("sqlite", args.workers, args.hits, args.clients),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Накладные расходы get_session на sqlite с DISABLE_DB_INIT=1: до/после.
+
+    python benchmarks/bench_schema_bootstrap.py [--n 2000]
+
+"before" воспроизводит прежнее поведение (create_all в транзакции на каждый запрос),
+"after" — текущий get_session с однократным bootstrap схемы.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_tmp}/bench.db"
+os.environ["DISABLE_DB_INIT"] = "1"
+
+from sqlalchemy import text  # noqa: E402
+from app import database, models  # noqa: E402,F401
+
+
+async def _old_get_session():
+    async with database.engine.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    async with database.AsyncSessionLocal() as session:
+        yield session
+
+
+async def _run(factory, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        async for session in factory():
+            await session.execute(text("SELECT 1"))
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+async def main(n: int):
+    await database.ensure_schema()
+    # прогрев
+    await _run(database.get_session, 50)
+    await _run(_old_get_session, 50)
+    before = await _run(_old_get_session, n)
+    after = await _run(database.get_session, n)
+    print(json.dumps({
+        "requests": n,
+        "before_us_per_request": round(before, 1),
+        "after_us_per_request": round(after, 1),
+        "saved_us_per_request": round(before - after, 1),
+    }, indent=2))
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--n", type=int, default=2000)
+    asyncio.run(main(p.parse_args().n))
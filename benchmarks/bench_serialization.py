@@ -0,0 +1,110 @@
+"""Стоимость страницы списка на строку: ORM + response_model против Row-кортежей + orjson.
+
+    python benchmarks/bench_serialization.py [--rows 5000] [--page 100] [--repeat 50]
+
+Для ObjectOut, EventOut, BookingOut и ComplaintOut сравниваются три пути:
+  orm       — crud.list_* (ORM-сущности) + serialize_response FastAPI + JSONResponse,
+              как было у эндпоинтов с response_model;
+  rows      — выбор только колонок схемы + orjson (доверенные строки, LIST_VALIDATE_ROWS=0);
+  rows_tadp — то же с проверкой через закэшированный TypeAdapter (LIST_VALIDATE_ROWS=1).
+Отдельно — только сериализация (без БД) и полный путь с выборкой страницы из sqlite.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+
+def _setup_env():
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+    os.environ["DISABLE_DB_INIT"] = "1"
+
+
+async def _timed(fn, repeat: int) -> float:
+    await fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def _us(sec: float, rows: int) -> float:
+    return round(sec / rows * 1e6, 2)
+
+
+async def main(args):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from app import crud, schemas
+    from app.database import AsyncSessionLocal, engine, ensure_schema
+    from app.serialization import render_rows, row_fields
+    from manage import seed_scaled
+
+    await ensure_schema()
+    n = args.rows
+    await seed_scaled(users=max(1, n // 10), objects=n, bookings=n, complaints=n, events=n)
+
+    cases = {
+        "ObjectOut": (schemas.ObjectOut, crud.list_objects, {}),
+        "EventOut": (schemas.EventOut, crud.list_events, {}),
+        "BookingOut": (schemas.BookingOut, crud.list_all_bookings, {}),
+        "ComplaintOut": (schemas.ComplaintOut, crud.list_complaints, {}),
+    }
+    page = args.page
+    result = {}
+    async with AsyncSessionLocal() as db:
+        for name, (schema, list_fn, kw) in cases.items():
+            field = create_response_field(name="Response", type_=List[schema])
+            fields = row_fields(schema)
+            orm_items = await list_fn(db, limit=page, **kw)
+            row_items = await list_fn(db, limit=page, fields=fields, **kw)
+
+            async def ser_orm():
+                content = await serialize_response(field=field, response_content=orm_items)
+                return JSONResponse(content).body
+
+            async def ser_rows():
+                return render_rows(row_items, schema, validate=False)
+
+            async def ser_rows_tadp():
+                return render_rows(row_items, schema, validate=True)
+
+            async def full_orm():
+                items = await list_fn(db, limit=page, **kw)
+                content = await serialize_response(field=field, response_content=items)
+                return JSONResponse(content).body
+
+            async def full_rows():
+                return render_rows(await list_fn(db, limit=page, fields=fields, **kw), schema, validate=False)
+
+            assert json.loads(await ser_orm()) == json.loads(await ser_rows()) == json.loads(await ser_rows_tadp())
+            s_orm, s_rows, s_tadp = [await _timed(f, args.repeat) for f in (ser_orm, ser_rows, ser_rows_tadp)]
+            f_orm, f_rows = [await _timed(f, args.repeat) for f in (full_orm, full_rows)]
+            result[name] = {
+                "serialize_us_per_row": {"orm": _us(s_orm, page), "rows": _us(s_rows, page), "rows_tadp": _us(s_tadp, page)},
+                "fetch_and_serialize_us_per_row": {"orm": _us(f_orm, page), "rows": _us(f_rows, page)},
+                "speedup_serialize": round(s_orm / s_rows, 1),
+                "speedup_total": round(f_orm / f_rows, 1),
+            }
+    await engine.dispose()
+    print(json.dumps({"page": page, "repeat": args.repeat, "results": result}, indent=2))
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=5000)
+    p.add_argument("--page", type=int, default=100)
+    p.add_argument("--repeat", type=int, default=50)
+    args = p.parse_args()
+    _setup_env()
+    asyncio.run(main(args))
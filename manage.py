@@ -1,6 +1,11 @@
+import argparse
 import asyncio
+import random
+from sqlalchemy import func, insert, select, update
+from app import crud
 from app.database import init_db, AsyncSessionLocal
-from app.models import User, Object as Obj, Booking, Review
+from app.models import User, Object as Obj, Booking, Review, Complaint
+from app.versions import mark_changed, publish_changes
 
 
 async def seed():
@@ -25,16 +30,85 @@ async def seed():
         r = Review(user_id=u2.id, object_id=o2.id, rating=5, text="Amazing place")
         session.add(r)
 
+        mark_changed(session, "objects")
         await session.commit()
+        await publish_changes()  # кэши каталога работающих воркеров увидят новые объекты
         print("Seed data inserted")
 
 
-async def main():
+async def seed_scaled(users: int = 0, objects: int = 0, bookings: int = 0, reviews: int = 0,
+                      complaints: int = 0, events: int = 0, chunk: int = 1000, rnd_seed: int = 42):
+    """Синтетические данные в объёме, близком к продовому (для бенчмарков и проверки индексов).
+
+    Вставка пачками по chunk строк; счётчики отзывов/жалоб у объектов согласованы с данными.
+    """
+    rnd = random.Random(rnd_seed)
+
+    async def _insert(session, model, rows):
+        for i in range(0, len(rows), chunk):
+            await session.execute(insert(model), rows[i:i + chunk])
+
+    async with AsyncSessionLocal() as session:
+        await _insert(session, User, [
+            {"name": f"User {i}", "email": f"user{i}@seed.local"} for i in range(users)
+        ])
+        obj_rows = [
+            {"name": f"Seed POI {i}", "description": "Synthetic object", "lat": 51 + rnd.random() * 3,
+             "lon": 69 + rnd.random() * 5}
+            for i in range(objects)
+        ]
+        for i in range(0, len(obj_rows), chunk):
+            await crud.bulk_create_objects(session, obj_rows[i:i + chunk])
+        await crud.bulk_create_events(session, [
+            {"title": f"Seed event {i}", "description": "Synthetic event", "start_at": "2025-07-01",
+             "end_at": "2025-07-02", "lat": 52.0, "lon": 70.0}
+            for i in range(events)
+        ])
+        user_ids = list((await session.execute(select(User.id))).scalars())
+        object_ids = list((await session.execute(select(Obj.id))).scalars())
+        if user_ids and object_ids:
+            await _insert(session, Booking, [
+                {"user_id": rnd.choice(user_ids), "object_id": rnd.choice(object_ids), "start_date": "2025-12-01",
+                 "end_date": "2025-12-05", "status": rnd.choice(["pending", "confirmed", "paid"])}
+                for _ in range(bookings)
+            ])
+            review_rows = [
+                {"user_id": rnd.choice(user_ids), "object_id": rnd.choice(object_ids), "rating": rnd.randint(1, 5),
+                 "text": "Synthetic review"}
+                for _ in range(reviews)
+            ]
+            for i in range(0, len(review_rows), chunk):
+                await crud.bulk_create_reviews(session, review_rows[i:i + chunk])
+            await _insert(session, Complaint, [
+                {"user_id": rnd.choice(user_ids), "object_id": rnd.choice(object_ids), "category": "other",
+                 "text": "Synthetic complaint", "status": rnd.choice(["new", "in_review", "rejected"])}
+                for _ in range(complaints)
+            ])
+            if complaints:
+                counted = (
+                    select(func.count(Complaint.id))
+                    .where(Complaint.object_id == Obj.id)
+                    .scalar_subquery()
+                )
+                await session.execute(update(Obj).values(complaint_count=counted))
+        await session.commit()
+        await publish_changes()
+    print(f"Scaled seed inserted: users={users} objects={objects} bookings={bookings} "
+          f"reviews={reviews} complaints={complaints} events={events}")
+
+
+async def main(args):
     print("Initializing DB (create tables)...")
     await init_db()
     print("Seeding demo data...")
     await seed()
+    counts = {k: getattr(args, k) for k in ("users", "objects", "bookings", "reviews", "complaints", "events")}
+    if any(counts.values()):
+        await seed_scaled(**counts)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    p = argparse.ArgumentParser()
+    for name in ("users", "objects", "bookings", "reviews", "complaints", "events"):
+        p.add_argument(f"--{name}", type=int, default=0, help=f"additional synthetic {name}")
+    asyncio.run(main(p.parse_args()))
@@ -0,0 +1,45 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+ADMIN = {'X-Admin-Token': 'adm-filters'}
+
+
+def _complaint(object_id=None):
+    body = {'user_id': None, 'object_id': object_id, 'category': 'service', 'text': 'x',
+            'photo_url': None, 'lat': None, 'lon': None}
+    r = client.post('/api/v1/complaints', json=body)
+    assert r.status_code == 200, r.text
+    return r.json()['id']
+
+
+def test_admin_complaints_status_filter_sees_beyond_first_page(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-filters')
+    target = _complaint()
+    r = client.post(f'/api/v1/complaints/{target}/status', json={'status': 'rejected'}, headers=ADMIN)
+    assert r.status_code == 200, r.text
+    # Более свежие жалобы занимают первую страницу без фильтра
+    for _ in range(3):
+        _complaint()
+    r = client.get('/api/v1/admin/complaints', params={'status': 'rejected', 'limit': 2}, headers=ADMIN)
+    assert r.status_code == 200, r.text
+    ids = [c['id'] for c in r.json()]
+    assert target in ids
+    assert all(c['status'] == 'rejected' for c in r.json())
+
+
+def test_admin_bookings_filters_by_object_and_date(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-filters')
+    u = client.post('/api/v1/users', json={'external_id': None, 'name': 'F', 'email': 'filters@example.com'}).json()
+    o = client.post('/api/v1/objects', json={'name': 'Filtered', 'description': None, 'lat': None, 'lon': None}).json()
+    body = {'user_id': u['id'], 'object_id': o['id'], 'start_date': None, 'end_date': None, 'payment_order_id': None}
+    b = client.post('/api/v1/bookings', json=body).json()
+    r = client.get('/api/v1/admin/bookings', params={'object_id': o['id'], 'status': 'pending'}, headers=ADMIN)
+    assert r.status_code == 200, r.text
+    assert [x['id'] for x in r.json()] == [b['id']]
+    r = client.get('/api/v1/admin/bookings', params={'object_id': o['id'], 'created_from': '2999-01-01T00:00:00'}, headers=ADMIN)
+    assert r.status_code == 200
+    assert r.json() == []
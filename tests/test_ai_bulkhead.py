@@ -0,0 +1,102 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.ai_service import AIService, ai_service
+from app.bulkhead import Bulkhead, BulkheadRejected
+
+
+def test_limit_queue_and_rejections():
+    async def run():
+        bh = Bulkhead('t', limit=2, max_queue=2, max_wait=0.2)
+        started = []
+
+        async def call(i, dur=0.05):
+            async with bh.slot():
+                started.append(i)
+                await asyncio.sleep(dur)
+            return i
+
+        tasks = [asyncio.create_task(call(i)) for i in range(4)]
+        await asyncio.sleep(0)
+        assert bh.active == 2 and bh.queued == 2
+        with pytest.raises(BulkheadRejected) as e:
+            await bh.acquire()
+        assert e.value.reason == 'queue_full'
+        assert await asyncio.gather(*tasks) == [0, 1, 2, 3]
+        assert started == [0, 1, 2, 3]  # FIFO
+        assert bh.active == 0 and bh.queued == 0
+
+        # долгие вызовы: ожидающий не дождался слота
+        slow = [asyncio.create_task(call(i, 0.5)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(BulkheadRejected) as e:
+            await bh.acquire(timeout=0.08)
+        assert e.value.reason == 'timeout'
+        await asyncio.gather(*slow)
+        # средняя длительность уже известна — дедлайн заведомо не успеть, отказ сразу
+        slow = [asyncio.create_task(call(i, 0.5)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(BulkheadRejected) as e:
+            await bh.acquire(timeout=0.1)
+        assert e.value.reason == 'deadline'
+        await asyncio.gather(*slow)
+        return bh.stats()
+
+    st = asyncio.run(run())
+    assert st['rejected'] == {'queue_full': 1, 'deadline': 1, 'timeout': 1}
+    assert st['active'] == 0 and st['max_seen_wait_ms'] > 0
+
+
+def test_cancelled_waiter_frees_its_place():
+    async def run():
+        bh = Bulkhead('t', limit=1, max_queue=5, max_wait=5)
+        await bh.acquire()
+        waiter = asyncio.create_task(bh.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        bh.release()
+        return bh.active, bh.queued
+
+    assert asyncio.run(run()) == (0, 0)
+
+
+def _slow_service(monkeypatch, mode):
+    monkeypatch.setenv('AI_CACHE_ENABLED', '0')
+    monkeypatch.setenv('AI_MAX_CONCURRENCY', '1')
+    monkeypatch.setenv('AI_MAX_QUEUE', '0')
+    monkeypatch.setenv('AI_OVERLOAD_MODE', mode)
+    svc = AIService()
+    svc.openrouter_api_key = 'test-key'
+
+    async def _complete(prompt, context=None):
+        await asyncio.sleep(0.1)
+        return 'Ответ модели'
+
+    monkeypatch.setattr(svc, '_complete', _complete)
+    return svc
+
+
+def test_overload_falls_back_to_stub(monkeypatch):
+    svc = _slow_service(monkeypatch, 'stub')
+
+    async def run():
+        return await asyncio.gather(svc.chat('Бурабай', 'ru'), svc.chat('Кокшетау', 'ru'))
+
+    assert asyncio.run(run()) == ['Ответ модели', svc._stub_response('Кокшетау')]
+    assert svc.stats()['bulkhead']['rejected']['queue_full'] == 1
+
+
+def test_overload_503_mode(monkeypatch):
+    svc = _slow_service(monkeypatch, '503')
+    svc.bulkhead.active = svc.bulkhead.limit  # все слоты заняты
+    monkeypatch.setattr(ai_service, 'openrouter_api_key', 'test-key')
+    monkeypatch.setattr(ai_service, 'cache', None)
+    monkeypatch.setattr(ai_service, 'bulkhead', svc.bulkhead)
+    monkeypatch.setattr(ai_service, 'overload_mode', '503')
+    r = TestClient(app).post('/api/v1/ai/chat', json={'prompt': 'Жилье', 'lang': 'ru'})
+    assert r.status_code == 503 and r.headers['retry-after'] == '5'
@@ -0,0 +1,73 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+from fastapi.testclient import TestClient
+from app.main import app
+from app.ai_cache import AIResponseCache, cache_key, normalize_prompt
+from app.ai_service import ai_service
+
+client = TestClient(app)
+ADMIN = {'X-Admin-Token': 'adm-ai-cache'}
+
+
+def _fake_upstream(monkeypatch, reply='Ответ модели'):
+    calls = []
+
+    async def _complete(prompt, context=None):
+        calls.append(prompt)
+        return reply
+
+    monkeypatch.setattr(ai_service, 'openrouter_api_key', 'test-key')
+    monkeypatch.setattr(ai_service, '_complete', _complete)
+    return calls
+
+
+def test_normalized_prompts_share_key():
+    assert normalize_prompt('  Что посмотреть в   Бурабае?! ') == 'что посмотреть в бурабае'
+    assert normalize_prompt('Ёлки') == normalize_prompt('елки')
+    assert cache_key('Кокшетау?', 'ru', 'm') == cache_key('кокшетау', 'RU', 'm')
+    assert cache_key('Кокшетау', 'ru', 'm') != cache_key('Кокшетау', 'kk', 'm')
+
+
+def test_chat_served_from_cache_and_purged(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-ai-cache')
+    client.delete('/api/v1/admin/ai/cache', headers=ADMIN)
+    calls = _fake_upstream(monkeypatch)
+    for prompt in ('Где поесть в Щучинске?', 'где поесть в щучинске', '  ГДЕ поесть  в Щучинске ?'):
+        r = client.post('/api/v1/ai/chat', json={'prompt': prompt, 'lang': 'ru'})
+        assert r.status_code == 200 and r.json()['reply'] == 'Ответ модели'
+    assert len(calls) == 1
+    st = client.get('/api/v1/admin/ai/cache', headers=ADMIN).json()
+    assert st['size'] == 1 and st['hits'] >= 2
+
+    assert client.delete('/api/v1/admin/ai/cache', headers=ADMIN).json() == {'purged': 1}
+    client.post('/api/v1/ai/chat', json={'prompt': 'Где поесть в Щучинске?', 'lang': 'ru'})
+    assert len(calls) == 2
+
+
+def test_stub_fallback_is_not_cached(monkeypatch):
+    calls = _fake_upstream(monkeypatch, reply=None)
+    before = len(ai_service.cache)
+    client.post('/api/v1/ai/chat', json={'prompt': 'Маршрут на выходные', 'lang': 'ru'})
+    client.post('/api/v1/ai/chat', json={'prompt': 'Маршрут на выходные', 'lang': 'ru'})
+    assert len(calls) == 2
+    assert len(ai_service.cache) == before
+
+
+def test_bounded_by_entries_and_bytes_with_disk_tier(tmp_path):
+    async def run():
+        c = AIResponseCache(max_entries=3, max_bytes=100, ttl=60, disk_path=str(tmp_path / 'ai.db'))
+        for i in range(5):
+            await c.set(f'k{i}', 'x' * 10)
+        assert len(c.memory) == 3
+        await c.set('big', 'я' * 45)  # 90 байт — вытесняет почти всё остальное
+        assert c.memory.bytes <= 100
+        # вытесненное из памяти поднимается с диска
+        assert await c.get('k0') == 'x' * 10
+        st = c.stats()
+        assert st['disk_hits'] == 1 and st['memory_hits'] == 0
+        assert (st['hits'], st['misses'], st['hit_ratio']) == (1, 0, 1.0)
+        await c.purge()
+        assert await c.get('k0') is None
+    asyncio.run(run())
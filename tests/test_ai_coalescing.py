@@ -0,0 +1,63 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+from app.ai_service import AIService
+
+
+def _service(monkeypatch, reply='Ответ'):
+    svc = AIService()
+    svc.openrouter_api_key = 'test-key'
+    calls = []
+
+    async def _complete(prompt, context=None):
+        calls.append(prompt)
+        await asyncio.sleep(0.05)
+        return reply
+
+    monkeypatch.setattr(svc, '_complete', _complete)
+    return svc, calls
+
+
+def test_identical_concurrent_prompts_share_one_upstream_call(monkeypatch):
+    monkeypatch.setenv('AI_CACHE_ENABLED', '0')
+    svc, calls = _service(monkeypatch)
+
+    async def run():
+        prompts = ['Где остановиться в Бурабае?'] * 20 + ['где остановиться в бурабае'] * 5 + ['Кокшетау'] * 3
+        return await asyncio.gather(*(svc.chat(p, 'ru') for p in prompts))
+
+    replies = asyncio.run(run())
+    assert replies == ['Ответ'] * 28
+    assert len(calls) == 2  # два уникальных вопроса
+    st = svc.stats()
+    assert st['upstream_calls'] == 2 and st['coalesced'] == 26 and st['inflight'] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call(monkeypatch):
+    monkeypatch.setenv('AI_CACHE_ENABLED', '0')
+    svc, calls = _service(monkeypatch)
+
+    async def run():
+        first = asyncio.create_task(svc.chat('Маршрут', 'ru'))
+        second = asyncio.create_task(svc.chat('маршрут', 'ru'))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 'Ответ'
+    assert len(calls) == 1
+
+
+def test_failed_upstream_is_not_shared_afterwards(monkeypatch):
+    monkeypatch.setenv('AI_CACHE_ENABLED', '0')
+    svc, calls = _service(monkeypatch, reply=None)
+
+    async def run():
+        a = await asyncio.gather(*(svc.chat('Жилье', 'ru') for _ in range(3)))
+        b = await svc.chat('Жилье', 'ru')
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert a == [svc._stub_response('Жилье')] * 3 and b == a[0]
+    assert len(calls) == 2
@@ -0,0 +1,61 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.ai_service import ai_service
+
+client = TestClient(app)
+
+
+def _events(body):
+    out = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        out.append((lines['event'], json.loads(lines['data'])))
+    return out
+
+
+def _upstream(monkeypatch, chunks, fail=False):
+    async def _stream_upstream(prompt, context=None):
+        for c in chunks:
+            yield c
+        if fail:
+            raise RuntimeError('connection reset')
+
+    monkeypatch.setattr(ai_service, 'openrouter_api_key', 'test-key')
+    monkeypatch.setattr(ai_service, '_stream_upstream', _stream_upstream)
+
+
+def test_stream_relays_deltas_and_caches_reply(monkeypatch):
+    _upstream(monkeypatch, ['Озеро ', 'Боровое', ' — рядом.'])
+    r = client.post('/api/v1/ai/chat/stream', json={'prompt': 'Что рядом с Бурабаем (stream)?', 'lang': 'ru'})
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('text/event-stream')
+    ev = _events(r.text)
+    assert [e for e, _ in ev] == ['delta', 'delta', 'delta', 'done']
+    assert ''.join(d['text'] for e, d in ev if e == 'delta') == 'Озеро Боровое — рядом.'
+    # полный ответ попал в общий кэш /ai/chat
+    _upstream(monkeypatch, [], fail=True)
+    r = client.post('/api/v1/ai/chat/stream', json={'prompt': 'что рядом с бурабаем (stream)', 'lang': 'ru'})
+    assert _events(r.text)[0] == ('delta', {'text': 'Озеро Боровое — рядом.'})
+
+
+def test_midstream_failure_falls_back_to_stub(monkeypatch):
+    _upstream(monkeypatch, ['Маршрут: '], fail=True)
+    r = client.post('/api/v1/ai/chat/stream', json={'prompt': 'Маршрут по Кокшетау (stream)', 'lang': 'ru'})
+    ev = _events(r.text)
+    assert ev[0] == ('delta', {'text': 'Маршрут: '})
+    assert ev[1] == ('fallback', {'text': ai_service._stub_response('Маршрут по Кокшетау (stream)')})
+    assert ev[-1][0] == 'done'
+    # оборванный ответ не кэшируется
+    _upstream(monkeypatch, ['Полный ответ'])
+    r = client.post('/api/v1/ai/chat/stream', json={'prompt': 'Маршрут по Кокшетау (stream)', 'lang': 'ru'})
+    assert _events(r.text)[0] == ('delta', {'text': 'Полный ответ'})
+
+
+def test_no_api_key_streams_stub(monkeypatch):
+    monkeypatch.setattr(ai_service, 'openrouter_api_key', None)
+    ev = _events(client.post('/api/v1/ai/chat/stream', json={'prompt': 'жилье'}).text)
+    assert ev[0][0] == 'fallback' and ev[-1] == ('done', {})
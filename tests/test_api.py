@@ -29,12 +29,14 @@ async def test_ai_chat_with_rag(monkeypatch):
     # Включаем RAG и указываем временную директорию
     monkeypatch.setenv("AI_USE_RAG", "1")
     monkeypatch.setenv("RAG_DATA_DIR", str(os.path.join(os.getcwd(), ".pytest_cache", "rag")))
+    monkeypatch.setenv("ADMIN_TOKEN", "adm-rag")
 
     async with AsyncClient(app=app, base_url="http://test") as ac:
         # сначала добавим документ
         r1 = await ac.post(
             "/api/v1/rag/documents",
             json={"title": "Kokshetau Attractions", "text": "Kokshetau has cultural sites and city walks."},
+            headers={"X-Admin-Token": "adm-rag"},
         )
         assert r1.status_code == status.HTTP_200_OK
 
@@ -0,0 +1,56 @@
+import os
+import json
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+from fastapi.testclient import TestClient
+from app.main import app
+from app import api
+
+client = TestClient(app)
+H = {'X-Admin-Token': 'adm-bulk'}
+
+
+def _obj(i):
+    return {'name': f'POI {i}', 'description': None, 'lat': 53.0, 'lon': 69.0}
+
+
+def test_bulk_objects_json_array_chunked(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-bulk')
+    monkeypatch.setattr(api, 'BULK_CHUNK_SIZE', 3)
+    r = client.post('/api/v1/objects/bulk', json=[_obj(i) for i in range(7)], headers=H)
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data['inserted'] == 7
+    assert data['ids'] == sorted(data['ids']) and len(set(data['ids'])) == 7
+
+
+def test_bulk_events_ndjson_and_reviews_update_rating(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-bulk')
+    body = '\n'.join(json.dumps({'title': f'Fest {i}', 'description': None, 'start_at': None, 'end_at': None,
+                                 'lat': None, 'lon': None}) for i in range(4)) + '\n'
+    r = client.post('/api/v1/events/bulk', content=body, headers={**H, 'Content-Type': 'application/x-ndjson'})
+    assert r.status_code == 200, r.text
+    assert r.json()['inserted'] == 4
+
+    uid = client.post('/api/v1/users', json={'external_id': None, 'name': 'B', 'email': 'bulk@example.com'}).json()['id']
+    oid = client.post('/api/v1/objects/bulk', json=[_obj('r')], headers=H).json()['ids'][0]
+    reviews = [{'user_id': uid, 'object_id': oid, 'rating': x, 'text': None} for x in (5, 4, 3)]
+    r = client.post('/api/v1/reviews/bulk', json=reviews, headers=H)
+    assert r.status_code == 200, r.text
+    assert client.get(f'/api/v1/objects/{oid}/score').json()['avg_rating'] == 4.0
+
+
+def test_bulk_invalid_row_rolls_back_everything(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-bulk')
+    monkeypatch.setattr(api, 'BULK_CHUNK_SIZE', 1)
+    rows = [_obj('ok-1'), _obj('ok-2'), {'name': '', 'description': None, 'lat': None, 'lon': None}]
+    r = client.post('/api/v1/objects/bulk', json=rows, headers=H)
+    assert r.status_code == 422
+    assert r.json()['detail']['index'] == 2
+    names = {o['name'] for o in client.get('/api/v1/objects', params={'limit': 500}).json()}
+    assert 'POI ok-1' not in names
+
+
+def test_bulk_requires_role():
+    r = client.post('/api/v1/objects/bulk', json=[_obj(0)])
+    assert r.status_code == 403
@@ -0,0 +1,146 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+import logging
+from sqlalchemy import select, update
+from fastapi.testclient import TestClient
+from app import models
+from app import crud, schemas, versions
+from app.catalog_cache import catalog_cache
+from app.database import AsyncSessionLocal
+from app.main import app
+from app.versions import catalog_versions, publish_changes
+
+client = TestClient(app)
+ADMIN = {'X-Admin-Token': 'adm-cache'}
+OBJ = {'name': 'Бурабай', 'description': None, 'lat': 53.08, 'lon': 70.3}
+
+
+def _stats():
+    s = catalog_cache.stats()
+    return s['hits'], s['misses'], s['bypasses']
+
+
+def test_hit_after_miss_and_invalidated_by_write():
+    client.post('/api/v1/objects', json=OBJ)
+    h0, m0, _ = _stats()
+    first = client.get('/api/v1/objects', params={'limit': 3})
+    second = client.get('/api/v1/objects', params={'limit': 3})
+    assert first.content == second.content
+    h1, m1, _ = _stats()
+    assert (h1 - h0, m1 - m0) == (1, 1)
+
+    oid = client.post('/api/v1/objects', json={**OBJ, 'name': 'Новый'}).json()['id']
+    assert catalog_cache.stats()['invalidations'] >= 1
+    ids = [o['id'] for o in client.get('/api/v1/objects', params={'limit': 500}).json()]
+    assert oid in ids
+
+
+def test_other_worker_write_is_seen_after_poll(monkeypatch):
+    monkeypatch.setattr(catalog_versions, 'poll_interval', 3600)
+    oid = client.post('/api/v1/objects', json=OBJ).json()['id']
+    client.get('/api/v1/objects', params={'limit': 500})
+
+    async def foreign_write():
+        # Запись «другого воркера»: строка и версия меняются мимо этого процесса
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(models.Object).where(models.Object.id == oid).values(name='Переименован'))
+            await db.execute(update(models.CatalogVersion).where(models.CatalogVersion.collection == 'objects')
+                             .values(version=models.CatalogVersion.version + 1))
+            await db.commit()
+
+    def name():
+        body = client.get('/api/v1/objects', params={'limit': 500}).json()
+        return next(o['name'] for o in body if o['id'] == oid)
+
+    assert name() == OBJ['name']
+    asyncio.run(foreign_write())
+    assert name() == OBJ['name']  # до опроса таблицы — страница из кэша
+    asyncio.run(catalog_versions.sync())
+    assert name() == 'Переименован'
+
+
+def test_stale_versions_bypass_cache_and_etag(monkeypatch):
+    client.get('/api/v1/events')
+    # Версии не обновлялись дольше max_stale (БД недоступна) — кэш и 304 отключаются
+    monkeypatch.setattr(catalog_versions, 'poll_interval', 3600)
+    monkeypatch.setattr(catalog_versions, 'max_stale', -1)
+    _, _, b0 = _stats()
+    r = client.get('/api/v1/events')
+    assert r.status_code == 200 and 'etag' not in r.headers
+    assert _stats()[2] == b0 + 1
+
+
+def test_admin_stats_and_clear(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-cache')
+    client.get('/api/v1/objects')
+    r = client.get('/api/v1/admin/catalog/cache', headers=ADMIN)
+    assert r.status_code == 200
+    assert {'hits', 'misses', 'evictions', 'bytes', 'bypasses', 'versions'} <= set(r.json())
+    assert client.delete('/api/v1/admin/catalog/cache', headers=ADMIN).json() == {'ok': True}
+    assert catalog_cache.stats()['size'] == 0
+
+
+def _version(db):
+    return db.execute(select(models.CatalogVersion.version).where(models.CatalogVersion.collection == 'objects'))
+
+
+def test_version_is_bumped_after_commit_not_inside_writer_transaction():
+    async def run():
+        async with AsyncSessionLocal() as db:
+            before = (await _version(db)).scalar() or 0
+            await crud.bulk_create_objects(db, [{'name': 'Bulk', 'description': None, 'lat': None, 'lon': None}])
+            # строка версии в транзакции писателя не трогается (и не блокируется)
+            assert ((await _version(db)).scalar() or 0) == before
+            await db.commit()
+            assert not catalog_versions.fresh('objects')  # до публикации своё изменение не кэшируется
+            await publish_changes()
+            assert (await _version(db)).scalar() == before + 1
+    asyncio.run(run())
+
+
+def test_concurrent_requests_share_one_sync(monkeypatch):
+    async def run():
+        catalog_versions.synced_at = float('-inf')
+        before = catalog_versions.syncs
+        await asyncio.gather(*(catalog_versions.ensure_fresh() for _ in range(20)))
+        return catalog_versions.syncs - before
+    assert asyncio.run(run()) == 1
+
+
+def test_sync_failures_are_logged_once(monkeypatch, caplog):
+    class _Down:
+        def connect(self):
+            raise ConnectionError('db down')
+    monkeypatch.setattr(versions, 'engine', _Down())
+    monkeypatch.setattr(catalog_versions, '_last_warning', float('-inf'))
+    errors = catalog_versions.sync_errors
+
+    async def run():
+        for _ in range(5):
+            catalog_versions.synced_at = float('-inf')
+            await catalog_versions.ensure_fresh()
+    with caplog.at_level(logging.WARNING, logger='app.versions'):
+        asyncio.run(run())
+    assert catalog_versions.sync_errors == errors + 5
+    assert len([r for r in caplog.records if 'Catalog versions' in r.getMessage()]) == 1
+
+
+def test_poller_publishes_and_releases_own_write(monkeypatch):
+    monkeypatch.setattr(catalog_versions, 'poll_interval', 3600)
+
+    async def run():
+        catalog_versions.start()
+        try:
+            async with AsyncSessionLocal() as db:
+                await crud.create_object(db, schemas.ObjectCreate(**OBJ))
+            # publish будит опрос; запросы сами в таблицу не ходят
+            for _ in range(100):
+                if catalog_versions.fresh('objects'):
+                    break
+                await asyncio.sleep(0.01)
+            return catalog_versions.fresh('objects')
+        finally:
+            await catalog_versions.stop()
+    assert asyncio.run(run())
@@ -0,0 +1,27 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import subprocess
+import sys
+from pathlib import Path
+from fastapi.testclient import TestClient
+from app.main import app
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_cold_path_modules_are_not_imported_at_startup():
+    code = (
+        "import sys, app.main; "
+        "print(','.join(m for m in ('alembic', 'httpx', 'tiktoken', 'app.oidc', 'app.integrations') if m in sys.modules))"
+    )
+    env = {**os.environ, 'DATABASE_URL': 'sqlite+aiosqlite:///:memory:', 'DISABLE_DB_INIT': '1'}
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
+
+
+def test_health_is_up_without_waiting_for_warmup(monkeypatch):
+    monkeypatch.setenv('OIDC_JWKS_URL', 'http://127.0.0.1:9/jwks')  # недоступен — прогрев падает в фоне
+    with TestClient(app) as client:
+        r = client.get('/health')
+        assert r.status_code == 200 and r.json()['status'] == 'ok'
@@ -0,0 +1,63 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+from fastapi.testclient import TestClient
+from app.main import app
+from app.versions import catalog_versions
+
+client = TestClient(app)
+OBJ = {'name': 'Жеке-Батыр', 'description': None, 'lat': 53.0, 'lon': 70.2}
+EVENT = {'title': 'Ярмарка', 'description': None, 'start_at': None, 'end_at': None, 'lat': None, 'lon': None}
+
+
+def test_etag_304_without_db_and_changes_after_create(monkeypatch):
+    # Без опроса catalog_versions между запросами 304 обходится без БД
+    monkeypatch.setattr(catalog_versions, 'poll_interval', 3600)
+    monkeypatch.setattr(catalog_versions, 'max_stale', 3600)
+    client.post('/api/v1/objects', json=OBJ)
+    r = client.get('/api/v1/objects', params={'limit': 5})
+    etag = r.headers['etag']
+    assert r.status_code == 200 and r.headers['cache-control'].startswith('public, max-age=')
+    assert 'last-modified' in r.headers
+
+    r2 = client.get('/api/v1/objects', params={'limit': 5}, headers={'If-None-Match': etag})
+    assert r2.status_code == 304 and r2.content == b'' and r2.headers['etag'] == etag
+    assert r2.headers['server-timing'].startswith('db;dur=0.0;desc="0 queries"')
+    # W/ и список тегов — слабое сравнение
+    assert client.get('/api/v1/objects', params={'limit': 5},
+                      headers={'If-None-Match': f'"other", W/{etag}'}).status_code == 304
+    # другие параметры — другое тело и другой тег
+    assert client.get('/api/v1/objects', params={'limit': 6}, headers={'If-None-Match': etag}).status_code == 200
+
+    client.post('/api/v1/objects', json=OBJ)
+    r3 = client.get('/api/v1/objects', params={'limit': 5}, headers={'If-None-Match': etag})
+    assert r3.status_code == 200 and r3.headers['etag'] != etag
+
+
+def test_collections_are_versioned_independently():
+    r = client.get('/api/v1/events')
+    etag = r.headers['etag']
+    client.post('/api/v1/objects', json=OBJ)
+    assert client.get('/api/v1/events', headers={'If-None-Match': etag}).status_code == 304
+    client.post('/api/v1/events', json=EVENT)
+    assert client.get('/api/v1/events', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_review_changes_object_rating_etag():
+    oid = client.post('/api/v1/objects', json=OBJ).json()['id']
+    uid = client.post('/api/v1/users', json={'external_id': None, 'name': 'T', 'email': None}).json()['id']
+    etag = client.get('/api/v1/objects').headers['etag']
+    client.post('/api/v1/reviews', json={'user_id': uid, 'object_id': oid, 'rating': 4, 'text': 'ok'})
+    assert client.get('/api/v1/objects', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_if_modified_since():
+    from email.utils import formatdate, parsedate_to_datetime
+    r = client.get('/api/v1/events')
+    lm = parsedate_to_datetime(r.headers['last-modified']).timestamp()
+    # В ту же секунду могла быть ещё запись — по секундной дате 304 не отдаём
+    assert client.get('/api/v1/events', headers={'If-Modified-Since': r.headers['last-modified']}).status_code == 200
+    later = formatdate(lm + 1, usegmt=True)
+    assert client.get('/api/v1/events', headers={'If-Modified-Since': later}).status_code == 304
+    assert client.get('/api/v1/events', headers={'If-Modified-Since': 'Thu, 01 Jan 1970 00:00:00 GMT'}).status_code == 200
+    assert client.get('/api/v1/events', headers={'If-Modified-Since': 'garbage'}).status_code == 200
@@ -0,0 +1,41 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app import database
+
+
+def test_engine_kwargs_per_backend():
+    pg = database._engine_kwargs('postgresql+asyncpg://u:p@h/db')
+    assert pg['poolclass'] is database.TimedQueuePool
+    assert pg['pool_size'] == database.DB_POOL_SIZE
+    assert pg['connect_args']['prepared_statement_cache_size'] == database.DB_PG_STMT_CACHE_SIZE
+    mem = database._engine_kwargs('sqlite+aiosqlite:///:memory:')
+    assert 'poolclass' not in mem and 'pool_size' not in mem
+    f = database._engine_kwargs('sqlite+aiosqlite:///./kiosk.db')
+    assert f['poolclass'] is database.TimedQueuePool and 'connect_args' not in f
+
+
+def test_sqlite_file_engine_uses_wal(tmp_path):
+    url = f'sqlite+aiosqlite:///{tmp_path}/kiosk.db'
+    eng = create_async_engine(url, **database._engine_kwargs(url))
+    # тот же connect-хук, что вешается на основной движок
+    event.listen(eng.sync_engine, 'connect', database._sqlite_pragmas)
+
+    async def run():
+        async with eng.connect() as conn:
+            mode = (await conn.execute(text('PRAGMA journal_mode'))).scalar()
+            busy = (await conn.execute(text('PRAGMA busy_timeout'))).scalar()
+        await eng.dispose()
+        return mode, busy
+
+    mode, busy = asyncio.run(run())
+    assert mode == 'wal'
+    assert busy == database.DB_SQLITE_BUSY_TIMEOUT_MS
+
+
+def test_pool_stats_shape():
+    stats = database.pool_stats()
+    assert 'pool' in stats and 'wait_avg_ms' in stats and 'checkouts' in stats
@@ -0,0 +1,52 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+import json
+import pytest
+from pydantic import ValidationError
+from fastapi.testclient import TestClient
+from app import crud, schemas
+from app.database import AsyncSessionLocal
+from app.main import app
+from app.serialization import render_rows, row_fields
+
+client = TestClient(app)
+
+
+def test_row_path_matches_orm_serialization():
+    client.post('/api/v1/objects', json={'name': 'Окжетпес', 'description': 'Скала', 'lat': 53.08, 'lon': 70.3})
+    client.post('/api/v1/events', json={'title': 'Фестиваль', 'description': None, 'start_at': '2025-07-01',
+                                        'end_at': None, 'lat': None, 'lon': None})
+    client.post('/api/v1/complaints', json={'user_id': None, 'object_id': None, 'category': 'litter',
+                                            'text': 'Мусор у озера', 'photo_url': None, 'lat': None, 'lon': None})
+
+    async def both(list_fn, schema):
+        async with AsyncSessionLocal() as db:
+            orm = await list_fn(db, limit=50)
+            rows = await list_fn(db, limit=50, fields=row_fields(schema))
+        expected = [schema.model_validate(o, from_attributes=True).model_dump(mode='json') for o in orm]
+        return expected, rows
+
+    for list_fn, schema in ((crud.list_objects, schemas.ObjectOut), (crud.list_events, schemas.EventOut),
+                            (crud.list_complaints, schemas.ComplaintOut)):
+        expected, rows = asyncio.run(both(list_fn, schema))
+        assert expected
+        assert json.loads(render_rows(rows, schema)) == expected
+        assert json.loads(render_rows(rows, schema, validate=True)) == expected
+
+
+def test_list_endpoint_uses_json_body_and_cursor_header():
+    for i in range(3):
+        client.post('/api/v1/objects', json={'name': f'Fast {i}', 'description': None, 'lat': 52.0, 'lon': 70.0})
+    r = client.get('/api/v1/objects', params={'limit': 2})
+    assert r.status_code == 200 and r.headers['content-type'] == 'application/json'
+    body = r.json()
+    assert len(body) == 2 and set(body[0]) == set(schemas.ObjectOut.model_fields)
+    nxt = client.get('/api/v1/objects', params={'limit': 2, 'cursor': r.headers['X-Next-Cursor']}).json()
+    assert not {o['id'] for o in nxt} & {o['id'] for o in body}
+
+
+def test_validation_rejects_bad_rows():
+    with pytest.raises(ValidationError):
+        render_rows([(1, None, None, None, None, None)], schemas.ObjectOut, validate=True)
@@ -0,0 +1,77 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import httpx
+import pytest
+from app.http_client import OutboundHTTP
+
+
+@pytest.mark.asyncio
+async def test_client_reused_per_host_with_host_timeouts(monkeypatch):
+    monkeypatch.setenv('OUTBOUND_LIMITS_JSON', '{"slow.example": {"timeout": 42, "max_connections": 3}}')
+    out = OutboundHTTP()
+    a = out.client_for('https://slow.example/a')
+    b = out.client_for('https://slow.example/b?x=1')
+    c = out.client_for('https://openrouter.ai/api/v1/chat/completions')
+    assert a is b and a is not c
+    assert a.timeout.read == 42
+    assert c.timeout.read == 30
+    await out.aclose()
+    assert a.is_closed
+
+
+@pytest.mark.asyncio
+async def test_upstream_latency_recorded():
+    out = OutboundHTTP()
+    client = out.client_for('http://upstream.test/')
+    # подменяем сетевой транспорт внутри измеряющей обёртки
+    client._transport._inner = httpx.MockTransport(lambda req: httpx.Response(200, json={'ok': True}))
+    for _ in range(3):
+        r = await client.get('http://upstream.test/ping')
+        assert r.json() == {'ok': True}
+    st = out.stats()['upstream.test']
+    assert st['requests'] == 3 and st['errors'] == 0
+    await out.aclose()
+
+
+def test_client_from_another_loop_is_replaced_and_logged(caplog):
+    import asyncio
+    import logging
+    out = OutboundHTTP()
+
+    async def get():
+        return out.client_for('http://upstream.test/')
+
+    first = asyncio.run(get())
+    with caplog.at_level(logging.INFO, logger='app.http_client'):
+        second = asyncio.run(get())
+    assert second is not first
+    assert 'stopped event loop' in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_adapters_share_pooled_client(monkeypatch):
+    from app import integrations
+    out = OutboundHTTP()
+    monkeypatch.setattr(integrations, 'outbound', out)
+    a, b = integrations.TripAdvisorAdapter('k1'), integrations.TripAdvisorAdapter('k2')
+    assert a.client is b.client is out.client_for(a.BASE_URL)
+    assert a.client is not integrations.BookingAdapter().client
+    # вызовы API пока заглушки — без сети
+    assert (await a.search('x'))[0]['id'] == 'ta1'
+    await out.aclose()
+
+
+@pytest.mark.asyncio
+async def test_warmup_is_not_counted_as_upstream_request():
+    out = OutboundHTTP()
+    methods = []
+    client = out.client_for('http://upstream.test/')
+    client._transport._inner = httpx.MockTransport(lambda req: methods.append(req.method) or httpx.Response(200))
+    await out.warm('http://upstream.test/api')
+    st = out.stats()['upstream.test']
+    assert methods == ['HEAD'] and st['warmups'] == 1 and st['requests'] == 0
+    await client.get('http://upstream.test/ping')
+    await out.warm('http://upstream.test/api')  # соединение только что использовано — прогрев не нужен
+    assert methods == ['HEAD', 'GET'] and out.stats()['upstream.test']['warmups'] == 1
+    await out.aclose()
@@ -0,0 +1,132 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import engine
+from app.ingest import MetricsPipeline, metrics_pipeline, parse_event
+
+client = TestClient(app)
+ADMIN = {'X-Admin-Token': 'adm-metrics'}
+NOW = 1_750_000_000  # 2025-06-15 15:06:40 UTC
+
+
+def test_parse_event_normalizes_and_rejects():
+    ev = parse_event({'type': 'view', 'object_id': 7, 'ts': NOW * 1000 + 500, 'props': {'lang': 'kk'}}, NOW)
+    assert ev['event_type'] == 'view' and ev['object_id'] == 7
+    assert ev['ts'].timestamp() == NOW and ev['props'] == '{"lang":"kk"}'
+    assert parse_event({'event': 'click', 'ts': '2025-06-15T15:06:40Z'}, NOW)['ts'].timestamp() == NOW
+    # ts из будущего прижимается к now + 5 минут
+    assert parse_event({'type': 'x', 'ts': NOW + 86400}, NOW)['ts'].timestamp() == NOW + 300
+    for bad in ({}, {'type': ''}, {'type': 'x' * 65}, {'type': 'x', 'object_id': '5'},
+                {'type': 'x', 'object_id': True}, {'type': 'x', 'object_id': 2 ** 31},
+                {'type': 'x', 'object_id': 2 ** 70}, {'type': 'x', 'ts': 'yesterday'}, ['view']):
+        assert parse_event(bad, NOW) is None
+
+
+def test_ingest_flush_and_rollups(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-metrics')
+    base = {'ts': NOW, 'session': 's1'}
+    r = client.post('/api/v1/metrics/ingest', json={'events': [
+        {**base, 'type': 'ingest-view', 'object_id': 1},
+        {**base, 'type': 'ingest-view', 'object_id': 1, 'ts': NOW + 10},
+        {**base, 'type': 'ingest-view', 'object_id': 2},
+        {'type': 'bad', 'object_id': 'x'},
+    ]})
+    assert r.status_code == 202
+    assert r.json() == {'ok': True, 'accepted': 3, 'dropped': 0, 'invalid': 1}
+    # одиночное событие и NDJSON
+    assert client.post('/api/v1/metrics/ingest', json={**base, 'type': 'ingest-search'}).json()['accepted'] == 1
+    nd = '\n'.join(json.dumps({**base, 'type': 'ingest-view', 'object_id': 1}) for _ in range(2))
+    r = client.post('/api/v1/metrics/ingest', content=nd, headers={'Content-Type': 'application/x-ndjson'})
+    assert r.json()['accepted'] == 2
+
+    assert asyncio.run(metrics_pipeline.flush()) == 6
+    assert metrics_pipeline.stats()['queued'] == 0
+
+    rows = client.get('/api/v1/admin/metrics/rollups', params={'type': 'ingest-view'}, headers=ADMIN).json()
+    assert [(r['object_id'], r['count']) for r in rows] == [(1, 4), (2, 1)]
+    rows = client.get('/api/v1/admin/metrics/rollups', params={'type': 'ingest-search'}, headers=ADMIN).json()
+    assert rows[0]['object_id'] is None and rows[0]['count'] == 1
+
+    # повторный сброс прибавляет к существующим минутным счётчикам
+    client.post('/api/v1/metrics/ingest', json=[{**base, 'type': 'ingest-view', 'object_id': 2}])
+    asyncio.run(metrics_pipeline.flush())
+    rows = client.get('/api/v1/admin/metrics/rollups', params={'type': 'ingest-view', 'object_id': 2}, headers=ADMIN).json()
+    assert rows[0]['count'] == 2
+    assert client.get('/api/v1/admin/metrics/pipeline', headers=ADMIN).json()['written'] >= 7
+
+
+def test_ingest_rejects_bad_bodies():
+    r = client.post('/api/v1/metrics/ingest', content=b'{oops', headers={'Content-Type': 'application/json'})
+    assert r.status_code == 400
+    assert client.post('/api/v1/metrics/ingest', json='view').status_code == 400
+
+
+def test_full_queue_sheds_load(monkeypatch):
+    pipeline = MetricsPipeline(engine, max_queue=2)
+    evs = [parse_event({'type': 'x'}, NOW) for _ in range(3)]
+    assert pipeline.offer(evs) == 2 and pipeline.stats()['dropped'] == 1
+
+    from app import api
+    monkeypatch.setattr(api, 'metrics_pipeline', pipeline)
+    r = client.post('/api/v1/metrics/ingest', json={'type': 'x'})
+    assert r.status_code == 503 and r.headers['retry-after'] == '1'
+
+
+def test_background_writer_flushes_on_batch_and_stop():
+    async def run():
+        pipeline = MetricsPipeline(engine, batch_max=2, flush_interval=60)
+        pipeline.start()
+        pipeline.offer([parse_event({'type': 'bg'}, NOW) for _ in range(2)])
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if pipeline.stats()['written']:
+                break
+        written_by_batch = pipeline.stats()['written']
+        pipeline.offer([parse_event({'type': 'bg'}, NOW)])
+        await pipeline.stop()  # остаток пишется при остановке
+        return written_by_batch, pipeline.stats()
+
+    written_by_batch, st = asyncio.run(run())
+    assert written_by_batch == 2 and st['written'] == 3 and st['running'] is False
+
+
+def test_rejected_event_does_not_block_queue():
+    async def run():
+        pipeline = MetricsPipeline(engine, batch_max=8)
+        evs = [parse_event({'type': 'poison', 'object_id': i}, NOW) for i in range(7)]
+        evs[4]['object_id'] = 2 ** 70  # мимо parse_event: БД отвергает само событие
+        pipeline.offer(evs)
+        written = await pipeline.flush()
+        pipeline.offer([parse_event({'type': 'poison'}, NOW)])
+        return written, await pipeline.flush(), pipeline.stats()
+
+    written, later, st = asyncio.run(run())
+    assert written == 6 and later == 1
+    assert st['failed'] == 1 and st['queued'] == 0
+
+
+def test_stop_finishes_batch_in_flight(monkeypatch):
+    async def run():
+        pipeline = MetricsPipeline(engine, batch_max=2, flush_interval=60)
+        started = asyncio.Event()
+        write = pipeline._write
+
+        async def slow_write(batch):
+            started.set()
+            await asyncio.sleep(0.05)
+            await write(batch)
+
+        monkeypatch.setattr(pipeline, '_write', slow_write)
+        pipeline.start()
+        pipeline.offer([parse_event({'type': 'stop'}, NOW) for _ in range(2)])
+        await started.wait()
+        pipeline.offer([parse_event({'type': 'stop'}, NOW)])
+        await pipeline.stop()
+        return pipeline.stats()
+
+    st = asyncio.run(run())
+    assert st['written'] == 3 and st['queued'] == 0 and st['failed'] == 0
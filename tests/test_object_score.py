@@ -0,0 +1,44 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def _object(name):
+    r = client.post('/api/v1/objects', json={'name': name, 'description': None, 'lat': None, 'lon': None})
+    assert r.status_code == 200, r.text
+    return r.json()['id']
+
+
+def test_score_counters_follow_writes(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-score')
+    uid = client.post('/api/v1/users', json={'external_id': None, 'name': 'S', 'email': 'score@example.com'}).json()['id']
+    oid = _object('Scored')
+    for rating in (5, 3):
+        r = client.post('/api/v1/reviews', json={'user_id': uid, 'object_id': oid, 'rating': rating, 'text': None})
+        assert r.status_code == 200, r.text
+    comp = client.post('/api/v1/complaints', json={'user_id': uid, 'object_id': oid, 'category': 'noise', 'text': 't',
+                                                   'photo_url': None, 'lat': None, 'lon': None}).json()
+
+    data = client.get(f'/api/v1/objects/{oid}/score').json()
+    assert data == {'object_id': oid, 'avg_rating': 4.0, 'complaints': 1, 'score': 77}
+    objs = {o['id']: o for o in client.get('/api/v1/objects', params={'limit': 500}).json()}
+    assert objs[oid]['rating'] == 4.0
+
+    # Как и прежде, учитываются все жалобы: смена статуса счётчик не меняет
+    h = {'X-Admin-Token': 'adm-score'}
+    r = client.post(f"/api/v1/complaints/{comp['id']}/status", json={'status': 'rejected'}, headers=h)
+    assert r.status_code == 200, r.text
+    assert client.get(f'/api/v1/objects/{oid}/score').json()['complaints'] == 1
+
+
+def test_batch_scores():
+    a, b = _object('A'), _object('B')
+    r = client.get('/api/v1/objects/scores', params=[('ids', a), ('ids', b), ('ids', 10**9)])
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert [d['object_id'] for d in data] == [a, b, 10**9]
+    assert data[2] == {'object_id': 10**9, 'avg_rating': 0.0, 'complaints': 0, 'score': 0}
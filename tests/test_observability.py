@@ -0,0 +1,74 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.main import app
+from app.database import engine
+from app.metrics import ENABLED
+from app import observability
+
+client = TestClient(app)
+
+
+def test_health_reports_db_pool_and_loop():
+    r = client.get('/api/health')
+    assert r.status_code == 200
+    body = r.json()
+    assert body['status'] == 'ok' and body['checks']['db']['ok'] is True
+    assert 'checkouts' in body['db_pool'] and 'lag_ms' in body['event_loop']
+    assert client.get('/api/health/live').json() == {'status': 'ok'}
+
+
+def test_health_unavailable_when_db_check_fails(monkeypatch):
+    class _Broken:
+        def connect(self):
+            raise ConnectionError('db down')
+
+    monkeypatch.setattr(observability, 'engine', _Broken())
+    r = client.get('/api/health')
+    assert r.status_code == 503 and r.json()['checks']['db'] == {'ok': False, 'error': 'db down'}
+
+
+def test_sql_statements_counted_per_request():
+    r = client.get('/api/v1/objects', params={'limit': 5})
+    assert r.status_code == 200
+    timing = r.headers['server-timing']
+    assert timing.startswith('db;dur=') and 'queries' in timing
+
+    async def run():
+        token = observability._request_db.set({'queries': 0, 'db_sec': 0.0})
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text('SELECT 1'))
+                await conn.execute(text('SELECT 2'))
+            return observability.current_db_stats()
+        finally:
+            observability._request_db.reset(token)
+
+    stats = asyncio.run(run())
+    assert stats['queries'] == 2 and stats['db_sec'] > 0
+
+
+def test_loop_lag_monitor_detects_blocking():
+    async def run():
+        mon = observability.LoopLagMonitor(interval=0.01)
+        mon.start()
+        await asyncio.sleep(0.02)
+        import time
+        time.sleep(0.05)  # блокирующий вызов в event loop
+        await asyncio.sleep(0.03)
+        await mon.stop()
+        return mon.stats()
+
+    st = asyncio.run(run())
+    assert st['max_lag_ms'] >= 30 and st['running'] is False
+
+
+def test_metrics_endpoint():
+    r = client.get('/metrics')
+    if not ENABLED:
+        assert r.status_code == 503
+        return
+    assert r.status_code == 200 and b'http_request_duration_seconds' in r.content
@@ -0,0 +1,127 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import jwt
+import pytest
+
+pytest.importorskip('cryptography')
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.oidc import JWKSCache  # noqa: E402
+
+
+def _keypair(kid):
+    priv = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(priv.public_key()))
+    jwk.update(kid=kid, alg='RS256', use='sig')
+    return priv, jwk
+
+
+class _JWKSServer:
+    """Локальная замена JWKS-эндпоинта провайдера: считает обращения."""
+
+    def __init__(self):
+        self.keys = []
+        self.hits = 0
+        srv = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                srv.hits += 1
+                body = json.dumps({'keys': srv.keys}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/jwks'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+@pytest.fixture
+def jwks_server():
+    s = _JWKSServer()
+    yield s
+    s.close()
+
+
+def _token(priv, kid, **claims):
+    payload = {'sub': 'egov:1', 'exp': int(time.time()) + 600, **claims}
+    return jwt.encode(payload, priv, algorithm='RS256', headers={'kid': kid})
+
+
+@pytest.mark.asyncio
+async def test_jwks_fetched_once_and_refetched_on_rotation(jwks_server):
+    p1, j1 = _keypair('k1')
+    jwks_server.keys = [j1]
+    cache = JWKSCache(jwks_server.url, ttl=3600, min_refetch_interval=0)
+    for _ in range(5):
+        key = await cache.get_signing_key_from_jwt(_token(p1, 'k1'))
+        assert jwt.decode(_token(p1, 'k1'), key, algorithms=['RS256'])['sub'] == 'egov:1'
+    assert jwks_server.hits == 1
+
+    # Ротация: новый kid подтягивается внеочередным запросом
+    p2, j2 = _keypair('k2')
+    jwks_server.keys = [j1, j2]
+    await cache.get_signing_key_from_jwt(_token(p2, 'k2'))
+    assert jwks_server.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refetch_is_rate_limited(jwks_server):
+    p1, j1 = _keypair('k1')
+    jwks_server.keys = [j1]
+    cache = JWKSCache(jwks_server.url, ttl=3600, min_refetch_interval=60)
+    await cache.get_signing_key('k1')
+    for _ in range(3):
+        with pytest.raises(jwt.PyJWKClientError):
+            await cache.get_signing_key('nope')
+    assert jwks_server.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_unavailable_jwks_fails_fast_until_refetch_interval(jwks_server):
+    import asyncio
+    url = jwks_server.url
+    jwks_server.close()  # провайдер недоступен
+    jwks_server.httpd.server_close()
+    cache = JWKSCache(url, min_refetch_interval=60, timeout=1)
+    # конкурентные входы ждут один fetch, последующие — ошибка без обращения к сети
+    results = await asyncio.gather(*(cache.get_signing_key('k1') for _ in range(5)), return_exceptions=True)
+    assert all(isinstance(r, Exception) for r in results)
+    for _ in range(3):
+        with pytest.raises(jwt.PyJWKClientError):
+            await cache.get_signing_key('k1')
+    assert cache.fetches == 1
+
+
+def test_oidc_validate_with_jwks(jwks_server, monkeypatch):
+    p1, j1 = _keypair('kv')
+    jwks_server.keys = [j1]
+    monkeypatch.setenv('OIDC_JWKS_URL', jwks_server.url)
+    monkeypatch.delenv('OIDC_AUDIENCE', raising=False)
+    monkeypatch.delenv('OIDC_ISSUER', raising=False)
+    client = TestClient(app)
+    for _ in range(3):
+        r = client.post('/api/v1/auth/oidc/validate', params={'id_token': _token(p1, 'kv')})
+        assert r.status_code == 200, r.text
+        assert r.json()['claims']['sub'] == 'egov:1'
+    assert jwks_server.hits == 1
+    p_bad, _ = _keypair('kv')
+    r = client.post('/api/v1/auth/oidc/validate', params={'id_token': _token(p_bad, 'kv')})
+    assert r.status_code == 400
@@ -0,0 +1,70 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import marshal
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.profiling import default_profiler
+
+client = TestClient(app)
+ADMIN = {'X-Admin-Token': 'adm-prof'}
+
+
+@pytest.fixture(autouse=True)
+def _admin(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-prof')
+    default_profiler.disarm()
+    default_profiler.profiles.clear()
+    yield
+    default_profiler.disarm()
+
+
+def test_arming_requires_admin():
+    assert client.post('/api/v1/admin/profiling', json={}).status_code == 403
+    assert client.get('/api/v1/admin/profiling').status_code == 403
+
+
+def test_route_rule_profiles_matching_requests_until_exhausted():
+    r = client.post('/api/v1/admin/profiling', headers=ADMIN,
+                    json={'route': '/api/v1/objects/{object_id}/score', 'max_profiles': 2})
+    assert r.status_code == 200
+    for i in range(3):
+        client.get(f'/api/v1/objects/{i + 1}/score')
+    client.get('/api/v1/objects', params={'limit': 1})  # другой маршрут не профилируется
+
+    st = client.get('/api/v1/admin/profiling', headers=ADMIN).json()
+    assert st['rules'] == []  # правило исчерпано и снято
+    profs = st['profiles']
+    assert [p['path'] for p in profs] == ['/api/v1/objects/1/score', '/api/v1/objects/2/score']
+    assert profs[0]['route'] == '/api/v1/objects/{object_id}/score' and profs[0]['status'] == 200
+
+    raw = client.get(f"/api/v1/admin/profiling/profiles/{profs[0]['id']}", headers=ADMIN)
+    assert raw.headers['content-type'] == 'application/octet-stream'
+    assert any(fn[2] == 'object_score' for fn in marshal.loads(raw.content))
+    text = client.get(f"/api/v1/admin/profiling/profiles/{profs[0]['id']}", params={'format': 'text'}, headers=ADMIN)
+    # Место object_score в топе отчёта не гарантировано — проверяем только сам отчёт
+    assert text.status_code == 200 and 'function calls' in text.text
+
+
+def test_header_profiles_single_request_in_stack_mode():
+    rule = client.post('/api/v1/admin/profiling', headers=ADMIN, json={'mode': 'stack', 'max_profiles': 5}).json()
+    client.get('/api/v1/objects/1/score')  # без заголовка — мимо
+    client.get('/api/v1/objects/1/score', headers={'X-Profile': 'wrong'})
+    client.get('/api/v1/objects/1/score', headers=rule['header'])
+    profs = default_profiler.stats()['profiles']
+    assert len(profs) == 1 and profs[0]['mode'] == 'stack'
+    r = client.get(f"/api/v1/admin/profiling/profiles/{profs[0]['id']}", headers=ADMIN)
+    assert r.status_code == 200 and r.headers['content-type'].startswith('text/plain')
+
+    assert client.delete('/api/v1/admin/profiling', headers=ADMIN).json() == {'disarmed': 1}
+    assert client.get('/api/v1/admin/profiling/profiles/999', headers=ADMIN).status_code == 404
+
+
+def test_ring_buffer_is_bounded():
+    rule = default_profiler.arm(max_profiles=100)
+    for _ in range(default_profiler.profiles.maxlen + 5):
+        client.get('/api/health/live', headers={'X-Profile': rule.id})
+    profs = default_profiler.stats()['profiles']
+    assert len(profs) == default_profiler.profiles.maxlen
+    assert profs[-1]['id'] - profs[0]['id'] == default_profiler.profiles.maxlen - 1
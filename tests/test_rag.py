@@ -10,6 +10,8 @@ from app import app
 async def test_rag_ingest_and_search(tmp_path, monkeypatch):
     # Изолируем стор в temp-директории
     monkeypatch.setenv("RAG_DATA_DIR", str(tmp_path / "rag"))
+    # Ингест доступен admin/content-manager
+    monkeypatch.setenv("ADMIN_TOKEN", "adm-rag")
 
     async with AsyncClient(app=app, base_url="http://test") as ac:
         # Ингест документа
@@ -21,6 +23,7 @@ async def test_rag_ingest_and_search(tmp_path, monkeypatch):
                 "lang": "EN",
                 "tags": ["park", "nature"],
             },
+            headers={"X-Admin-Token": "adm-rag"},
         )
         assert r1.status_code == status.HTTP_200_OK, r1.text
         doc = r1.json()
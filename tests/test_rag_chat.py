@@ -0,0 +1,81 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+from fastapi.testclient import TestClient
+from app.main import app
+from app.ai_service import AIService
+from app.http_client import outbound
+from app.rag import FileRAGStore, build_context, chunk_text, count_tokens
+
+client = TestClient(app)
+
+DOCS = [
+    {'title': 'Бурабай', 'text': 'Озеро Боровое окружено сосновым лесом.\n\nСкала Окжетпес стоит у берега озера Боровое.'},
+    {'title': 'Кокшетау', 'text': 'В Кокшетау есть музей истории области и парк Победы.'},
+    {'title': 'Кухня', 'text': 'Бешбармак и баурсаки подают в гостевых домах. ' * 40},
+]
+
+
+def test_chunks_carry_precomputed_tokens(tmp_path, monkeypatch):
+    monkeypatch.setenv('RAG_CHUNK_TOKENS', '40')
+    store = FileRAGStore(str(tmp_path))
+    asyncio.run(store.add_documents(DOCS))
+    hits = asyncio.run(store.search('озеро Боровое', k=3))
+    assert hits[0]['title'] == 'Бурабай'
+    assert all(h['tokens'] == count_tokens(h['text']) for h in hits)
+    assert all(count_tokens(c) <= 40 for c in chunk_text(DOCS[2]['text'], 40))
+    assert isinstance(asyncio.run(store.search('озеро', k=1, mode='simple'))[0]['score'], int)
+
+
+def test_context_respects_token_budget():
+    chunks = [
+        {'title': 'A', 'text': 'x' * 400, 'tokens': 100},
+        {'title': 'B', 'text': 'short', 'tokens': 5},
+        {'title': 'C', 'text': 'y' * 160, 'tokens': 40},
+    ]
+    ctx, used = build_context(chunks, budget=60)
+    assert used <= 60
+    assert '[1] B' in ctx and '[2] C' in ctx and 'A' not in ctx.split('\n')[0]
+    assert build_context(chunks, budget=3) == ('', 0)
+
+
+def test_rag_chat_packs_context_and_warms_upstream(tmp_path, monkeypatch):
+    monkeypatch.setenv('AI_CACHE_ENABLED', '0')
+    monkeypatch.setenv('AI_RAG_CONTEXT_TOKENS', '60')
+    monkeypatch.setenv('RAG_DATA_DIR', str(tmp_path))
+    monkeypatch.setenv('RAG_CHUNK_TOKENS', '40')
+    svc = AIService()
+    svc.openrouter_api_key = 'test-key'
+    seen, warmed = [], []
+
+    async def _complete(prompt, context=None):
+        seen.append(context)
+        return 'ok'
+
+    async def _warm(url):
+        warmed.append(url)
+
+    monkeypatch.setattr(svc, '_complete', _complete)
+    monkeypatch.setattr(outbound, 'warm', _warm)
+    from app.rag import rag_store
+    asyncio.run(rag_store.add_documents(DOCS))
+
+    assert asyncio.run(svc.chat('Что посмотреть у озера Боровое?', 'ru', rag=True)) == 'ok'
+    assert 'Боровое' in seen[0] and count_tokens(seen[0]) <= 60 + 10
+    assert len(warmed) == 1
+    asyncio.run(svc.chat('Что посмотреть у озера Боровое?', 'ru', rag=False))
+    assert seen[1] is None
+    payload = svc._payload('q', context=seen[0])
+    assert [m['role'] for m in payload['messages']] == ['system', 'system', 'user']
+
+
+def test_rag_endpoints_require_content_role(tmp_path, monkeypatch):
+    monkeypatch.setenv('RAG_DATA_DIR', str(tmp_path))
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-rag')
+    doc = {'title': 'Жеке-Батыр', 'text': 'Гора Жеке-Батыр видна с озера Боровое.'}
+    assert client.post('/api/v1/rag/documents', json=doc).status_code in (401, 403)
+    r = client.post('/api/v1/rag/documents/batch', json={'items': [doc]}, headers={'X-Admin-Token': 'adm-rag'})
+    assert r.status_code == 200 and r.json()['ok'] == 1
+    r = client.get('/api/v1/rag/search', params={'q': 'гора жеке-батыр', 'k': 2})
+    assert r.json()['results'][0]['title'] == 'Жеке-Батыр'
@@ -7,6 +7,7 @@ from app import app
 def test_rag_embeddings_search():
     os.environ['DISABLE_DB_INIT'] = '1'
     os.environ['RAG_SEARCH_MODE'] = 'embeddings'
+    os.environ['ADMIN_TOKEN'] = 'adm-rag'
     client = TestClient(app)
     # Ingest few docs
     docs = [
@@ -14,7 +15,7 @@ def test_rag_embeddings_search():
         {"title": "Kokshetau City", "text": "City in Akmola with historical places and museums."},
         {"title": "Aqmola Cuisine", "text": "Traditional Kazakh meals and local cuisine specialties."},
     ]
-    r = client.post('/api/v1/rag/documents/batch', json={"items": docs})
+    r = client.post('/api/v1/rag/documents/batch', json={"items": docs}, headers={'X-Admin-Token': 'adm-rag'})
     assert r.status_code == 200, r.text
     # Query for lakes
     r2 = client.get('/api/v1/rag/search', params={'q': 'lake with forests', 'k': 2})
@@ -9,6 +9,7 @@ from app import app
 async def test_rag_search_modes_difference(tmp_path, monkeypatch):
     # Изолируем стор
     monkeypatch.setenv("RAG_DATA_DIR", str(tmp_path / "rag"))
+    monkeypatch.setenv("ADMIN_TOKEN", "adm-rag")
     # Ингест нескольких документов
     docs = [
         {"title": "Burabay Lake", "text": "Beautiful lake with pine forests and clear water in Aqmola."},
@@ -16,7 +17,8 @@ async def test_rag_search_modes_difference(tmp_path, monkeypatch):
         {"title": "Urban Kokshetau", "text": "City life, museums and urban development."},
     ]
     async with AsyncClient(app=app, base_url="http://test") as ac:
-        r_batch = await ac.post("/api/v1/rag/documents/batch", json={"items": docs})
+        r_batch = await ac.post("/api/v1/rag/documents/batch", json={"items": docs},
+                                 headers={"X-Admin-Token": "adm-rag"})
         assert r_batch.status_code == status.HTTP_200_OK, r_batch.text
         # simple mode search
         r_simple = await ac.get("/api/v1/rag/search", params={"q": "burabay forests", "mode": "simple", "k": 3})
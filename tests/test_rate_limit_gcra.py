@@ -0,0 +1,61 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import json
+import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.rate_limit import MemoryGCRAStore, RateLimiter, RouteTemplates, rate_limiter
+
+client = TestClient(app)
+
+
+def test_gcra_allows_burst_then_spaces_requests():
+    store = MemoryGCRAStore()
+    lim = RateLimiter(store)
+    lim._load_config()
+    interval, tol = lim._params(10, 5)  # 5 запросов за 10 секунд
+    key = ('1.1.1.1', '/x')
+    assert [store.hit(key, 100.0, interval, tol) for _ in range(5)] == [0.0] * 5
+    assert store.hit(key, 100.0, interval, tol) == 2.0
+    assert store.hit(key, 102.0, interval, tol) == 0.0  # освободился один слот
+    assert store.hit(key, 102.0, interval, tol) > 0
+
+
+def test_sweeper_evicts_only_idle_keys():
+    store = MemoryGCRAStore(sweep_interval=0, sweep_batch=10)
+    t0 = time.monotonic()
+    for i in range(50):
+        store.hit((f'10.0.0.{i}', '/x'), t0, 1.0, 5.0)
+    store.hit(('busy', '/x'), t0 + 5, 100.0, 500.0)
+    for _ in range(10):  # порции по 10 ключей на запрос
+        store.hit(('busy', '/x'), t0 + 5, 0.0, 500.0)
+    assert len(store) == 1 and store.evicted == 50
+
+
+def test_route_templates_match_in_route_order():
+    rt = RouteTemplates(['/api/v1/objects/scores', '/api/v1/objects/{object_id}', '/static/{path:path}'])
+    assert rt.match('/api/v1/objects/scores') == '/api/v1/objects/scores'
+    assert rt.match('/api/v1/objects/17') == '/api/v1/objects/{object_id}'
+    assert rt.match('/static/a/b.css') == '/static/{path:path}'
+    assert rt.match('/wp-admin.php') == '<unmatched>'
+
+
+def test_middleware_limits_per_template(monkeypatch):
+    monkeypatch.setenv('RATE_LIMITS_JSON', json.dumps({'/api/v1/objects/{object_id}/score': [60, 3]}))
+    headers = {'X-Forwarded-For': '203.0.113.7'}
+    codes = [client.get(f'/api/v1/objects/{i}/score', headers=headers).status_code for i in range(1, 5)]
+    assert codes[:3] != [429] * 3 and codes[3] == 429  # разные id — один шаблон, один лимит
+    r = client.get('/api/v1/objects/9/score', headers=headers)
+    assert r.status_code == 429 and int(r.headers['retry-after']) >= 1
+    # другой клиент и пути вне /api/v1 не затронуты
+    assert client.get('/api/v1/objects/1/score', headers={'X-Forwarded-For': '203.0.113.8'}).status_code != 429
+    assert client.get('/favicon.ico', headers=headers).status_code != 429
+    assert rate_limiter.stats()['rejected'] >= 2
+
+
+def test_unknown_paths_share_one_key(monkeypatch):
+    before = len(rate_limiter.store)
+    for i in range(20):
+        client.get(f'/api/v1/scan-{i}.php', headers={'X-Forwarded-For': '198.51.100.1'})
+    assert len(rate_limiter.store) == before + 1
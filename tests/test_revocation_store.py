@@ -0,0 +1,68 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import time
+import sqlite3
+import pytest
+from app.revocation import RevocationStore, SQLiteRevocationBackend, MemoryRevocationBackend
+
+
+@pytest.mark.asyncio
+async def test_revocation_shared_between_workers_via_sqlite(tmp_path):
+    path = str(tmp_path / 'revoked.db')
+    # Два «воркера» — два независимых стора над одним файлом
+    w1 = RevocationStore(SQLiteRevocationBackend(path), refresh_sec=0)
+    w2 = RevocationStore(SQLiteRevocationBackend(path), refresh_sec=0)
+    exp = int(time.time()) + 3600
+    assert not await w2.is_revoked('jti-a')
+    await w1.revoke('jti-a', exp)
+    assert await w1.is_revoked('jti-a')
+    assert await w2.is_revoked('jti-a')
+    # Рестарт: новый стор подхватывает отзыв из файла
+    w3 = RevocationStore(SQLiteRevocationBackend(path), refresh_sec=0)
+    assert await w3.is_revoked('jti-a')
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_dropped(tmp_path):
+    path = str(tmp_path / 'revoked.db')
+    store = RevocationStore(SQLiteRevocationBackend(path), refresh_sec=0, purge_sec=0)
+    await store.revoke('old', int(time.time()) - 1)
+    await store.revoke('live', int(time.time()) + 3600)
+    await store.refresh()
+    assert len(store) == 1
+    assert not await store.is_revoked('old')
+    with sqlite3.connect(path) as conn:
+        assert [r[0] for r in conn.execute('SELECT jti FROM revoked_tokens')] == ['live']
+
+
+@pytest.mark.asyncio
+async def test_hot_path_does_not_hit_backend_between_refreshes():
+    backend = MemoryRevocationBackend()
+    calls = []
+    orig = backend.fetch_since
+
+    async def counting(wm):
+        calls.append(wm)
+        return await orig(wm)
+
+    backend.fetch_since = counting
+    store = RevocationStore(backend, refresh_sec=60)
+    for _ in range(100):
+        await store.is_revoked('x')
+    assert len(calls) == 1
+
+
+def test_revoke_endpoint_uses_db_backend():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app import auth
+    client = TestClient(app)
+    uid = client.post('/api/v1/users', json={'external_id': None, 'name': 'Rv', 'email': 'revstore@example.com', 'role': 'admin'}).json()['id']
+    token = client.post('/api/v1/auth/jwt/issue', params={'user_id': uid}).json()['access_token']
+    h = {'Authorization': f'Bearer {token}'}
+    assert client.get('/api/v1/admin/events', headers=h).status_code == 200
+    assert client.post('/api/v1/auth/jwt/revoke', params={'token': token}).status_code == 200
+    assert client.get('/api/v1/admin/events', headers=h).status_code == 401
+    if os.getenv('REVOCATION_BACKEND', 'db') == 'db':
+        assert type(auth.revocation_store.backend).__name__ == 'DatabaseRevocationBackend'
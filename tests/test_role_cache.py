@@ -0,0 +1,45 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+from fastapi.testclient import TestClient
+from app.main import app
+from app import auth
+
+client = TestClient(app)
+
+
+def _user_token(email, role='user'):
+    uid = client.post('/api/v1/users', json={'external_id': None, 'name': 'R', 'email': email, 'role': role}).json()['id']
+    token = client.post('/api/v1/auth/jwt/issue', params={'user_id': uid}).json()['access_token']
+    return uid, {'Authorization': f'Bearer {token}'}
+
+
+def test_role_lookup_is_cached_and_invalidated_on_role_change(monkeypatch):
+    monkeypatch.setenv('ADMIN_TOKEN', 'adm-roles')
+    uid, h = _user_token('role-cache@example.com')
+    assert client.get('/api/v1/admin/events', headers=h).status_code == 403
+    before = auth.role_cache_stats()['hits']
+    assert client.get('/api/v1/admin/events', headers=h).status_code == 403
+    assert auth.role_cache_stats()['hits'] == before + 1
+
+    r = client.post(f'/api/v1/admin/users/{uid}/role', json={'role': 'admin'}, headers={'X-Admin-Token': 'adm-roles'})
+    assert r.status_code == 200, r.text
+    # Кэш сброшен — новая роль действует сразу
+    assert client.get('/api/v1/admin/events', headers=h).status_code == 200
+
+
+def test_trusted_role_claim_skips_db(monkeypatch):
+    _, h = _user_token('role-claim@example.com', role='moderator')
+    monkeypatch.setenv('AUTH_TRUST_JWT_ROLE', '1')
+    auth.invalidate_user_role()
+    misses = auth.role_cache_stats()['misses']
+    r = client.post('/api/v1/admin/bookings/999999/status', json={'status': 'paid'}, headers=h)
+    assert r.status_code == 404  # прошёл RBAC, бронирования нет
+    assert auth.role_cache_stats()['misses'] == misses
+
+
+def test_revoked_token_is_401():
+    _, h = _user_token('role-revoked@example.com', role='admin')
+    token = h['Authorization'].split(' ', 1)[1]
+    assert client.post('/api/v1/auth/jwt/revoke', params={'token': token}).status_code == 200
+    assert client.get('/api/v1/admin/complaints', headers=h).status_code == 401
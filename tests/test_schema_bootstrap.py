@@ -0,0 +1,19 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+from fastapi.testclient import TestClient
+from app.main import app
+from app import database
+
+client = TestClient(app)
+
+
+def test_schema_created_once_per_process(monkeypatch):
+    assert client.get('/api/v1/events').status_code == 200
+    assert database._schema_ready is True
+
+    calls = []
+    monkeypatch.setattr(database.Base.metadata, 'create_all', lambda *a, **kw: calls.append(1))
+    for _ in range(3):
+        assert client.get('/api/v1/events').status_code == 200
+    assert calls == []
@@ -0,0 +1,27 @@
+import os
+os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///:memory:')
+os.environ['DISABLE_DB_INIT'] = '1'
+import asyncio
+from sqlalchemy import func, select
+from app.database import AsyncSessionLocal, ensure_schema
+from app.models import Complaint, Object as Obj, Review
+from manage import seed_scaled
+
+
+def test_seed_scaled_keeps_object_counters_consistent():
+    async def run():
+        await ensure_schema()
+        await seed_scaled(users=20, objects=30, bookings=50, reviews=200, complaints=60, events=10, chunk=25)
+        async with AsyncSessionLocal() as db:
+            objs = (await db.execute(select(Obj).where(Obj.name.like('Seed POI %')))).scalars().all()
+            reviews = dict((await db.execute(
+                select(Review.object_id, func.count()).group_by(Review.object_id))).all())
+            complaints = dict((await db.execute(
+                select(Complaint.object_id, func.count()).group_by(Complaint.object_id))).all())
+            return objs, reviews, complaints
+
+    objs, reviews, complaints = asyncio.run(run())
+    assert len(objs) == 30
+    for o in objs:
+        assert o.review_count == reviews.get(o.id, 0)
+        assert o.complaint_count == complaints.get(o.id, 0)